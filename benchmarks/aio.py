@@ -0,0 +1,121 @@
+"""
+RPC overhead of the threaded gRPC server against the grpc.aio one
+
+A local load generator sends the same stream of synthetic turns to each server
+through a blocking stub, then the same turns are decided in-process. The
+difference is what the transport and the server's thread hand-offs cost per
+Turn call, reported with the tail latency of the calls.
+
+    python -m benchmarks.aio --turns 2000
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import threading
+import time
+
+import grpc
+
+from benchmarks.matches import free_port
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from internal.handler.coms import game_pb2_grpc as game_grpc
+from main import BotComs, BotGame
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def drive(address, initial_state, turns, timeout):
+    """Send InitialState and then every turn, returns the latency of each Turn call"""
+    latencies = []
+    clock = time.perf_counter
+    with grpc.insecure_channel(address) as channel:
+        grpc.channel_ready_future(channel).result(timeout=5)
+        stub = game_grpc.GameServiceStub(channel)
+        stub.InitialState(initial_state, timeout=timeout)
+        for turn in turns:
+            start = clock()
+            stub.Turn(turn, timeout=timeout)
+            latencies.append(clock() - start)
+    return latencies
+
+
+def run_threaded(initial_state, turns, timeout):
+    address = f"localhost:{free_port()}"
+    coms = BotComs("bench", address, "localhost:0")
+    coms.bot_id = initial_state.PlayerID
+    server, cs = coms.serve(BotGame(coms.bot_id))
+    try:
+        return drive(address, initial_state, turns, timeout)
+    finally:
+        server.stop(0)
+        cs.close()
+
+
+def run_aio(initial_state, turns, timeout):
+    address = f"localhost:{free_port()}"
+    coms = BotComs("bench", address, "localhost:0", use_aio=True)
+    coms.bot_id = initial_state.PlayerID
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="aio-server", daemon=True)
+    thread.start()
+    server, servicer = asyncio.run_coroutine_threadsafe(
+        coms.serve_aio(BotGame(coms.bot_id)), loop
+    ).result()
+    try:
+        return drive(address, initial_state, turns, timeout)
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(0), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        servicer.close()
+        servicer.cs.close()
+
+
+def run_direct(initial_state, turns, timeout):
+    bot = BotGame(initial_state.PlayerID)
+    bot.load_initial_state(initial_state)
+    latencies = []
+    clock = time.perf_counter
+    for turn in turns:
+        start = clock()
+        bot.new_turn_action(turn)
+        latencies.append(clock() - start)
+    bot.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Threaded against asyncio gRPC server")
+    parser.add_argument("--turns", type=int, default=2_000)
+    parser.add_argument("--size", type=int, default=43, help="Map side")
+    parser.add_argument("--lighthouses", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=1.0, help="Turn timeout in seconds")
+    args = parser.parse_args()
+
+    initial_state = make_initial_state(args.size, args.size, lighthouses=args.lighthouses)
+    generator = TurnGenerator(initial_state)
+    turns = [generator.next_turn() for _ in range(args.turns)]
+
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, runner in (("direct", run_direct), ("threaded", run_threaded), ("aio", run_aio)):
+            results[name] = runner(initial_state, turns, args.timeout)
+
+    base = sum(results["direct"]) / len(turns)
+    for name, latencies in results.items():
+        mean = sum(latencies) / len(latencies)
+        print(
+            f"{name:<9} mean={mean * 1e6:8.1f} us  overhead={(mean - base) * 1e6:7.1f} us  "
+            f"p50={percentile(latencies, 0.50) * 1e6:8.1f} us  "
+            f"p99={percentile(latencies, 0.99) * 1e6:8.1f} us  "
+            f"p99.9={percentile(latencies, 0.999) * 1e6:8.1f} us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Python heap allocations of the turn path, pooled answers against fresh ones
+
+Synthetic turns go through ClientServer.turn (decision, history and the
+response message) with tracemalloc on, twice: once with the bot's ActionPool
+and once with FreshActions, which builds a new NewAction on every call as the
+bot did before the pool. Per turn the benchmark reports how far the traced heap
+rose above where it started (peak bytes, the working set of the turn's
+temporaries) and what was still held once the turn returned, then the lines
+holding the most at the end of the pooled run. Protobuf wrappers are Python
+objects and show up; the upb arenas behind them and the gRPC buffers do not.
+
+    python -m benchmarks.allocations --turns 2000
+"""
+import argparse
+import contextlib
+import gc
+import io
+import time
+import tracemalloc
+
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot.actions import ActionPool
+from bot.scheduler import Deadline
+from internal.handler.coms import game_pb2
+from main import BotGame, ClientServer
+
+
+class FreshActions(ActionPool):
+    """ActionPool interface with a new message per call, the answers as built before pooling"""
+
+    @property
+    def pass_action(self):
+        return game_pb2.NewAction(Action=game_pb2.PASS)
+
+    @pass_action.setter
+    def pass_action(self, value):
+        pass  # ActionPool.__init__ builds a shared one, never handed out here
+
+    def prebuild(self, positions):
+        pass
+
+    def move(self, x, y):
+        return game_pb2.NewAction(Action=game_pb2.MOVE, Destination=game_pb2.Position(X=x, Y=y))
+
+    def connect(self, x, y):
+        return game_pb2.NewAction(Action=game_pb2.CONNECT, Destination=game_pb2.Position(X=x, Y=y))
+
+    def attack(self, x, y, energy):
+        return game_pb2.NewAction(Action=game_pb2.ATTACK, Destination=game_pb2.Position(X=x, Y=y), Energy=energy)
+
+
+def measure(initial_state, warmup, measured, actions):
+    """Peak and retained bytes, retained blocks and seconds per turn, plus the retained sites"""
+    bot = BotGame(initial_state.PlayerID)
+    bot.actions = actions
+    cs = ClientServer(initial_state.PlayerID, bot_game=bot)
+    with contextlib.redirect_stdout(io.StringIO()):
+        cs.initial_state(initial_state)
+        for turn in warmup:
+            cs.turn(turn, Deadline(1.0))
+
+    peak_total, retained = 0, 0
+    gc.collect()
+    gc.disable()
+    tracemalloc.start(1)
+    baseline = tracemalloc.take_snapshot()
+    start = time.perf_counter()
+    for turn in measured:
+        deadline = Deadline(1.0)
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        cs.turn(turn, deadline)
+        current, peak = tracemalloc.get_traced_memory()
+        peak_total += peak - before
+        retained += current - before
+    elapsed = time.perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    gc.enable()
+    cs.close()
+
+    stats = snapshot.compare_to(baseline, "lineno")
+    count = len(measured)
+    return {
+        "peak": peak_total / count,
+        "retained": retained / count,
+        "blocks": sum(max(stat.count_diff, 0) for stat in stats) / count,
+        "seconds": elapsed / count,
+        "sites": sorted(stats, key=lambda stat: stat.size_diff, reverse=True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allocations per turn")
+    parser.add_argument("--size", type=int, default=43, help="Map side")
+    parser.add_argument("--lighthouses", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=2_000)
+    parser.add_argument("--warmup", type=int, default=200, help="Turns played before measuring")
+    parser.add_argument("--top", type=int, default=8, help="Allocation sites to list")
+    args = parser.parse_args()
+
+    initial_state = make_initial_state(args.size, args.size, lighthouses=args.lighthouses)
+    generator = TurnGenerator(initial_state)
+    turns = [generator.next_turn() for _ in range(args.warmup + args.turns)]
+    warmup, measured = turns[:args.warmup], turns[args.warmup:]
+
+    results = {
+        "fresh": measure(initial_state, warmup, measured, FreshActions()),
+        "pooled": measure(initial_state, warmup, measured, ActionPool()),
+    }
+    print(f"{len(measured)} turns, {args.size}x{args.size} map, {args.lighthouses} lighthouses")
+    print(f"{'answers':<8} {'peak B/turn':>12} {'retained B/turn':>16} {'blocks/turn':>12} {'us/turn traced':>15}")
+    for name, result in results.items():
+        print(
+            f"{name:<8} {result['peak']:12.1f} {result['retained']:16.1f} "
+            f"{result['blocks']:12.2f} {result['seconds'] * 1e6:15.1f}"
+        )
+    fresh, pooled = results["fresh"], results["pooled"]
+    print(f"pooling saves {fresh['peak'] - pooled['peak']:.1f} B of peak per turn")
+    print("largest retained sites (pooled):")
+    for stat in pooled["sites"][:args.top]:
+        frame = stat.traceback[0]
+        print(f"  {stat.size_diff:10d} B {stat.count_diff:7d} blocks  {frame.filename}:{frame.lineno}")
+
+
+if __name__ == "__main__":
+    main()
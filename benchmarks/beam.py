@@ -0,0 +1,71 @@
+"""
+Beam search nodes expanded per second
+
+A BotGame with the beam planner plays synthetic turns; every turn the planner
+searches from scratch, once to completion and once against a short deadline.
+Reported per map and search shape: nodes expanded per second, the time of a
+full search and how many of the deadline searches had to stop early or
+answered after the deadline, and by how much at worst.
+
+    python -m benchmarks.beam --turns 200
+"""
+import argparse
+import contextlib
+import io
+
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot.scheduler import Deadline
+from main import BotGame
+
+CASES = (
+    (15, 15, 6),
+    (43, 43, 20),
+    (100, 100, 60),
+)
+SHAPES = ((2, 4), (4, 8), (6, 16))  # (depth, width)
+
+
+def run_case(width, height, lighthouses, depth, beam_width, turns, budget):
+    initial_state = make_initial_state(width, height, lighthouses=lighthouses)
+    generator = TurnGenerator(initial_state)
+    bot = BotGame(initial_state.PlayerID, beam_depth=depth, beam_width=beam_width)
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.load_initial_state(initial_state)
+    planner = None
+    expanded = seconds = 0.0
+    cut = late = 0
+    overshoot = 0.0
+    try:
+        for _ in range(turns):
+            turn = generator.next_turn()
+            bot.new_turn_action(turn, Deadline(1.0))
+            planner = bot.beam
+            position = (turn.Position.X, turn.Position.Y)
+            full = planner.plan(position, turn.Energy, bot.countT)
+            expanded += full.expanded
+            seconds += full.elapsed
+            timed = planner.plan(position, turn.Energy, bot.countT, Deadline(budget))
+            cut += not timed.complete
+            late += timed.elapsed > budget
+            overshoot = max(overshoot, timed.elapsed - budget)
+    finally:
+        bot.close()
+    print(
+        f"{width:>3}x{height:<3} {lighthouses:>3} lighthouses  depth={depth} width={beam_width:<3} "
+        f"{expanded / seconds if seconds else 0.0:9.0f} nodes/s  full={seconds / turns * 1e3:6.2f} ms  "
+        f"at {budget * 1e3:.0f} ms: {cut}/{turns} cut, {late} late (worst by {max(0.0, overshoot) * 1e3:.2f} ms)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Beam search benchmark")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--budget", type=float, default=0.002, help="Deadline of the cut-short searches")
+    args = parser.parse_args()
+    for case in CASES:
+        for depth, beam_width in SHAPES:
+            run_case(*case, depth, beam_width, args.turns, args.budget)
+
+
+if __name__ == "__main__":
+    main()
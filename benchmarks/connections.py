@@ -0,0 +1,77 @@
+"""
+Connection legality and triangle enumeration on dense link graphs
+
+Compares ConnectionGraph's bucketed queries against checking every link and
+every lighthouse for each candidate.
+
+    python -m benchmarks.connections
+"""
+import random
+import time
+
+from bot.connections import ConnectionGraph, on_segment, segments_intersect
+
+CASES = (
+    # map side, lighthouses, link attempts
+    (43, 60, 3_000),
+    (100, 200, 20_000),
+    (100, 400, 40_000),
+)
+QUERIES = 2_000
+
+
+def brute_force_legal(graph, a, b):
+    positions = graph.positions
+    pa, pb = positions[a], positions[b]
+    if any(on_segment(pa, pb, positions[c]) for c in range(len(positions)) if c not in (a, b)):
+        return False
+    return not any(
+        segments_intersect(pa, pb, positions[c], positions[d])
+        for c, d in graph.links
+        if c not in (a, b) and d not in (a, b)
+    )
+
+
+def build_graph(side, lighthouses, attempts, rng):
+    cells = [(x, y) for x in range(side) for y in range(side)]
+    graph = ConnectionGraph(rng.sample(cells, lighthouses))
+    for _ in range(attempts):
+        a, b = rng.sample(range(lighthouses), 2)
+        if graph.is_legal(a, b):
+            graph.add_link(a, b)
+    return graph
+
+
+def timed(function, pairs):
+    start = time.perf_counter()
+    results = [function(a, b) for a, b in pairs]
+    return (time.perf_counter() - start) / len(pairs) * 1e6, results
+
+
+def main():
+    rng = random.Random(0)
+    print(
+        f"{'map':>7} {'lighthouses':>11} {'links':>6} {'indexed':>9} {'brute':>9} "
+        f"{'legal idx':>11} {'legal brute':>11} {'triangles':>10}  (us/query)"
+    )
+    for side, lighthouses, attempts in CASES:
+        graph = build_graph(side, lighthouses, attempts, rng)
+        pairs = [tuple(rng.sample(range(lighthouses), 2)) for _ in range(QUERIES)]
+        pairs = [(a, b) for a, b in pairs if (min(a, b), max(a, b)) not in graph.links]
+        indexed_us, indexed = timed(graph.is_legal, pairs)
+        brute_us, brute = timed(lambda a, b: brute_force_legal(graph, a, b), pairs)
+        assert indexed == brute
+        # Legal candidates are the worst case: every nearby link has to be checked
+        legal = [pair for pair, ok in zip(pairs, indexed) if ok] or pairs[:1]
+        legal_us, _ = timed(graph.is_legal, legal)
+        legal_brute_us, _ = timed(lambda a, b: brute_force_legal(graph, a, b), legal)
+        triangles_us, _ = timed(graph.triangles, sorted(graph.links))
+        print(
+            f"{side:>3}x{side:<3} {lighthouses:>11} {len(graph.links):>6} "
+            f"{indexed_us:>9.1f} {brute_us:>9.1f} {legal_us:>11.1f} {legal_brute_us:>11.1f} "
+            f"{triangles_us:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
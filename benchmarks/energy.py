@@ -0,0 +1,53 @@
+"""
+Cost of merging the View into the energy field and of the harvesting route query
+
+    python -m benchmarks.energy --size 100 --lighthouses 40
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot.energy import EnergyField
+from bot.navigation import NavigationGrid
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Energy field benchmark")
+    parser.add_argument("--size", type=int, default=100, help="Map side")
+    parser.add_argument("--lighthouses", type=int, default=40)
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--slack", type=int, default=2)
+    args = parser.parse_args()
+
+    initial_state = make_initial_state(args.size, args.size, lighthouses=args.lighthouses)
+    navigation = NavigationGrid.from_initial_state(initial_state)
+    field = EnergyField.build(navigation.walkable, navigation.targets)
+    generator = TurnGenerator(initial_state)
+    turns = [generator.next_turn() for _ in range(args.turns)]
+
+    start = time.perf_counter()
+    for number, turn in enumerate(turns):
+        field.observe(number, turn.Position, turn.View)
+    observe = (time.perf_counter() - start) / len(turns)
+
+    source = (initial_state.Position.X, initial_state.Position.Y)
+    timings = []
+    for target in navigation.targets:
+        distance = navigation.distance(source, target)
+        if distance is None:
+            continue
+        start = time.perf_counter()
+        field.route(source, target, navigation, len(turns), slack=args.slack)
+        timings.append((time.perf_counter() - start, distance))
+    timings.sort()
+    mean = sum(seconds for seconds, _ in timings) / len(timings)
+    worst, worst_distance = timings[-1]
+    print(f"observe {observe * 1e6:8.1f} us/turn")
+    print(
+        f"route   {mean * 1e3:8.2f} ms mean, {worst * 1e3:.2f} ms worst "
+        f"({worst_distance} moves away, slack {args.slack})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Memory of the turn history over a 10,000-turn synthetic game
+
+Compares keeping every raw NewTurn/NewAction pair against TurnHistory with
+and without a bounded ring buffer. Protobuf messages live in C arenas that
+tracemalloc cannot see, so the RSS delta is the figure to compare.
+
+    python -m benchmarks.history
+"""
+import gc
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot.history import TurnHistory
+from internal.handler.coms import game_pb2
+
+TURNS = 10_000
+
+
+def rss_bytes():
+    """Resident set size from /proc, 0 where it is not available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def synthetic_game():
+    initial_state = make_initial_state(43, 43, lighthouses=20)
+    generator = TurnGenerator(initial_state)
+    action = game_pb2.NewAction(Action=game_pb2.MOVE, Destination=game_pb2.Position(X=1, Y=1))
+    for _ in range(TURNS):
+        yield generator.next_turn(), action
+
+
+def measure(label, store):
+    gc.collect()
+    rss_before = rss_bytes()
+    tracemalloc.start()
+    holder = store(synthetic_game())
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = rss_bytes()
+    print(
+        f"{label:<28} python heap={current / 1024:9.1f} KiB  "
+        f"rss delta={(rss_after - rss_before) / 1024:9.1f} KiB"
+    )
+    return holder
+
+
+def raw_list(game):
+    return [(turn, action) for turn, action in game]
+
+
+def compact(capacity, spill_path=None):
+    def store(game):
+        history = TurnHistory(capacity=capacity, spill_path=spill_path)
+        for turn, action in game:
+            history.append(turn, action)
+        return history
+    return store
+
+
+def main():
+    print(f"{TURNS} turns, 43x43 map, 20 lighthouses")
+    measure("TurnHistory(256)", compact(256))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.bin")
+        history = measure("TurnHistory(256) + spill", compact(256, path))
+        history.close()
+        print(f"{'spill file':<28} size={os.path.getsize(path) / 1024:9.1f} KiB")
+    measure("TurnHistory(10000)", compact(TURNS))
+    measure("raw NewTurn list", raw_list)
+
+
+if __name__ == "__main__":
+    main()
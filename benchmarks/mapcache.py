@@ -0,0 +1,63 @@
+"""
+Map preprocessing from scratch against a load from the on-disk map cache
+
+Cold builds the navigation grid and the simulation's StaticMap, warm maps them
+from the cache file (with and without the checksum check).
+
+    python -m benchmarks.mapcache --size 100 --lighthouses 50
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.synthetic import make_initial_state
+from bot.maps import MapCache, MapData
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Map cache load time")
+    parser.add_argument("--size", type=int, default=100, help="Map side")
+    parser.add_argument("--lighthouses", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    initial_state = make_initial_state(args.size, args.size, lighthouses=args.lighthouses)
+
+    def build():
+        data = MapData.from_initial_state(initial_state)
+        data.static_map()
+        return data
+
+    cold, built = timed(build, 1)
+    with tempfile.TemporaryDirectory() as path:
+        MapData.from_initial_state(initial_state, MapCache(path)).static_map()
+        for verify in (True, False):
+            cache = MapCache(path, verify=verify)
+
+            def load():
+                data = MapData.from_initial_state(initial_state, cache)
+                data.static_map()
+                return data
+
+            warm, loaded = timed(load, args.repeat)
+            assert np.array_equal(loaded.static_map().blocked, built.static_map().blocked)
+            assert np.array_equal(loaded.navigation.target_step, built.navigation.target_step)
+            label = "warm (checked)" if verify else "warm (unchecked)"
+            print(f"{label:<17} {warm * 1e3:9.2f} ms  ({cold / warm:.0f}x)")
+        size = cache.as_dict()["bytes"]
+    print(f"{'cold':<17} {cold * 1e3:9.2f} ms  file={size / 1e6:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Headless bot-vs-bot matches on the local engine
+
+``direct`` calls BotGame.new_turn_action in-process, ``grpc`` runs every bot
+behind its own gRPC listener on localhost and plays through real stubs, the
+same way the engine does. Both report decisions per second, p50/p99 decision
+latency, win rates per bot kind and how often the search stages all finished
+before the deadline versus the fallback answering alone.
+
+    python -m benchmarks.matches --mode direct --matches 10
+    python -m benchmarks.matches --mode grpc --bots greedy,manhattan
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+from concurrent import futures
+
+import grpc
+
+from bot.local_engine import (
+    DirectBot, LocalEngineServicer, LocalGame, MatchReport, play_match,
+)
+from bot.replay import ReplayWriter
+from bot.scoring import ratio_objective
+from internal.handler.coms import game_pb2_grpc as game_grpc
+from main import BotComs, BotGame
+
+BOT_KINDS = {
+    "greedy": lambda player_id: BotGame(player_id),
+    "manhattan": lambda player_id: BotGame(player_id, objective=ratio_objective),
+    "shortest": lambda player_id: BotGame(player_id, harvest_slack=0),
+    "mcts": lambda player_id: BotGame(player_id, mcts_workers=0),
+    "beam": lambda player_id: BotGame(player_id, beam_depth=4),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def run_direct(game, kinds, turn_timeout, record_dir=None, match=0):
+    bots, recorders = {}, {}
+    for kind in kinds:
+        player_id = game.join()
+        bots[player_id] = BOT_KINDS[kind](player_id)
+        if record_dir is not None:
+            path = os.path.join(record_dir, f"match{match:04d}-p{player_id}-{kind}.replay")
+            recorders[player_id] = ReplayWriter(path)
+    try:
+        stubs = {pid: DirectBot(bot, recorders.get(pid)) for pid, bot in bots.items()}
+        result = play_match(game, stubs, turn_timeout)
+        result.search = {pid: bot.scheduler.stats.as_dict() for pid, bot in bots.items()}
+        return result
+    finally:
+        for bot in bots.values():
+            bot.close()
+        for recorder in recorders.values():
+            recorder.close()
+
+
+def run_grpc(game, kinds, turn_timeout):
+    engine = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    servicer = LocalEngineServicer(game)
+    game_grpc.add_GameServiceServicer_to_server(servicer, engine)
+    engine_port = engine.add_insecure_port("localhost:0")
+    engine.start()
+
+    servers, channels, stubs, bots = [], [], {}, {}
+    try:
+        for index, kind in enumerate(kinds):
+            coms = BotComs(f"{kind}-{index}", f"localhost:{free_port()}", f"localhost:{engine_port}")
+            coms.wait_to_join_game()
+            bots[coms.bot_id] = BOT_KINDS[kind](coms.bot_id)
+            servers.append(coms.serve(bots[coms.bot_id]))
+        servicer.all_joined.wait()
+        for player_id, address in servicer.addresses.items():
+            channel = grpc.insecure_channel(address)
+            grpc.channel_ready_future(channel).result(timeout=5)
+            channels.append(channel)
+            stubs[player_id] = game_grpc.GameServiceStub(channel)
+        result = play_match(game, stubs, turn_timeout)
+        result.search = {pid: bot.scheduler.stats.as_dict() for pid, bot in bots.items()}
+        return result
+    finally:
+        for channel in channels:
+            channel.close()
+        for server, servicer_bot in servers:
+            server.stop(0)
+            servicer_bot.close()
+        engine.stop(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local bot-vs-bot matches")
+    parser.add_argument("--mode", choices=("direct", "grpc"), default="direct")
+    parser.add_argument("--bots", default="greedy,greedy", help=f"Comma separated, from {sorted(BOT_KINDS)}")
+    parser.add_argument("--matches", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--size", type=int, default=25, help="Map side")
+    parser.add_argument("--lighthouses", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=1.0, help="Turn timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--record", default=None, help="Directory for replays (direct mode only)")
+    args = parser.parse_args()
+    if args.record:
+        os.makedirs(args.record, exist_ok=True)
+
+    kinds = args.bots.split(",")
+    runner = run_direct if args.mode == "direct" else run_grpc
+    report = MatchReport()
+    for match in range(args.matches):
+        # Rotate the seats so no bot kind always plays first
+        seated = kinds[match % len(kinds):] + kinds[:match % len(kinds)]
+        game = LocalGame.random(
+            args.size, args.size, args.lighthouses, players=len(kinds),
+            turns=args.turns, seed=args.seed + match,
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            if args.mode == "direct":
+                result = runner(game, seated, args.timeout, args.record, match)
+            else:
+                result = runner(game, seated, args.timeout)
+        report.add(result, dict(zip(game.player_ids, seated)))
+
+    summary = report.as_dict()
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(
+        f"{args.mode}: {summary['matches']} matches, {summary['turns_per_second']:.0f} turns/s, "
+        f"p50={summary['p50_ms']:.2f} ms, p99={summary['p99_ms']:.2f} ms"
+    )
+    for label, rate in summary["win_rates"].items():
+        search = summary["search"].get(label)
+        line = f"  {label:<10} win rate {rate:.2f}"
+        if search:
+            line += (
+                f"  full search {search['full_depth_rate']:.1%}, fallback only {search['fallback_rate']:.1%}, "
+                f"{search['overruns']} late"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
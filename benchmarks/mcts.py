@@ -0,0 +1,50 @@
+"""
+MCTS rollouts per second, in-process and on the warm process pool
+
+    python -m benchmarks.mcts
+"""
+import os
+
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot.mcts import MCTSPlanner
+from bot.scheduler import Deadline
+from bot.simulation import SimState, StaticMap
+
+CASES = (
+    (15, 15, 6),
+    (43, 43, 20),
+    (100, 100, 60),
+)
+ITERATIONS = 400
+BUDGET = 0.5
+
+
+def run_case(width, height, lighthouses, workers):
+    initial_state = make_initial_state(width, height, lighthouses=lighthouses)
+    static = StaticMap.from_initial_state(initial_state)
+    state = SimState.from_turn(static, TurnGenerator(initial_state).next_turn(), initial_state.PlayerID)
+    planner = MCTSPlanner(static, workers=workers, seed=7)
+    planner.start()
+    try:
+        first = planner.plan(state, iterations=ITERATIONS)
+        second = planner.plan(state, iterations=ITERATIONS)
+        timed = planner.plan(state, deadline=Deadline(BUDGET))
+    finally:
+        planner.close()
+    label = "in-process" if workers == 0 else f"{workers} workers"
+    print(
+        f"{width:>3}x{height:<3} {label:<11} fixed={first.rollouts_per_second:8.0f}/s  "
+        f"deadline={timed.rollouts_per_second:8.0f}/s ({timed.rollouts} in {timed.elapsed * 1000:.0f} ms)  "
+        f"deterministic={first.visits == second.visits}"
+    )
+
+
+def main():
+    cores = os.cpu_count() or 1
+    for case in CASES:
+        for workers in sorted({0, cores}):
+            run_case(*case, workers)
+
+
+if __name__ == "__main__":
+    main()
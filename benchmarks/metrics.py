@@ -0,0 +1,40 @@
+"""
+Cost of the instrumentation on the decision path, enabled against disabled
+
+    python -m benchmarks.metrics
+"""
+import io
+import time
+
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot.metrics import NULL_METRICS, BufferedLogSink, Metrics
+from main import BotGame
+
+TURNS = 2_000
+
+
+def run(metrics, turns, initial_state):
+    bot = BotGame(initial_state.PlayerID, metrics=metrics)
+    bot.load_initial_state(initial_state)
+    start = time.perf_counter()
+    for turn in turns:
+        metrics.log(f"Processing turn: {bot.countT}")
+        bot.new_turn_action(turn)
+    return (time.perf_counter() - start) / len(turns) * 1e6
+
+
+def main():
+    initial_state = make_initial_state(43, 43, lighthouses=20)
+    generator = TurnGenerator(initial_state)
+    turns = [generator.next_turn() for _ in range(TURNS)]
+
+    enabled = Metrics(sink=BufferedLogSink(io.StringIO()))
+    disabled_us = run(NULL_METRICS, turns, initial_state)
+    enabled_us = run(enabled, turns, initial_state)
+    enabled.close()
+    print(f"disabled {disabled_us:8.1f} us/turn")
+    print(f"enabled  {enabled_us:8.1f} us/turn  (+{enabled_us - disabled_us:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Precompute time and memory of the navigation fields
+
+    python -m benchmarks.navigation
+"""
+import time
+import tracemalloc
+
+from benchmarks.synthetic import make_initial_state
+from bot.navigation import NavigationGrid
+
+CASES = (
+    (15, 15, 6),
+    (43, 43, 20),
+    (100, 100, 60),
+)
+
+
+def run_case(width, height, lighthouses, repeat=3):
+    initial_state = make_initial_state(width, height, lighthouses=lighthouses)
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        grid = NavigationGrid.from_initial_state(initial_state)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    grid = NavigationGrid.from_initial_state(initial_state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    src = (initial_state.Position.X, initial_state.Position.Y)
+    dst = next(iter(grid.fields))
+    lookups = 100_000
+    start = time.perf_counter()
+    for _ in range(lookups):
+        grid.next_move(src, dst)
+    lookup_ns = (time.perf_counter() - start) / lookups * 1e9
+
+    print(
+        f"{width:>3}x{height:<3} lighthouses={lighthouses:<3} "
+        f"precompute={best * 1000:8.2f} ms  fields={grid.nbytes / 1024:8.1f} KiB  "
+        f"peak={peak / 1024:8.1f} KiB  next_move={lookup_ns:6.0f} ns"
+    )
+
+
+def main():
+    for case in CASES:
+        run_case(*case)
+
+
+if __name__ == "__main__":
+    main()
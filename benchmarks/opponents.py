@@ -0,0 +1,50 @@
+"""
+Per-turn cost of the opponent model and of its queries
+
+    python -m benchmarks.opponents --lighthouses 50 --changes 4
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot.lighthouses import LighthouseIndex
+from bot.navigation import NavigationGrid
+from bot.opponents import OpponentModel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Opponent model benchmark")
+    parser.add_argument("--size", type=int, default=60, help="Map side")
+    parser.add_argument("--lighthouses", type=int, default=50)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--changes", type=int, default=4, help="Lighthouses changed per turn")
+    parser.add_argument("--turns", type=int, default=2_000)
+    args = parser.parse_args()
+
+    initial_state = make_initial_state(
+        args.size, args.size, lighthouses=args.lighthouses, players=args.players
+    )
+    navigation = NavigationGrid.from_initial_state(initial_state)
+    index = LighthouseIndex.from_lighthouses(initial_state.Lighthouses, initial_state.PlayerID)
+    model = OpponentModel(index, navigation, args.players)
+    generator = TurnGenerator(initial_state)
+    turns = [generator.next_turn(args.changes) for _ in range(args.turns)]
+    changes = [index.update(turn.Lighthouses) for turn in turns]
+
+    start = time.perf_counter()
+    for number, (turn, changed) in enumerate(zip(turns, changes)):
+        model.update(changed, number, turn.Energy)
+    update = (time.perf_counter() - start) / len(turns)
+
+    start = time.perf_counter()
+    for lh_id in range(len(index)):
+        model.safe_attack_energy(lh_id)
+        model.contest_probability(lh_id)
+    query = (time.perf_counter() - start) / len(index)
+
+    print(f"update  {update * 1e6:7.1f} us/turn ({args.changes} changed lighthouses)")
+    print(f"queries {query * 1e6:7.1f} us/lighthouse (safe_attack_energy + contest_probability)")
+
+
+if __name__ == "__main__":
+    main()
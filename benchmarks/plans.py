@@ -0,0 +1,67 @@
+"""
+Plan cache hit rate and the routing time it saves
+
+Greedy bots play local matches (bot.local_engine) against each other; the
+moves of the defend and expand strategies go through the plan cache. The
+benchmark reports, over every bot, how often a stored plan answered the move,
+why plans were dropped, what a hit and a miss cost on average and the time
+saved (hits times the difference).
+
+    python -m benchmarks.plans --matches 6 --size 31
+"""
+import argparse
+import contextlib
+import io
+
+from benchmarks import matches
+from bot.local_engine import LocalGame
+from main import BotGame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan cache benchmark")
+    parser.add_argument("--matches", type=int, default=4)
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--size", type=int, default=31, help="Map side")
+    parser.add_argument("--lighthouses", type=int, default=12)
+    parser.add_argument("--energy-threshold", type=int, default=20, help="Target energy change that drops a plan")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    bots = []
+
+    def planned_bot(player_id):
+        bot = BotGame(player_id, plan_energy_threshold=args.energy_threshold)
+        bots.append(bot)
+        return bot
+
+    matches.BOT_KINDS["planned"] = planned_bot
+    for match in range(args.matches):
+        game = LocalGame.random(
+            args.size, args.size, args.lighthouses, players=args.players, turns=args.turns, seed=args.seed + match,
+        )
+        with contextlib.redirect_stdout(io.StringIO()):
+            matches.run_direct(game, ["planned"] * args.players, 1.0)
+
+    hits = sum(bot.plans.stats.hits for bot in bots)
+    misses = sum(bot.plans.stats.misses for bot in bots)
+    asked = max(1, hits + misses)
+    hit_cost = sum(bot.plans.stats.hit_cost * bot.plans.stats.hits for bot in bots) / max(1, hits)
+    miss_cost = sum(bot.plans.stats.miss_cost * bot.plans.stats.misses for bot in bots) / max(1, misses)
+    invalidated = {}
+    for bot in bots:
+        for reason, count in bot.plans.stats.invalidated.items():
+            invalidated[reason] = invalidated.get(reason, 0) + count
+    saved = sum(bot.plans.stats.as_dict()["saved_seconds"] for bot in bots)
+
+    print(f"{args.matches} matches, {args.players} players, {args.size}x{args.size} map, {args.lighthouses} lighthouses")
+    print(f"moves     {hits + misses:8d}  ({hits} from a plan, hit rate {hits / asked:.2f})")
+    print(f"hit       {hit_cost * 1e6:8.1f} us")
+    print(f"miss      {miss_cost * 1e6:8.1f} us  (routing afresh)")
+    print(f"saved     {saved * 1e3:8.1f} ms  ({saved / asked * 1e6:.1f} us per move)")
+    print("dropped   " + ", ".join(f"{reason} {count}" for reason, count in sorted(invalidated.items())))
+
+
+if __name__ == "__main__":
+    main()
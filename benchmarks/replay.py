@@ -0,0 +1,112 @@
+"""
+Offline evaluation of a bot on recorded games
+
+Every recorded turn is fed to a fresh bot of the chosen kind, games spread over
+a process pool. The report has the decision latency per turn and how many
+decisions differ from the recorded ones, which makes it a regression test for
+strategy changes that needs no live match. Replays come from ``--record`` on
+the bot or on benchmarks.matches:
+
+    python -m benchmarks.matches --matches 20 --record replays/
+    python -m benchmarks.replay replays/ --bot greedy --workers 4
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.matches import BOT_KINDS
+from bot.replay import read_games, replay_game, replay_paths
+from internal.handler.coms import game_pb2
+
+
+def _describe(action):
+    return (
+        f"{game_pb2.Action.Name(action.Action)}"
+        f"({action.Destination.X},{action.Destination.Y},{action.Energy})"
+    )
+
+
+def evaluate_file(path, kind, seed, max_diffs):
+    """Replay every game of ``path`` with a ``kind`` bot, in a worker process"""
+    summaries = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for game in read_games(path):
+            result = replay_game(game, BOT_KINDS[kind], seed)
+            summaries.append({
+                "source": os.path.basename(path),
+                "turns": result.turns,
+                "latencies": result.latencies,
+                "diffs": len(result.diffs),
+                "examples": [
+                    (number, _describe(recorded), _describe(action))
+                    for number, recorded, action in result.diffs[:max_diffs]
+                ],
+            })
+    return summaries
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded games through a bot")
+    parser.add_argument("paths", nargs="+", help="Replay files or directories")
+    parser.add_argument("--bot", default="greedy", help=f"Bot kind, from {sorted(BOT_KINDS)}")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--diffs", type=int, default=3, help="Example diffs shown per game")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    files = replay_paths(args.paths)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        jobs = [pool.submit(evaluate_file, path, args.bot, args.seed, args.diffs) for path in files]
+        games = [summary for job in jobs for summary in job.result()]
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for game in games for latency in game["latencies"]]
+    turns = sum(game["turns"] for game in games)
+    diffs = sum(game["diffs"] for game in games)
+    report = {
+        "games": len(games),
+        "turns": turns,
+        "turns_per_second": turns / elapsed if elapsed else 0.0,
+        "diff_rate": diffs / turns if turns else 0.0,
+        "mean_ms": sum(latencies) / len(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "max_ms": max(latencies, default=0.0) * 1000,
+        "per_game": [
+            {key: value for key, value in game.items() if key != "latencies"} for game in games
+        ],
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(
+        f"{report['games']} games, {turns} turns in {elapsed:.1f} s "
+        f"({report['turns_per_second']:.0f} turns/s), {diffs} decisions differ "
+        f"({report['diff_rate']:.1%})"
+    )
+    print(
+        f"latency mean={report['mean_ms']:.2f} ms  p50={report['p50_ms']:.2f} ms  "
+        f"p99={report['p99_ms']:.2f} ms  max={report['max_ms']:.2f} ms"
+    )
+    for game in report["per_game"]:
+        if game["diffs"]:
+            print(f"  {game['source']}: {game['diffs']}/{game['turns']} differ")
+            for number, recorded, action in game["examples"]:
+                print(f"    turn {number}: recorded {recorded}, now {action}")
+
+
+if __name__ == "__main__":
+    main()
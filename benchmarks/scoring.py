@@ -0,0 +1,58 @@
+"""
+Per-beacon compute_ratio loop against the vectorized ScoringEngine
+
+    python -m benchmarks.scoring
+"""
+import timeit
+
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot.lighthouses import LighthouseIndex
+from bot.navigation import NavigationGrid
+from bot.scoring import ScoringEngine, path_ratio_objective, ratio_objective
+from main import BotGame
+
+SIZES = (10, 100, 1000)
+MAP_SIDE = 64
+
+
+def per_beacon_loop(bot, turn):
+    """The original scoring: a dict of compute_ratio values and a filtered max"""
+    lighthouse_evaluations = {}
+    for beacon in turn.Lighthouses:
+        value_score = bot.compute_ratio(turn.Position, beacon)
+        position_key = (beacon.Position.X, beacon.Position.Y, beacon.Owner)
+        lighthouse_evaluations[position_key] = value_score
+    available_targets = {
+        coords: score
+        for coords, score in lighthouse_evaluations.items()
+        if coords[2] != bot.player_num
+    }
+    return max(available_targets, key=available_targets.get) if available_targets else None
+
+
+def best_of(stmt, number):
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    print(f"{'lighthouses':>11} {'loop':>10} {'ratio top1':>11} {'ratio top5':>11} {'path top1':>10}  (us)")
+    for size in SIZES:
+        initial_state = make_initial_state(MAP_SIDE, MAP_SIDE, lighthouses=size, players=3)
+        turn = TurnGenerator(initial_state, connection_density=0.0).next_turn(changes=size)
+        bot = BotGame(initial_state.PlayerID)
+        index = LighthouseIndex.from_lighthouses(initial_state.Lighthouses, initial_state.PlayerID)
+        index.update(turn.Lighthouses)
+        navigation = NavigationGrid.from_initial_state(initial_state)
+        engine = ScoringEngine(index, navigation)
+        position = (turn.Position.X, turn.Position.Y)
+        number = max(10, 20_000 // size)
+
+        loop_us = best_of(lambda: per_beacon_loop(bot, turn), number)
+        top1_us = best_of(lambda: engine.top_k(position, turn.Energy, 1, ratio_objective), number)
+        top5_us = best_of(lambda: engine.top_k(position, turn.Energy, 5, ratio_objective), number)
+        path_us = best_of(lambda: engine.top_k(position, turn.Energy, 1, path_ratio_objective), number)
+        print(f"{size:>11} {loop_us:>10.1f} {top1_us:>11.1f} {top5_us:>11.1f} {path_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
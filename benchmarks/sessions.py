@@ -0,0 +1,56 @@
+"""
+Cost of hosting many bots in one process, with and without shared map data
+
+Every session loads the same initial state, as the bots of one match do.
+
+    python -m benchmarks.sessions --sessions 32
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot.maps import SharedMaps
+from main import BotGame
+
+
+def run(initial_state, turns, sessions, maps):
+    bots = [BotGame(initial_state.PlayerID, history_size=64, maps=maps) for _ in range(sessions)]
+    start = time.perf_counter()
+    for bot in bots:
+        bot.load_initial_state(initial_state)
+    load = (time.perf_counter() - start) / sessions
+    start = time.perf_counter()
+    for turn in turns:
+        for bot in bots:
+            bot.new_turn_action(turn)
+    turn_cost = (time.perf_counter() - start) / (len(turns) * sessions)
+    if maps is not None:
+        map_bytes = maps.nbytes
+    else:
+        map_bytes = sum(bot.navigation.nbytes for bot in bots)
+    for bot in bots:
+        bot.close()
+    return load, turn_cost, map_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Many sessions in one process")
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--size", type=int, default=60, help="Map side")
+    parser.add_argument("--lighthouses", type=int, default=30)
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    initial_state = make_initial_state(args.size, args.size, lighthouses=args.lighthouses)
+    generator = TurnGenerator(initial_state)
+    turns = [generator.next_turn() for _ in range(args.turns)]
+    for name, maps in (("private maps", None), ("shared maps", SharedMaps())):
+        load, turn_cost, map_bytes = run(initial_state, turns, args.sessions, maps)
+        print(
+            f"{name:<13} {args.sessions} sessions  load={load * 1e3:7.2f} ms/session  "
+            f"turn={turn_cost * 1e6:7.1f} us  map data={map_bytes / 1e6:7.2f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
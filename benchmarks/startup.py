@@ -0,0 +1,123 @@
+"""
+Time from process start to a bot ready to play
+
+A stand-in engine answers Join and, like the real one, sends InitialState to
+the address the bot gave straight away, without waiting for the bot's listener.
+Each run spawns ``main.py`` as a fresh process and times, from the spawn:
+
+- join:  the engine receiving Join
+- ready: the bot answering InitialState (a refused InitialState counts as a failure)
+
+``--engine-delay`` starts the engine that long after the bot, to time how soon
+the Join retries notice it (the lag column).
+
+    python -m benchmarks.startup --runs 10 --engine-delay 0.5
+    python -m benchmarks.startup --bot-args=--aio
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent import futures
+
+import grpc
+
+from benchmarks.matches import free_port
+from benchmarks.synthetic import make_initial_state
+from internal.handler.coms import game_pb2
+from internal.handler.coms import game_pb2_grpc as game_grpc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StandInEngine(game_grpc.GameServiceServicer):
+    def __init__(self, initial_state, clock=time.perf_counter):
+        self.initial_state = initial_state
+        self.clock = clock
+        self.join_time = None
+        self.ready_time = None
+        self.error = None
+        self.done = threading.Event()
+
+    def Join(self, request, context):
+        self.join_time = self.clock()
+        threading.Thread(target=self.send_initial_state, args=(request.serverAddress,), daemon=True).start()
+        return game_pb2.PlayerID(PlayerID=self.initial_state.PlayerID)
+
+    def send_initial_state(self, address):
+        """Times the first bot of the process, later ones may be cut off by the kill"""
+        try:
+            with grpc.insecure_channel(address) as channel:
+                game_grpc.GameServiceStub(channel).InitialState(self.initial_state, timeout=10)
+            ready_time, error = self.clock(), None
+        except grpc.RpcError as e:
+            ready_time, error = None, e.code().name
+        if not self.done.is_set():
+            self.ready_time, self.error = ready_time, error
+            self.done.set()
+
+
+def run_once(initial_state, engine_delay, timeout, bot_args=()):
+    engine = StandInEngine(initial_state)
+    engine_port, bot_port = free_port(), free_port()
+    command = [
+        sys.executable, os.path.join(ROOT, "main.py"), "--bn", "startup",
+        "--la", f"localhost:{bot_port}", "--gs", f"localhost:{engine_port}", "--no-metrics", *bot_args,
+    ]
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+    game_grpc.add_GameServiceServicer_to_server(engine, server)
+    server.add_insecure_port(f"localhost:{engine_port}")
+
+    spawned = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if engine_delay > 0:
+            time.sleep(engine_delay)
+        server.start()
+        engine_up = time.perf_counter()
+        engine.done.wait(timeout)
+    finally:
+        process.kill()
+        process.wait()
+        server.stop(0)
+    if engine.join_time is None:
+        return None
+    return {
+        "join": engine.join_time - spawned,
+        "ready": engine.ready_time - spawned if engine.ready_time is not None else None,
+        "lag": engine.join_time - engine_up,
+        "error": engine.error,
+    }
+
+
+def mean(values):
+    return sum(values) / len(values) if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--size", type=int, default=43, help="Map side")
+    parser.add_argument("--lighthouses", type=int, default=20)
+    parser.add_argument("--engine-delay", type=float, default=0.0, help="Seconds between spawn and engine start")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--bot-args", type=str, default="", help="Extra main.py arguments, space separated")
+    args = parser.parse_args()
+
+    initial_state = make_initial_state(args.size, args.size, lighthouses=args.lighthouses)
+    bot_args = args.bot_args.split()
+    results = [run_once(initial_state, args.engine_delay, args.timeout, bot_args) for _ in range(args.runs)]
+    joined = [result for result in results if result is not None]
+    ready = [result["ready"] for result in joined if result["ready"] is not None]
+    failures = [result["error"] for result in joined if result["error"] is not None]
+
+    print(f"{args.runs} runs, engine started {args.engine_delay:.2f} s after the bot")
+    print(f"join   {mean([result['join'] for result in joined]) * 1e3:8.1f} ms  ({len(joined)} joined)")
+    print(f"ready  {mean(ready) * 1e3:8.1f} ms  ({len(ready)} ready, {len(failures)} InitialState refused)")
+    print(f"lag    {mean([result['lag'] for result in joined]) * 1e3:8.1f} ms  (engine up to Join)")
+
+
+if __name__ == "__main__":
+    main()
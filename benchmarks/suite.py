@@ -0,0 +1,289 @@
+"""
+Regression suite for the decision path
+
+Every case is a synthetic game (benchmarks.synthetic) of a given map side,
+lighthouse count, link density and player count. The cases sweep one dimension
+at a time around a base case. Per case the suite times:
+
+- new_turn: BotGame.new_turn_action on a stream of turns (mean and p99), and
+  the share of turns where every search stage finished or only the fallback did
+- scoring: the per-beacon compute_ratio loop and the vectorized top_k, with
+  the Manhattan and the walking-distance objective
+- connections: ConnectionGraph.is_legal and triangles on the turn's links
+- serialization: NewTurn to and from bytes
+
+Timings are in microseconds, the fastest of ``--repeat`` runs (at least 3,
+after a warm-up). The runs of a case are taken in rounds that time every
+metric once, so they spread over the case, and the slowest minus the fastest
+run is kept per metric as its ``spread``. The results are written as JSON
+(``--output``); with ``--baseline`` every timed metric is compared with a
+stored run and the ones slower than the baseline by more than ``--tolerance``
+plus the baseline's spread of that metric are flagged. A case with flagged
+metrics is timed again (up to ``CONFIRM_RUNS`` times, keeping the fastest
+runs) since a slow stretch of the whole machine flags every metric it covers;
+what is still flagged after that sets the exit status to 1.
+
+    python -m benchmarks.suite --output baseline.json
+    python -m benchmarks.suite --baseline baseline.json
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import random
+import sys
+import time
+
+import google.protobuf
+import numpy as np
+
+from benchmarks.scoring import per_beacon_loop
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot.connections import ConnectionGraph
+from bot.scheduler import Deadline
+from bot.scoring import path_ratio_objective, ratio_objective
+from internal.handler.coms import game_pb2
+from main import BotGame
+
+BASE = {"size": 43, "lighthouses": 20, "density": 0.2, "players": 2}
+SWEEPS = {
+    "size": (15, 100),
+    "lighthouses": (6, 60),
+    "density": (0.0, 0.5),
+    "players": (4,),
+}
+QUICK = {"size": (), "lighthouses": (60,), "density": (0.5,), "players": ()}
+MIN_REPEAT = 3    # fewer runs give no spread to tell noise from a regression
+CONFIRM_RUNS = 2  # times a case with flagged metrics is timed again before they count
+# Timed metrics, compared against the baseline; the others are informational
+COMPARED = (
+    "new_turn_us", "ratio_loop_us", "ratio_top1_us", "path_top1_us",
+    "is_legal_us", "triangles_us", "serialize_us", "parse_us",
+)
+
+
+def cases(quick=False):
+    """Base case first, then the base with one dimension changed"""
+    found = [dict(BASE)]
+    for key, values in (QUICK if quick else SWEEPS).items():
+        for value in values:
+            found.append({**BASE, key: value})
+    return found
+
+
+def case_name(case):
+    return f"{case['size']}x{case['size']}-lh{case['lighthouses']}-d{case['density']}-p{case['players']}"
+
+
+def timed(function, number):
+    """
+    Microseconds per call of one run of ``number`` calls
+    The garbage collector is off while timing, as in timeit
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        return (time.perf_counter() - start) / number * 1e6
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def play_turns(initial_state, turns, warmup):
+    """new_turn_action seconds of a fresh bot over ``turns`` (the first ``warmup`` left out) and its search stats"""
+    random.seed(0)
+    bot = BotGame(initial_state.PlayerID)
+    samples = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.load_initial_state(initial_state)
+        for index, turn in enumerate(turns):
+            start = time.perf_counter()
+            bot.new_turn_action(turn, Deadline(1.0))
+            if index >= warmup:
+                samples.append(time.perf_counter() - start)
+    bot.close()
+    return samples, bot.scheduler.stats.as_dict()
+
+
+def scoring_probes(bot, turn):
+    engine, position = bot.scoring, (turn.Position.X, turn.Position.Y)
+    number = max(20, 20_000 // len(turn.Lighthouses))
+    return {
+        "ratio_loop_us": (lambda: per_beacon_loop(bot, turn), number, 1),
+        "ratio_top1_us": (lambda: engine.top_k(position, turn.Energy, 1, ratio_objective), number, 1),
+        "path_top1_us": (lambda: engine.top_k(position, turn.Energy, 1, path_ratio_objective), number, 1),
+    }
+
+
+def connection_probes(generator, queries):
+    graph = ConnectionGraph(generator.positions)
+    for a, b in sorted(generator.links):
+        graph.add_link(a, b)
+    rng = random.Random(0)
+    count = len(generator.positions)
+    pairs = [tuple(rng.sample(range(count), 2)) for _ in range(queries)]
+    links = sorted(graph.links) or [(0, 1)]
+
+    def legal():
+        for a, b in pairs:
+            graph.is_legal(a, b)
+
+    def triangles():
+        for a, b in links:
+            graph.triangles(a, b)
+
+    return len(graph.links), {
+        "is_legal_us": (legal, 1, len(pairs)),
+        "triangles_us": (triangles, 1, len(links)),
+    }
+
+
+def serialization_probes(turn):
+    data = turn.SerializeToString()
+    return len(data), {
+        "serialize_us": (turn.SerializeToString, 2_000, 1),
+        "parse_us": (lambda: game_pb2.NewTurn.FromString(data), 2_000, 1),
+    }
+
+
+def run_case(case, turns, warmup, queries, repeat):
+    """
+    Time every metric of ``case`` ``repeat`` times, in rounds that each time every metric
+    once, so a slow stretch of the machine shows up in the spread of all of them
+    A metric is its fastest run; ``spread`` holds its slowest minus its fastest
+    """
+    initial_state = make_initial_state(
+        case["size"], case["size"], lighthouses=case["lighthouses"], players=case["players"],
+    )
+    generator = TurnGenerator(initial_state, connection_density=case["density"])
+    stream = [generator.next_turn() for _ in range(warmup + turns)]
+    last = stream[-1]
+
+    bot = BotGame(initial_state.PlayerID)
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.load_initial_state(initial_state)
+        bot.new_turn_action(last, Deadline(1.0))
+    links, connections = connection_probes(generator, queries)
+    turn_bytes, serialization = serialization_probes(last)
+    probes = {**scoring_probes(bot, last), **connections, **serialization}
+    for function, number, _ in probes.values():
+        timed(function, number)  # warm-up
+
+    runs = {metric: [] for metric in ("new_turn_us", *probes)}
+    fastest = None
+    for _ in range(repeat):
+        samples, search = play_turns(initial_state, stream, warmup)
+        runs["new_turn_us"].append(sum(samples) / len(samples) * 1e6)
+        if fastest is None or sum(samples) < sum(fastest[0]):
+            fastest = samples, search
+        for metric, (function, number, per) in probes.items():
+            runs[metric].append(timed(function, number) / per)
+    bot.close()
+
+    samples, search = fastest
+    ordered = sorted(samples)
+    result = {metric: min(values) for metric, values in runs.items()}
+    result.update({
+        "new_turn_p99_us": ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1e6,
+        "full_depth_rate": search["full_depth_rate"],
+        "fallback_rate": search["fallback_rate"],
+        "links": links,
+        "turn_bytes": turn_bytes,
+        "spread": {metric: max(values) - min(values) for metric, values in runs.items()},
+    })
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """[(case, metric, baseline value, new value, ratio)] of the metrics slower than the tolerance allows"""
+    regressions = []
+    for name, metrics in results["cases"].items():
+        old = baseline.get("cases", {}).get(name)
+        if old is None:
+            continue
+        for metric in COMPARED:
+            if metric in metrics and old.get(metric):
+                ratio = metrics[metric] / old[metric]
+                # The baseline's own run-to-run spread is noise, not a regression
+                noise = old.get("spread", {}).get(metric, 0.0)
+                if metrics[metric] > old[metric] * (1.0 + tolerance) + noise:
+                    regressions.append((name, metric, old[metric], metrics[metric], ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decision path regression suite")
+    parser.add_argument("--turns", type=int, default=300, help="Timed turns per case")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=500, help="Connection checks per case")
+    parser.add_argument(
+        "--repeat", type=int, default=5, help=f"Runs per timing, the fastest counts (at least {MIN_REPEAT})",
+    )
+    parser.add_argument("--quick", action="store_true", help="Fewer cases")
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Slowdown allowed before flagging, 0.2 = 20%%")
+    args = parser.parse_args()
+    args.repeat = max(args.repeat, MIN_REPEAT)
+
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "protobuf": google.protobuf.__version__,
+            "machine": platform.machine(),
+        },
+        "settings": {"turns": args.turns, "warmup": args.warmup, "queries": args.queries, "repeat": args.repeat},
+        "cases": {},
+    }
+    print(
+        f"{'case':<26} {'turn':>8} {'p99':>8} {'loop':>8} {'ratio':>8} {'path':>8} "
+        f"{'legal':>7} {'tri':>7} {'ser':>7} {'parse':>7}  (us)"
+    )
+    for case in cases(args.quick):
+        name = case_name(case)
+        metrics = run_case(case, args.turns, args.warmup, args.queries, args.repeat)
+        results["cases"][name] = {**case, **metrics}
+        print(
+            f"{name:<26} {metrics['new_turn_us']:>8.1f} {metrics['new_turn_p99_us']:>8.1f} "
+            f"{metrics['ratio_loop_us']:>8.1f} {metrics['ratio_top1_us']:>8.1f} {metrics['path_top1_us']:>8.1f} "
+            f"{metrics['is_legal_us']:>7.2f} {metrics['triangles_us']:>7.2f} "
+            f"{metrics['serialize_us']:>7.1f} {metrics['parse_us']:>7.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump(results, stream, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as stream:
+            baseline = json.load(stream)
+        regressions = compare(results, baseline, args.tolerance)
+        for _ in range(CONFIRM_RUNS):
+            suspects = sorted({name for name, *_ in regressions})
+            if not suspects:
+                break
+            print(f"Timing {len(suspects)} cases again to confirm their regressions")
+            for name in suspects:
+                metrics = results["cases"][name]
+                again = run_case({key: metrics[key] for key in BASE}, args.turns, args.warmup, args.queries,
+                                 args.repeat)
+                for metric in COMPARED:
+                    metrics[metric] = min(metrics[metric], again[metric])
+            regressions = compare(results, baseline, args.tolerance)
+        if not regressions:
+            print(f"No regression against {args.baseline} (tolerance {args.tolerance:.0%})")
+            return
+        print(f"{len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for name, metric, old, new, ratio in regressions:
+            print(f"  {name:<26} {metric:<14} {old:9.2f} -> {new:9.2f} us  ({ratio:.2f}x)")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
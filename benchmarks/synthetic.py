@@ -0,0 +1,112 @@
+"""
+Synthetic game data for benchmarks
+Maps have a wall border and random interior walls, lighthouses are placed on playable cells
+"""
+import random
+
+import numpy as np
+
+from internal.handler.coms import game_pb2
+
+
+def make_walkable(width, height, wall_ratio=0.15, seed=0):
+    """Random walkable grid (indexed [y, x]) with a solid border"""
+    rng = np.random.default_rng(seed)
+    walkable = rng.random((height, width)) >= wall_ratio
+    walkable[0, :] = walkable[-1, :] = False
+    walkable[:, 0] = walkable[:, -1] = False
+    return walkable
+
+
+def pick_cells(walkable, count, seed=0):
+    """Pick ``count`` distinct playable cells as (x, y) tuples"""
+    ys, xs = np.nonzero(walkable)
+    cells = list(zip(xs.tolist(), ys.tolist()))
+    random.Random(seed).shuffle(cells)
+    return cells[:count]
+
+
+def make_initial_state(width, height, lighthouses=10, player_id=1, players=2, seed=0):
+    """Build a NewPlayerInitialState for a random map"""
+    walkable = make_walkable(width, height, seed=seed)
+    cells = pick_cells(walkable, lighthouses + 1, seed=seed)
+    start, beacons = cells[0], cells[1:]
+    return game_pb2.NewPlayerInitialState(
+        PlayerID=player_id,
+        PlayerCount=players,
+        Position=game_pb2.Position(X=start[0], Y=start[1]),
+        Map=[game_pb2.MapRow(Row=row.astype(int).tolist()) for row in walkable],
+        Lighthouses=[
+            game_pb2.Lighthouse(Position=game_pb2.Position(X=x, Y=y), Owner=0, Energy=0)
+            for x, y in beacons
+        ],
+    )
+
+
+class TurnGenerator:
+    """
+    Stream of NewTurn messages for one synthetic game
+    Every turn the bot moves and a few lighthouses change owner/energy; the links are drawn
+    once (``connection_density`` of the lighthouse pairs) and stay the same all game
+    """
+
+    def __init__(self, initial_state, view_radius=3, connection_density=0.2, seed=0):
+        self.rng = random.Random(seed)
+        self.initial_state = initial_state
+        self.view_size = view_radius * 2 + 1
+        self.position = (initial_state.Position.X, initial_state.Position.Y)
+        self.walkable = [list(row.Row) for row in initial_state.Map]
+        self.positions = [(lh.Position.X, lh.Position.Y) for lh in initial_state.Lighthouses]
+        self.owners = [0] * len(self.positions)
+        self.energies = [0] * len(self.positions)
+        self.players = max(1, initial_state.PlayerCount)
+        pairs = [
+            (a, b) for a in range(len(self.positions)) for b in range(a + 1, len(self.positions))
+        ]
+        self.links = set(self.rng.sample(pairs, int(len(pairs) * connection_density)))
+        self.energy = 0
+        self.score = 0
+
+    def _walkable(self, x, y):
+        if not self.walkable:
+            return True
+        return 0 <= y < len(self.walkable) and 0 <= x < len(self.walkable[y]) and bool(self.walkable[y][x])
+
+    def next_turn(self, changes=2):
+        rng = self.rng
+        for _ in range(min(changes, len(self.positions))):
+            index = rng.randrange(len(self.positions))
+            self.owners[index] = rng.randrange(self.players + 1)
+            self.energies[index] = rng.randrange(200)
+        self.energy = max(0, self.energy + rng.randrange(-20, 40))
+        self.score += rng.randrange(5)
+        x, y = self.position
+        dx, dy = rng.choice(((-1, 0), (1, 0), (0, -1), (0, 1)))
+        # The bot never walks into a wall or off the map
+        if self._walkable(x + dx, y + dy):
+            self.position = (x + dx, y + dy)
+
+        connections = [[] for _ in self.positions]
+        for a, b in self.links:
+            connections[a].append(game_pb2.Position(X=self.positions[b][0], Y=self.positions[b][1]))
+            connections[b].append(game_pb2.Position(X=self.positions[a][0], Y=self.positions[a][1]))
+        view = [
+            game_pb2.MapRow(Row=[rng.randrange(100) for _ in range(self.view_size)])
+            for _ in range(self.view_size)
+        ]
+        return game_pb2.NewTurn(
+            Position=game_pb2.Position(X=self.position[0], Y=self.position[1]),
+            Score=self.score,
+            Energy=self.energy,
+            View=view,
+            Lighthouses=[
+                game_pb2.Lighthouse(
+                    Position=game_pb2.Position(X=px, Y=py),
+                    Owner=self.owners[index],
+                    Energy=self.energies[index],
+                    Connections=connections[index],
+                    HaveKey=rng.random() < 0.3,
+                )
+                for index, (px, py) in enumerate(self.positions)
+            ],
+        )
@@ -0,0 +1,97 @@
+"""
+Tune the BotGame parameters by self-play
+
+Runs bot.tuning's successive halving on a process pool: candidate parameter
+sets (attack probability, defend threshold and the two exponents of the
+compute_ratio formula) play local matches against each other until one is
+left. Results go to ``--checkpoint`` as they come in; running the same command
+again after an interruption resumes from there with the stored configuration.
+Reports the best parameters and the throughput in matches per minute per core.
+
+    python -m benchmarks.tuning --candidates 16 --matches 2 --workers 4
+    python -m benchmarks.tuning --checkpoint tuning.json    # resume
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from bot.tuning import Checkpoint, SuccessiveHalving, sample_candidates
+from main import BotGame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-play parameter tuning")
+    parser.add_argument("--checkpoint", default="tuning.json", help="Results file, resumed when it exists")
+    parser.add_argument("--candidates", type=int, default=16)
+    parser.add_argument("--matches", type=int, default=2, help="Matches per candidate in the first round")
+    parser.add_argument("--eta", type=int, default=2, help="1 / eta of the candidates go on each round")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--size", type=int, default=25, help="Map side")
+    parser.add_argument("--lighthouses", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    checkpoint = Checkpoint(args.checkpoint)
+    if checkpoint.load():
+        print(f"Resuming {args.checkpoint}: {len(checkpoint.results)} matches already played")
+    else:
+        checkpoint.config = {
+            "matches": args.matches,
+            "eta": max(2, args.eta),
+            "seed": args.seed,
+            "game": {"width": args.size, "height": args.size, "lighthouses": args.lighthouses, "turns": args.turns},
+        }
+        checkpoint.candidates = sample_candidates(args.candidates, args.seed)
+        checkpoint.save()
+
+    workers = max(1, args.workers)
+    cores = min(workers, os.cpu_count() or 1)
+    tuner = SuccessiveHalving(checkpoint, BotGame)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        best = tuner.run(pool)
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        print(f"Interrupted with {len(checkpoint.results)} matches in {args.checkpoint}, run again to resume")
+        return
+    except RuntimeError as error:
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise SystemExit(f"Tuning stopped: {error}")
+    pool.shutdown()
+
+    minutes = tuner.elapsed / 60
+    report = {
+        "best": checkpoint.candidates[best],
+        "best_index": best,
+        "matches_played": tuner.played,
+        "matches_total": len(checkpoint.results),
+        "workers": workers,
+        "cores": cores,
+        "matches_per_minute_per_core": tuner.played / minutes / cores if minutes else 0.0,
+        "mean_match_seconds": tuner.match_seconds / tuner.played if tuner.played else 0.0,
+        "rounds": [
+            {"round": number, "ranking": [
+                {"candidate": index, "share": share, "matches": matches} for index, share, matches in ranking
+            ]}
+            for number, ranking in tuner.rounds
+        ],
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(
+        f"{tuner.played} matches played ({report['matches_total']} in the checkpoint) in {tuner.elapsed:.1f} s "
+        f"on {workers} workers, {cores} cores: {report['matches_per_minute_per_core']:.1f} matches/min/core, "
+        f"{report['mean_match_seconds']:.2f} s per match"
+    )
+    final = tuner.rounds[-1][1] if tuner.rounds else []
+    for index, share, matches in final:
+        marker = "*" if index == best else " "
+        print(f" {marker} #{index:<3} share {share:.3f} over {matches:3d} matches  {checkpoint.candidates[index]}")
+
+
+if __name__ == "__main__":
+    main()
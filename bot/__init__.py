@@ -0,0 +1 @@
+"""Support subsystems for the Lighthouses bot (navigation, planning, infrastructure)"""
@@ -0,0 +1,72 @@
+"""
+Pooled NewAction messages
+
+A turn answer is one of a handful of shapes: a move to a neighbouring cell, a
+connect to a lighthouse, an attack on the lighthouse we stand on, or a pass.
+ActionPool builds each message once and hands out the same object on every
+later turn, so the response path does not build protobuf messages. Moves are
+built on first use per destination cell; connects and attacks are built up
+front for every lighthouse by ``prebuild``.
+
+MOVE, CONNECT and PASS messages never change once built. There is one ATTACK
+message per cell and ``attack`` rewrites its Energy, so an attack is valid
+until the next attack on that cell: serialize or copy it before then (the
+gRPC response, TurnHistory and ReplayWriter all do so within the turn).
+"""
+from internal.handler.coms import game_pb2
+
+
+class ActionPool:
+    def __init__(self):
+        self.moves = {}
+        self.connects = {}
+        self.attacks = {}
+        self.pass_action = game_pb2.NewAction(Action=game_pb2.PASS)
+
+    def prebuild(self, positions):
+        """Connect and attack messages for the lighthouses at ``positions``"""
+        for x, y in positions:
+            self.connect(x, y)
+            self.attack(x, y, 0)
+
+    def move(self, x, y):
+        key = (x, y)
+        action = self.moves.get(key)
+        if action is None:
+            action = self.moves[key] = game_pb2.NewAction(
+                Action=game_pb2.MOVE, Destination=game_pb2.Position(X=x, Y=y)
+            )
+        return action
+
+    def step(self, position, move):
+        """Move from ``position`` by the vector ``move``"""
+        return self.move(position[0] + move[0], position[1] + move[1])
+
+    def connect(self, x, y):
+        key = (x, y)
+        action = self.connects.get(key)
+        if action is None:
+            action = self.connects[key] = game_pb2.NewAction(
+                Action=game_pb2.CONNECT, Destination=game_pb2.Position(X=x, Y=y)
+            )
+        return action
+
+    def attack(self, x, y, energy):
+        key = (x, y)
+        action = self.attacks.get(key)
+        if action is None:
+            action = self.attacks[key] = game_pb2.NewAction(
+                Action=game_pb2.ATTACK, Destination=game_pb2.Position(X=x, Y=y)
+            )
+        action.Energy = energy
+        return action
+
+    def build(self, kind, x, y, energy=0):
+        """Pooled message for an (action, x, y, energy) tuple as the planners produce them"""
+        if kind == game_pb2.MOVE:
+            return self.move(x, y)
+        if kind == game_pb2.CONNECT:
+            return self.connect(x, y)
+        if kind == game_pb2.ATTACK:
+            return self.attack(x, y, energy)
+        return self.pass_action
@@ -0,0 +1,127 @@
+"""
+Asyncio gRPC mode for the bot endpoint
+
+The threaded server hands every call to a pool of 10 threads. Here a grpc.aio
+server owns the calls on one event loop, and the turn computation runs on a
+dedicated single-thread executor so the loop is never blocked by a decision.
+The servicer wraps the synchronous ClientServer, so both modes share the same
+BotGame handling. The turn deadline is taken on the event loop, from the call
+context, before the work is handed over.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+from grpc import aio
+
+from bot.metrics import NULL_METRICS
+from bot.startup import JOIN_CHANNEL_OPTIONS, Backoff
+from internal.handler.coms import game_pb2
+from internal.handler.coms import game_pb2_grpc as game_grpc
+
+
+class AioServerInterceptor(aio.ServerInterceptor):
+    """
+    Async twin of main.ServerInterceptor: times the real handler and the request parsing
+    Wrapped handlers are built once per method and reused
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self._handlers = {}
+
+    async def intercept_service(self, continuation, handler_call_details):
+        method_name = handler_call_details.method
+        handler = self._handlers.get(method_name)
+        if handler is not None:
+            return handler
+
+        handler = await continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None or not self.metrics.enabled:
+            return handler
+
+        behavior = handler.unary_unary
+        deserializer = handler.request_deserializer
+        latency = self.metrics.histogram(f"rpc{method_name}")
+        parsing = self.metrics.histogram(f"parse{method_name}")
+        clock = time.perf_counter
+
+        async def timed_behavior(request, context):
+            start_time = clock()
+            try:
+                return await behavior(request, context)
+            finally:
+                latency.observe(clock() - start_time)
+
+        def timed_deserializer(data):
+            start_time = clock()
+            try:
+                return deserializer(data)
+            finally:
+                parsing.observe(clock() - start_time)
+
+        handler = grpc.unary_unary_rpc_method_handler(
+            timed_behavior,
+            request_deserializer=timed_deserializer if deserializer is not None else None,
+            response_serializer=handler.response_serializer,
+        )
+        self._handlers[method_name] = handler
+        return handler
+
+
+class AioClientServer(game_grpc.GameServiceServicer):
+    """
+    Async servicer around a synchronous ClientServer
+    Decisions run one at a time on the ``turn`` worker thread
+    """
+
+    def __init__(self, client_server):
+        self.cs = client_server
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="turn")
+
+    @property
+    def bg(self):
+        return self.cs.bg
+
+    async def Join(self, request, context):
+        return None
+
+    async def InitialState(self, request, context):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.cs.initial_state, request)
+
+    async def Turn(self, request, context):
+        deadline = self.cs.bg.scheduler.deadline(context)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.cs.turn, request, deadline)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+
+async def serve(client_server, address, metrics=None):
+    """
+    Start a grpc.aio server for ``client_server`` on ``address``, returns (server, servicer)
+    Must be awaited inside the event loop that will run the server
+    """
+    server = aio.server(interceptors=(AioServerInterceptor(metrics),))
+    servicer = AioClientServer(client_server)
+    game_grpc.add_GameServiceServicer_to_server(servicer, server)
+    server.add_insecure_port(address)
+    await server.start()
+    return server, servicer
+
+
+async def join(game_server_address, bot_name, my_address, timeout=1.0, backoff=None, log=print):
+    """Same as bot.startup.join, on a grpc.aio channel"""
+    backoff = backoff if backoff is not None else Backoff()
+    player = game_pb2.NewPlayer(name=bot_name, serverAddress=my_address)
+    async with aio.insecure_channel(game_server_address, options=JOIN_CHANNEL_OPTIONS) as channel:
+        client = game_grpc.GameServiceStub(channel)
+        while True:
+            try:
+                return await client.Join(player, timeout=timeout, wait_for_ready=True)
+            except grpc.RpcError as e:
+                log(f"Could not join game: {e.details()}")
+                await asyncio.sleep(backoff.next_delay())
@@ -0,0 +1,323 @@
+"""
+Beam search over our own action sequences
+
+The greedy strategies look one decision ahead. BeamPlanner searches sequences
+of macro actions instead, so it can see that capturing A, walking to B,
+capturing B and linking A-B pays more than the best single target:
+
+- ``capture``: walk to a lighthouse we do not own, picking up the energy on the
+  way, and attack it with enough to hold it until the horizon
+- ``visit``: walk to a lighthouse of ours to pick up its key
+- ``connect``: link the lighthouse we stand on to one whose key we hold
+
+A node is a small immutable record: ownership and keys are bitsets over the
+lighthouse ids (Python ints), our links are one adjacency bitset per lighthouse,
+and energies come from the arrays of the LighthouseIndex and the EnergyField of
+the turn. Each level keeps the ``width`` nodes with the highest expected score,
+the points gained so far plus their rate until the ``horizon``. Captures are
+only tried for the ``branching`` best lighthouses of the ScoringEngine objective
+seen from the node, and the search stops at ``depth`` levels or at the deadline,
+returning the first action of the best sequence found. The deadline is checked
+between the candidates of an expansion, and a new expansion only starts when
+its average cost fits before the slack.
+
+Opponents are not simulated: lighthouses of others lose LIGHTHOUSE_DECAY per
+turn until they turn neutral, ours are assumed to be kept.
+"""
+import heapq
+import time
+
+import numpy as np
+
+from bot.connections import segments_intersect, triangle_cells
+from bot.metrics import SMOOTHING
+from bot.navigation import UNREACHABLE
+from bot.simulation import CONNECTION_POINTS, LIGHTHOUSE_DECAY, LIGHTHOUSE_POINTS, NEUTRAL
+
+CAPTURE, VISIT, CONNECT = "capture", "visit", "connect"
+
+DEFAULT_DEPTH = 4
+DEFAULT_WIDTH = 8
+DEFAULT_BRANCHING = 6
+DEFAULT_HORIZON = 40
+ENERGY_WEIGHT = 0.01  # value of a unit of energy left at the end, a tie breaker
+
+
+class BeamNode:
+    __slots__ = ("lh", "turns", "energy", "owned", "keys", "adjacency", "added", "points", "rate",
+                 "parent", "action")
+
+    def __init__(self, lh, turns, energy, owned, keys, adjacency, added, points, rate, parent, action):
+        self.lh = lh                # lighthouse we stand on, None when not on one
+        self.turns = turns          # turns since the root
+        self.energy = energy
+        self.owned = owned          # bitset of our lighthouses
+        self.keys = keys            # bitset of the keys we hold
+        self.adjacency = adjacency  # tuple of bitsets, our links per lighthouse
+        self.added = added          # links made along the sequence, ((a, b), ...)
+        self.points = points        # points gained since the root
+        self.rate = rate            # points per turn gained on top of the root's
+        self.parent = parent
+        self.action = action        # (kind, lighthouse, energy) that led here
+
+    def value(self, horizon):
+        return self.points + self.rate * (horizon - self.turns) + ENERGY_WEIGHT * self.energy
+
+    def sequence(self):
+        actions, node = [], self
+        while node.parent is not None:
+            actions.append(node.action)
+            node = node.parent
+        actions.reverse()
+        return actions
+
+
+class BeamResult:
+    __slots__ = ("action", "sequence", "value", "expanded", "elapsed", "complete")
+
+    def __init__(self, action, sequence, value, expanded, elapsed, complete):
+        self.action = action        # first (kind, lighthouse, energy) of the best sequence, or None
+        self.sequence = sequence
+        self.value = value
+        self.expanded = expanded    # nodes whose children were generated
+        self.elapsed = elapsed
+        self.complete = complete    # False when the deadline cut the search short
+
+    @property
+    def nodes_per_second(self):
+        return self.expanded / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _bits(bitset):
+    while bitset:
+        low = bitset & -bitset
+        yield low.bit_length() - 1
+        bitset ^= low
+
+
+class BeamPlanner:
+    """
+    Beam search on the live structures of a BotGame (index, connections, scoring, navigation)
+    ``plan`` reads them once per turn; the searched nodes never touch them
+    """
+
+    def __init__(self, index, connections, scoring, navigation, energy_field=None, depth=DEFAULT_DEPTH,
+                 width=DEFAULT_WIDTH, branching=DEFAULT_BRANCHING, horizon=DEFAULT_HORIZON, deadline_slack=0.001):
+        self.index = index
+        self.connections = connections
+        self.scoring = scoring
+        self.navigation = navigation
+        self.energy_field = energy_field
+        self.depth = depth
+        self.width = width
+        self.branching = branching
+        self.horizon = horizon
+        self.deadline_slack = deadline_slack
+        count = len(index)
+        # Walking distance between lighthouses, from the precomputed fields
+        self.lh_dist = navigation.target_dist[:, index.ys, index.xs].T.astype(np.int32)
+        self._triangles = {}
+        self._paths = {}  # (lighthouse, lighthouse) -> flat indices of the cells of the path
+        self.total_expanded = 0
+        self.total_seconds = 0.0
+        self.expand_seconds = 0.0  # smoothed time of one expand, kept in reserve before the next
+        # Filled per turn by plan
+        self._root_dist = np.zeros(count, dtype=np.int32)
+        self._lh_energy = [0] * count
+        self._lh_owner = [NEUTRAL] * count
+        self._legal = {}
+        self._gains = {}
+        self._estimate = None
+
+    def root(self, position, energy):
+        """Node of the current turn"""
+        index = self.index
+        owned = keys = 0
+        for lh_id in index.owned:
+            owned |= 1 << lh_id
+        for lh_id in np.flatnonzero(index.have_key).tolist():
+            keys |= 1 << lh_id
+        adjacency = [0] * len(index)
+        for lh_id in index.owned:
+            for other in index.neighbours[lh_id]:
+                adjacency[lh_id] |= 1 << other
+        return BeamNode(index.ids.get(position), 0, energy, owned, keys, tuple(adjacency), (), 0.0, 0.0, None, None)
+
+    def plan(self, position, energy, turn, deadline=None):
+        """Best sequence from ``position`` with ``energy`` on ``turn``; BeamResult.action is None to pass"""
+        start = time.perf_counter()
+        index = self.index
+        self._lh_energy = index.energy.tolist()
+        self._lh_owner = index.owner.tolist()
+        self._root_dist = self.navigation.target_distances(position).astype(np.int32)
+        self._legal.clear()
+        self._gains.clear()
+        self._estimate = self.energy_field.estimate(turn + 1) if self.energy_field is not None else None
+
+        root = self.root(position, energy)
+        best, best_value = root, root.value(self.horizon)
+        beam, expanded, complete = [root], 0, True
+        horizon = self.horizon
+        for _ in range(self.depth):
+            children = []
+            for node in beam:
+                # An expansion is only started when one of average cost still ends inside the slack
+                if deadline is not None and deadline.remaining() < self.deadline_slack + self.expand_seconds:
+                    complete = False
+                    break
+                expand_start = time.perf_counter()
+                children.extend(self.expand(node, position, deadline))
+                self.expand_seconds += SMOOTHING * (time.perf_counter() - expand_start - self.expand_seconds)
+                expanded += 1
+                if deadline is not None and deadline.remaining() < self.deadline_slack:
+                    complete = False
+                    break
+            if not children:
+                break
+            # Only the kept nodes are ordered, the rest of the level costs one value() each
+            beam = heapq.nlargest(self.width, children, key=lambda child: child.value(horizon))
+            if beam[0].value(horizon) > best_value:
+                best, best_value = beam[0], beam[0].value(horizon)
+            if not complete:
+                break
+
+        elapsed = time.perf_counter() - start
+        self.total_expanded += expanded
+        self.total_seconds += elapsed
+        sequence = best.sequence()
+        return BeamResult(sequence[0] if sequence else None, sequence, best_value, expanded, elapsed, complete)
+
+    @property
+    def nodes_per_second(self):
+        return self.total_expanded / self.total_seconds if self.total_seconds > 0 else 0.0
+
+    def expand(self, node, root_position, deadline=None):
+        """
+        Children of ``node``: connects from where it stands, then walks to the best candidates
+        Stops early, with the children found so far, when ``deadline`` gets within the slack
+        """
+        children = []
+        index = self.index
+        lh = node.lh
+        if lh is not None and node.owned >> lh & 1:
+            for other in _bits(node.keys & node.owned & ~node.adjacency[lh] & ~(1 << lh)):
+                if self.can_connect(node, lh, other):
+                    children.append(self.connect(node, lh, other))
+
+        if lh is None:
+            position, dist = root_position, self._root_dist
+        else:
+            position, dist = index.positions[lh], self.lh_dist[lh]
+        scores = self.scoring.score(position, node.energy, exclude_owned=False)
+        for lh_id in _bits(node.owned & node.keys):
+            scores[lh_id] = -np.inf  # nothing left to gain there
+        if lh is not None:
+            scores[lh] = -np.inf
+        count = min(self.branching, len(scores))
+        if count == 0:
+            return children
+        candidates = np.argpartition(-scores, count - 1)[:count] if count < len(scores) else np.arange(count)
+        for lh_id in candidates.tolist():
+            if deadline is not None and deadline.remaining() < self.deadline_slack:
+                return children
+            if scores[lh_id] == -np.inf or dist[lh_id] >= UNREACHABLE:
+                continue
+            child = self.walk(node, position, lh_id, int(dist[lh_id]))
+            if child is not None:
+                children.append(child)
+        # Standing on a lighthouse we do not own yet: take it without walking
+        if lh is not None and not node.owned >> lh & 1:
+            child = self.walk(node, position, lh, 0)
+            if child is not None:
+                children.append(child)
+        return children
+
+    def walk(self, node, position, lh_id, distance):
+        """Walk to ``lh_id`` and capture it (or just pick up the key when it is ours)"""
+        turns = node.turns + distance
+        if turns >= self.horizon:
+            return None
+        energy = node.energy + self.gain(position, lh_id)
+        bit = 1 << lh_id
+        points = node.points + node.rate * distance
+        if node.owned & bit:
+            return BeamNode(lh_id, turns, energy, node.owned, node.keys | bit, node.adjacency, node.added,
+                            points, node.rate, node, (VISIT, lh_id, 0))
+        held = self._lh_energy[lh_id]
+        if self._lh_owner[lh_id] != NEUTRAL:
+            held = max(0, held - LIGHTHOUSE_DECAY * turns)
+        need = held + 1
+        if energy < need:
+            return None
+        turns += 1  # the attack
+        remaining = self.horizon - turns
+        amount = min(energy, need + LIGHTHOUSE_DECAY * remaining)
+        lifetime = (amount - need) // LIGHTHOUSE_DECAY
+        owned, rate = node.owned, node.rate
+        if lifetime >= remaining:
+            owned |= bit
+            rate += LIGHTHOUSE_POINTS
+        else:
+            # Lost before the horizon: count its points, but no links to it
+            points += LIGHTHOUSE_POINTS * lifetime
+        return BeamNode(lh_id, turns, energy - amount, owned, node.keys | bit, node.adjacency, node.added,
+                        points + node.rate, rate, node, (CAPTURE, lh_id, amount))
+
+    def connect(self, node, a, b):
+        adjacency = list(node.adjacency)
+        adjacency[a] |= 1 << b
+        adjacency[b] |= 1 << a
+        gained = CONNECTION_POINTS
+        for c in _bits(node.adjacency[a] & node.adjacency[b]):
+            gained += self.triangle(a, b, c)
+        return BeamNode(a, node.turns + 1, node.energy, node.owned, node.keys & ~(1 << b), tuple(adjacency),
+                        node.added + ((a, b),), node.points + node.rate, node.rate + gained, node, (CONNECT, b, 0))
+
+    def can_connect(self, node, a, b):
+        """Legal against the links of the turn (ConnectionGraph) and against those made along the sequence"""
+        key = (a, b) if a < b else (b, a)
+        legal = self._legal.get(key)
+        if legal is None:
+            legal = self._legal[key] = self.connections.is_legal(a, b)
+        if not legal:
+            return False
+        positions = self.index.positions
+        pa, pb = positions[a], positions[b]
+        for c, d in node.added:
+            if c == a or c == b or d == a or d == b:
+                continue
+            if segments_intersect(pa, pb, positions[c], positions[d]):
+                return False
+        return True
+
+    def triangle(self, a, b, c):
+        key = tuple(sorted((a, b, c)))
+        cells = self._triangles.get(key)
+        if cells is None:
+            positions = self.index.positions
+            cells = self._triangles[key] = triangle_cells(positions[a], positions[b], positions[c])
+        return cells
+
+    def gain(self, position, lh_id):
+        """Energy expected on the cells of the shortest path from ``position`` to ``lh_id``"""
+        if self._estimate is None:
+            return 0
+        key = (position, lh_id)
+        gain = self._gains.get(key)
+        if gain is None:
+            gain = self._gains[key] = int(self._estimate.take(self.path_cells(position, lh_id)).sum())
+        return gain
+
+    def path_cells(self, position, lh_id):
+        """Flat cell indices of the shortest path, kept for the game between lighthouses"""
+        source = self.index.ids.get(position)
+        cells = self._paths.get((source, lh_id)) if source is not None else None
+        if cells is None:
+            (x, y), width, flat = position, self.navigation.width, []
+            for dx, dy in self.navigation.path(position, self.index.positions[lh_id]):
+                x, y = x + dx, y + dy
+                flat.append(y * width + x)
+            cells = np.array(flat, dtype=np.intp)
+            if source is not None:
+                self._paths[(source, lh_id)] = cells
+        return cells
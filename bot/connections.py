@@ -0,0 +1,173 @@
+"""
+Connection graph and link geometry
+
+Keeps the current set of links between lighthouses and answers the legality
+questions of a new link: it must not cross an existing link and must not pass
+over another lighthouse. Links and lighthouses are bucketed in a uniform grid,
+so a query only looks at the buckets the candidate segment goes through.
+"""
+from math import gcd
+
+
+def orientation(p, q, r):
+    """Sign of the cross product (q - p) x (r - p): 1 left turn, -1 right turn, 0 collinear"""
+    value = (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+    return (value > 0) - (value < 0)
+
+
+def on_segment(p, q, r):
+    """True when ``r`` lies on the closed segment p-q"""
+    return (
+        orientation(p, q, r) == 0
+        and min(p[0], q[0]) <= r[0] <= max(p[0], q[0])
+        and min(p[1], q[1]) <= r[1] <= max(p[1], q[1])
+    )
+
+
+def segments_intersect(p1, p2, q1, q2):
+    """True when the closed segments p1-p2 and q1-q2 share at least one point"""
+    o1, o2 = orientation(p1, p2, q1), orientation(p1, p2, q2)
+    o3, o4 = orientation(q1, q2, p1), orientation(q1, q2, p2)
+    if o1 != o2 and o3 != o4:
+        return True
+    return (
+        (o1 == 0 and on_segment(p1, p2, q1))
+        or (o2 == 0 and on_segment(p1, p2, q2))
+        or (o3 == 0 and on_segment(q1, q2, p1))
+        or (o4 == 0 and on_segment(q1, q2, p2))
+    )
+
+
+def triangle_cells(a, b, c):
+    """
+    Number of map cells inside or on the border of triangle a-b-c
+    Pick's theorem: inside + border = area + border / 2 + 1
+    """
+    doubled_area = abs((b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1]))
+    border = sum(
+        gcd(abs(p[0] - q[0]), abs(p[1] - q[1])) for p, q in ((a, b), (b, c), (c, a))
+    )
+    return (doubled_area + border) // 2 + 1
+
+
+class ConnectionGraph:
+    """
+    Links between lighthouse ids (as in LighthouseIndex) plus a bucket grid
+    ``bucket_size`` is the side of a bucket in map cells
+    """
+
+    def __init__(self, positions, bucket_size=8):
+        self.positions = [tuple(pos) for pos in positions]
+        self.bucket_size = bucket_size
+        self.links = set()
+        self.neighbours = [set() for _ in self.positions]
+        self._link_buckets = {}
+        self._point_buckets = {}
+        for lh_id, (x, y) in enumerate(self.positions):
+            key = (x // bucket_size, y // bucket_size)
+            self._point_buckets.setdefault(key, []).append(lh_id)
+
+    def _buckets(self, a, b):
+        """Buckets touched by the segment between lighthouses ``a`` and ``b`` (supercover)"""
+        (x0, y0), (x1, y1) = self.positions[a], self.positions[b]
+        if x0 > x1:
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        size = self.bucket_size
+        for bx in range(x0 // size, x1 // size + 1):
+            if x1 == x0:
+                y_lo, y_hi = min(y0, y1), max(y0, y1)
+            else:
+                lo, hi = max(x0, bx * size), min(x1, (bx + 1) * size)
+                slope = (y1 - y0) / (x1 - x0)
+                ya, yb = y0 + (lo - x0) * slope, y0 + (hi - x0) * slope
+                y_lo, y_hi = min(ya, yb), max(ya, yb)
+            for by in range(int(y_lo // size), int(y_hi // size) + 1):
+                yield bx, by
+
+    @staticmethod
+    def _key(a, b):
+        return (a, b) if a < b else (b, a)
+
+    def add_link(self, a, b):
+        key = self._key(a, b)
+        if key in self.links:
+            return
+        self.links.add(key)
+        self.neighbours[a].add(b)
+        self.neighbours[b].add(a)
+        for bucket in self._buckets(*key):
+            self._link_buckets.setdefault(bucket, set()).add(key)
+
+    def remove_link(self, a, b):
+        key = self._key(a, b)
+        if key not in self.links:
+            return
+        self.links.discard(key)
+        self.neighbours[a].discard(b)
+        self.neighbours[b].discard(a)
+        for bucket in self._buckets(*key):
+            links = self._link_buckets.get(bucket)
+            if links is not None:
+                links.discard(key)
+                if not links:
+                    del self._link_buckets[bucket]
+
+    def sync(self, neighbours, changed_ids):
+        """Bring the links of ``changed_ids`` in line with LighthouseIndex.neighbours"""
+        for lh_id in changed_ids:
+            current, wanted = self.neighbours[lh_id], neighbours[lh_id]
+            for other in current - wanted:
+                self.remove_link(lh_id, other)
+            for other in wanted - current:
+                self.add_link(lh_id, other)
+
+    def _iter_crossing(self, a, b):
+        pa, pb = self.positions[a], self.positions[b]
+        positions, seen = self.positions, set()
+        for bucket in self._buckets(a, b):
+            for link in self._link_buckets.get(bucket, ()):
+                if link in seen:
+                    continue
+                seen.add(link)
+                c, d = link
+                if c == a or c == b or d == a or d == b:
+                    continue
+                if segments_intersect(pa, pb, positions[c], positions[d]):
+                    yield link
+
+    def _iter_on_segment(self, a, b):
+        pa, pb = self.positions[a], self.positions[b]
+        positions = self.positions
+        for bucket in self._buckets(a, b):
+            for lh_id in self._point_buckets.get(bucket, ()):
+                if lh_id != a and lh_id != b and on_segment(pa, pb, positions[lh_id]):
+                    yield lh_id
+
+    def crossing_links(self, a, b):
+        """Existing links that a new link a-b would cross (links sharing an end are fine)"""
+        return list(self._iter_crossing(a, b))
+
+    def lighthouses_on(self, a, b):
+        """Lighthouses other than ``a`` and ``b`` lying exactly on the segment a-b"""
+        return sorted(set(self._iter_on_segment(a, b)))
+
+    def is_legal(self, a, b):
+        """True when a-b is a new link that crosses nothing and passes over no lighthouse"""
+        if a == b or self._key(a, b) in self.links:
+            return False
+        for _ in self._iter_on_segment(a, b):
+            return False
+        for _ in self._iter_crossing(a, b):
+            return False
+        return True
+
+    def triangles(self, a, b):
+        """(third lighthouse, cells) for every triangle the link a-b would close"""
+        pa, pb = self.positions[a], self.positions[b]
+        return [
+            (c, triangle_cells(pa, pb, self.positions[c]))
+            for c in sorted(self.neighbours[a] & self.neighbours[b])
+        ]
+
+    def triangle_score(self, a, b):
+        return sum(cells for _, cells in self.triangles(a, b))
@@ -0,0 +1,324 @@
+"""
+Energy estimate of the whole map from the per-turn View
+
+Every NewTurn.View is a window of the current cell energies around the bot.
+EnergyField merges each window into a full-map array, with the turn each cell
+was last seen. Cells regenerate every round by a fixed amount that depends only
+on the lighthouse positions (bot.simulation.regen_field), so the estimate for
+any later turn is the last value plus the regeneration since, capped. Other
+players harvesting out of sight is the one thing it cannot know.
+
+``route`` picks the path towards a destination that collects the most energy
+while arriving within a given number of turns. It runs a dynamic program over
+(steps, cell) with the 8 moves read from 3x3 windows, limited to the cells that
+can lie on such a path and to a rolling horizon of moves. A cell met again is
+only credited with what it regenerated since the path harvested it.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from bot.navigation import MOVES, UNREACHABLE
+from bot.simulation import CELL_ENERGY_MAX, regen_field
+
+_NO_PATH = -1
+# route keys: value << _KEY_BITS | move bits << 1 | second; the move bits are
+# 7 - move index so that ties go to the first move, 8 marks the start cell
+_KEY_BITS = 5
+_VALUE_MASK = np.int32(-1 << _KEY_BITS)
+_CODE_MASK = np.int32((1 << _KEY_BITS) - 1)
+_MOVE_MASK = np.int32(0b1111)
+# Far enough below 0 that adding gains never brings it back
+_NO_KEY = np.int32(-1 << 30)
+_START_KEY = np.int32(len(MOVES) << 1)
+_BELOW_KEYS = np.iinfo(np.int32).min
+_ROWS = np.array([1 - dy for _, dy in MOVES])
+_COLUMNS = np.array([1 - dx for dx, _ in MOVES])
+_MOVE_BITS = np.array(
+    [(len(MOVES) - 1 - index) << 1 for index in range(len(MOVES))], dtype=np.int32,
+)[:, None, None]
+# Arriving by MOVES[i] from a neighbour that its best path entered by the opposite move goes back
+_REVERSE_BITS = np.array(
+    [len(MOVES) - 1 - MOVES.index((-dx, -dy)) for dx, dy in MOVES], dtype=np.int32,
+)[:, None, None]
+
+
+class Scratch:
+    """
+    Reusable work arrays, one flat buffer per name grown to the largest request
+    ``take`` returns a contiguous view that stays valid until the next ``take`` of that name
+    """
+
+    def __init__(self):
+        self.buffers = {}
+
+    def take(self, name, shape, dtype):
+        size = 1
+        for dim in shape:
+            size *= dim
+        buffer = self.buffers.get(name)
+        if buffer is None or buffer.size < size or buffer.dtype != dtype:
+            buffer = self.buffers[name] = np.empty(max(size, 1), dtype=dtype)
+        return buffer[:size].reshape(shape)
+
+
+class EnergyRoute:
+    __slots__ = ("moves", "energy", "turns")
+
+    def __init__(self, moves, energy, turns):
+        self.moves = moves      # [(dx, dy)] from the source to the destination
+        self.energy = energy    # energy collected on the way, estimated
+        self.turns = turns
+
+
+class EnergyField:
+    """Last seen energy and regeneration of every cell, indexed [y, x]"""
+
+    def __init__(self, walkable, regen, cell_max=CELL_ENERGY_MAX):
+        self.walkable = np.ascontiguousarray(walkable, dtype=bool)
+        self.height, self.width = self.walkable.shape
+        self.regen = np.asarray(regen, dtype=np.int32)
+        self.cell_max = cell_max
+        self.energy = np.zeros(self.walkable.shape, dtype=np.int32)
+        self.last_seen = np.zeros(self.walkable.shape, dtype=np.int32)
+        self._arrivals = {}  # destination -> turn we promised to be there by
+        self._walls = ~self.walkable
+        self._scratch = Scratch()
+
+    @classmethod
+    def build(cls, walkable, positions, regen=None):
+        """Field of a map; ``regen`` is the map's regen_field when already known (bot.maps caches it)"""
+        if regen is None:
+            regen = regen_field(np.ascontiguousarray(walkable, dtype=bool), positions)
+        return cls(walkable, regen)
+
+    def observe(self, turn, position, view):
+        """
+        Merge a View (rows of energy centred on ``position``, -1 outside the map) seen on ``turn``
+        """
+        rows = len(view)
+        if rows == 0 or len(view[0].Row) == 0:
+            return
+        window = self._scratch.take("view", (rows, len(view[0].Row)), np.int32)
+        for index, row in enumerate(view):
+            # Through a list: numpy reads a plain list far faster than the repeated field
+            window[index] = list(row.Row)
+        radius = window.shape[0] // 2
+        x0, y0 = position.X - radius, position.Y - radius
+        # Clip the window to the map
+        top, left = max(0, -y0), max(0, -x0)
+        bottom = min(window.shape[0], self.height - y0)
+        right = min(window.shape[1], self.width - x0)
+        if top >= bottom or left >= right:
+            return
+        window = window[top:bottom, left:right]
+        cells = (slice(y0 + top, y0 + bottom), slice(x0 + left, x0 + right))
+        seen = (window >= 0) & self.walkable[cells]
+        self.energy[cells][seen] = window[seen]
+        self.last_seen[cells][seen] = turn
+
+    def harvested(self, x, y, turn):
+        """Our bot emptied cell (x, y) on ``turn``"""
+        self.energy[y, x] = 0
+        self.last_seen[y, x] = turn
+
+    def estimate(self, turn, cells=(slice(None), slice(None)), out=None):
+        """
+        Expected energy of every cell (or of the ``cells`` window) on ``turn``
+        Written into ``out`` when given, an int32 array of the window's shape
+        """
+        last_seen = self.last_seen[cells]
+        if out is None:
+            out = np.empty(last_seen.shape, dtype=np.int32)
+        np.subtract(turn, last_seen, out=out)
+        np.maximum(out, 0, out=out)
+        np.multiply(out, self.regen[cells], out=out)
+        np.add(out, self.energy[cells], out=out)
+        np.minimum(out, self.cell_max, out=out)
+        np.copyto(out, 0, where=self._walls[cells])
+        return out
+
+    def cell_estimate(self, x, y, turn):
+        """``estimate`` of the single cell (x, y), without touching arrays of the window"""
+        if not self.walkable[y, x]:
+            return 0
+        elapsed = max(0, turn - int(self.last_seen[y, x]))
+        return min(self.cell_max, int(self.energy[y, x]) + elapsed * int(self.regen[y, x]))
+
+    def route(self, source, destination, navigation, turn, slack=2, horizon=24):
+        """
+        Path from ``source`` towards ``destination`` that harvests the most energy
+        and arrives at most ``slack`` turns later than the shortest path
+        Only the first ``horizon`` moves are optimised, a longer trip returns the best
+        partial path (every cell on it still leaves time to arrive)
+        Returns an EnergyRoute, or None when the destination cannot be reached
+        """
+        sx, sy = source
+        tx, ty = destination
+        dist = navigation.field(destination).dist
+        shortest = int(dist[sy, sx])
+        if shortest == UNREACHABLE:
+            return None
+        if shortest == 0:
+            return EnergyRoute([], 0, 0)
+        turns = shortest + slack
+        planned = min(turns, horizon)
+
+        # A cell off the source-destination box by ``e`` costs at least 2e extra moves
+        # along that axis, and no cell further than ``planned`` moves from the source is visited
+        margin_x = (turns - abs(tx - sx)) // 2
+        margin_y = (turns - abs(ty - sy)) // 2
+        x0 = max(0, min(sx, tx) - margin_x, sx - planned)
+        x1 = min(self.width, max(sx, tx) + margin_x + 1, sx + planned + 1)
+        y0 = max(0, min(sy, ty) - margin_y, sy - planned)
+        y1 = min(self.height, max(sy, ty) + margin_y + 1, sy + planned + 1)
+        cells = (slice(y0, y1), slice(x0, x1))
+        shape = (y1 - y0, x1 - x0)
+        height, width = shape
+        scratch = self._scratch
+        remaining = scratch.take("remaining", shape, np.int32)
+        np.copyto(remaining, dist[cells])
+        walkable = self.walkable[cells]
+        base = self.estimate(turn, cells, out=scratch.take("base", shape, np.int32))
+        regen = self.regen[cells]
+
+        # Every cell keeps the best path reaching it and the best of the paths whose last
+        # move differs. Stepping straight back onto the cell just left (through the
+        # neighbour's best) only collects the two turns of regeneration since; any other
+        # step collects the cell's estimate, and the second best covers those. A loop of
+        # k moves can be cut out and still arrive in time, so k <= slack: with ``slack``
+        # 2 or less these 2-move bounces are the only revisits and the values are exact.
+        # A path is one int32 key, value << _KEY_BITS | move bits << 1 | 1 when it came
+        # through the neighbour's second best; a plain max then ranks on the value and
+        # keeps the first move in MOVES order on ties. Keys below 0 are no path.
+        # The padded planes carry a border of _NO_KEY, their 3x3 windows give the 8
+        # neighbours of every cell in one read
+        planes = []
+        for name in ("best", "second"):
+            buffer = scratch.take(name, (height + 2, width + 2), np.int32)
+            buffer.fill(_NO_KEY)
+            planes.append(buffer)
+        best_plane, second_plane = planes
+        interior = (slice(1, height + 1), slice(1, width + 1))
+        best_plane[1 + sy - y0, 1 + sx - x0] = _START_KEY
+        # Arriving at (x, y) by (dx, dy) comes from the window entry [1 - dy, 1 - dx]
+        windows = [sliding_window_view(plane, (3, 3)) for plane in planes]
+        arrived = scratch.take("arrived", (2, planned + 1, height, width), np.int8)
+        gain = scratch.take("gain", shape, np.int32)
+        bounce = np.minimum(regen * 2, self.cell_max)
+        detour = scratch.take("detour", shape, np.int32)
+        allowed = scratch.take("allowed", shape, bool)
+        mask = scratch.take("mask", shape, bool)
+        target = None
+        if x0 <= tx < x1 and y0 <= ty < y1:
+            target = (ty - y0, tx - x0)
+        best_value, best_steps = _NO_PATH, 0
+        for steps in range(1, planned + 1):
+            # Arriving on a cell collects what it will hold by then
+            np.multiply(regen, steps, out=gain)
+            np.add(gain, base, out=gain)
+            np.minimum(gain, self.cell_max, out=gain)
+            np.left_shift(gain, _KEY_BITS, out=gain)
+            # What a bounce collects less, taken off before the comparison
+            np.subtract(gain, bounce << _KEY_BITS, out=detour)
+            # (8, height, width): the gather lays the moves out first, the transpose is free
+            keys = np.ascontiguousarray(windows[0][:, :, _ROWS, _COLUMNS].transpose(2, 0, 1))
+            seconds = windows[1][:, :, _ROWS, _COLUMNS].transpose(2, 0, 1)
+            # The neighbour's best came from this cell: bounce, or its second best
+            reverse = ((keys >> 1) & _MOVE_MASK) == _REVERSE_BITS
+            np.subtract(keys, detour, out=keys, where=reverse)
+            through_second = reverse & (seconds > keys)
+            np.copyto(keys, seconds, where=through_second)
+            # Keep the value, stamp the move taken to get here
+            np.bitwise_and(keys, _VALUE_MASK, out=keys)
+            np.bitwise_or(keys, _MOVE_BITS, out=keys)
+            np.add(keys, through_second, out=keys)
+            best = keys.max(axis=0)
+            # Keys differ in their move bits, so only the best matches itself
+            np.copyto(keys, _BELOW_KEYS, where=keys == best)
+            second = keys.max(axis=0)
+            np.bitwise_and(best, _CODE_MASK, out=arrived[0, steps], casting="unsafe")
+            np.bitwise_and(second, _CODE_MASK, out=arrived[1, steps], casting="unsafe")
+            np.less_equal(remaining, turns - steps, out=allowed)
+            np.logical_and(allowed, walkable, out=allowed)
+            for values in (best, second):
+                np.add(values, gain, out=values)
+                np.greater_equal(values, 0, out=mask)
+                np.logical_and(mask, allowed, out=mask)
+                np.logical_not(mask, out=mask)
+                np.copyto(values, _NO_KEY, where=mask)
+            best_plane[interior] = best
+            second_plane[interior] = second
+            if target is not None:
+                value = int(best[target]) >> _KEY_BITS
+                if value > best_value:
+                    best_value, best_steps = value, steps
+
+        end = target
+        if best_value < 0:
+            # Destination beyond the horizon: stop on the richest cell, nearest to it on ties
+            values = best >> _KEY_BITS
+            best_value = int(values.max())
+            if best_value < 0:
+                return None
+            np.equal(values, best_value, out=mask)
+            gain.fill(UNREACHABLE + 1)
+            np.copyto(gain, remaining, where=mask)
+            end = np.unravel_index(int(np.argmin(gain)), shape)
+            best_steps = planned
+        moves = self._backtrack(arrived, end, best_steps)
+        return EnergyRoute(moves, sum(self.yields(source, moves, turn)), best_steps)
+
+    @staticmethod
+    def _backtrack(arrived, end, steps):
+        y, x = end
+        entry = 0
+        path = []
+        for step_index in range(steps, 0, -1):
+            code = int(arrived[entry, step_index, y, x])
+            dx, dy = MOVES[len(MOVES) - 1 - (code >> 1)]
+            entry = code & 1
+            path.append((dx, dy))
+            x, y = x - dx, y - dy
+        path.reverse()
+        return path
+
+    def yields(self, source, moves, turn):
+        """
+        Energy collected on each cell of ``moves`` from ``source``, starting on ``turn``
+        A cell met again only yields what it regenerated since the last visit
+        """
+        x, y = source
+        visited = {(x, y): turn}
+        collected = []
+        for steps, (dx, dy) in enumerate(moves, 1):
+            x, y = x + dx, y + dy
+            last = visited.get((x, y))
+            if last is None:
+                collected.append(self.cell_estimate(x, y, turn + steps))
+            else:
+                collected.append(min(self.cell_max, (turn + steps - last) * int(self.regen[y, x])))
+            visited[(x, y)] = turn + steps
+        return collected
+
+    def committed_route(self, source, destination, navigation, turn, slack=2, horizon=24):
+        """
+        ``route`` towards ``destination``, or None
+        The arrival turn is fixed when a destination is first asked for and kept per
+        destination, so neither replanning every turn nor switching between targets can
+        keep spending a fresh ``slack``. It is only renewed once it cannot be met
+        """
+        destination = tuple(destination)
+        shortest = navigation.distance(source, destination)
+        if shortest is None:
+            return None
+        due = self._arrivals.get(destination)
+        if due is None or due < turn + shortest:
+            due = self._arrivals[destination] = turn + shortest + slack
+        return self.route(source, destination, navigation, turn, due - turn - shortest, horizon)
+
+    def next_move(self, source, destination, navigation, turn, slack=2, horizon=24):
+        """First move of ``committed_route``, or None"""
+        route = self.committed_route(source, destination, navigation, turn, slack, horizon)
+        if route is None or not route.moves:
+            return None
+        return route.moves[0]
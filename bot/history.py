@@ -0,0 +1,133 @@
+"""
+Bounded, compact turn history
+
+Only a small record is kept per turn instead of the raw NewTurn/NewAction
+protobufs: our position, energy, score, the action sent and the lighthouses
+whose owner or energy changed since the previous turn. The newest ``capacity``
+records stay in memory; older ones are dropped or, optionally, appended to a
+binary spill file that can be read back with ``read_spill``.
+"""
+import struct
+from array import array
+from collections import deque
+
+# turn, x, y, energy, score, action, dest x, dest y, action energy, delta count
+_RECORD = struct.Struct("<IhhiiBhhiH")
+# lighthouse index, owner, energy
+_DELTA = struct.Struct("<Hhi")
+
+
+class TurnRecord:
+    """Compact summary of one turn and the action we answered"""
+
+    __slots__ = (
+        "turn", "x", "y", "energy", "score",
+        "action", "dest_x", "dest_y", "action_energy",
+        "lighthouse_deltas",
+    )
+
+    def __init__(self, turn, x, y, energy, score, action, dest_x, dest_y, action_energy,
+                 lighthouse_deltas=()):
+        self.turn = turn
+        self.x = x
+        self.y = y
+        self.energy = energy
+        self.score = score
+        self.action = action
+        self.dest_x = dest_x
+        self.dest_y = dest_y
+        self.action_energy = action_energy
+        # ((lighthouse index, owner, energy), ...) for lighthouses that changed
+        self.lighthouse_deltas = lighthouse_deltas
+
+    def pack(self):
+        head = _RECORD.pack(
+            self.turn, self.x, self.y, self.energy, self.score,
+            self.action, self.dest_x, self.dest_y, self.action_energy,
+            len(self.lighthouse_deltas),
+        )
+        return head + b"".join(_DELTA.pack(*delta) for delta in self.lighthouse_deltas)
+
+    def __repr__(self):
+        return (
+            f"TurnRecord(turn={self.turn}, pos=({self.x}, {self.y}), energy={self.energy}, "
+            f"score={self.score}, action={self.action}, dest=({self.dest_x}, {self.dest_y}), "
+            f"deltas={len(self.lighthouse_deltas)})"
+        )
+
+
+def read_spill(path):
+    """Yield the TurnRecords stored in a spill file, oldest first"""
+    with open(path, "rb") as spill:
+        while True:
+            head = spill.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                return
+            *fields, count = _RECORD.unpack(head)
+            raw = spill.read(_DELTA.size * count)
+            deltas = tuple(_DELTA.iter_unpack(raw))
+            yield TurnRecord(*fields, lighthouse_deltas=deltas)
+
+
+class TurnHistory:
+    """
+    Ring buffer of TurnRecords
+    Lighthouse owner/energy of the previous turn are kept in flat arrays to compute the deltas
+    """
+
+    def __init__(self, capacity=256, spill_path=None):
+        if capacity < 1:
+            raise ValueError(f"TurnHistory needs room for at least one record, got capacity={capacity}")
+        self.capacity = capacity
+        self.records = deque(maxlen=capacity)
+        self.count = 0
+        self.spill_path = spill_path
+        self._spill = open(spill_path, "ab") if spill_path else None
+        self._owners = array("h")
+        self._energies = array("i")
+
+    def append(self, turn, action):
+        """Summarize ``turn`` and the ``action`` answered to it"""
+        deltas = []
+        owners, energies = self._owners, self._energies
+        if len(owners) != len(turn.Lighthouses):
+            owners = self._owners = array("h", [-1]) * len(turn.Lighthouses)
+            energies = self._energies = array("i", [-1]) * len(turn.Lighthouses)
+        for index, lh in enumerate(turn.Lighthouses):
+            owner, energy = lh.Owner, lh.Energy
+            if owners[index] != owner or energies[index] != energy:
+                owners[index] = owner
+                energies[index] = energy
+                deltas.append((index, owner, energy))
+
+        record = TurnRecord(
+            self.count, turn.Position.X, turn.Position.Y, turn.Energy, turn.Score,
+            action.Action, action.Destination.X, action.Destination.Y, action.Energy,
+            tuple(deltas),
+        )
+        if self._spill is not None and len(self.records) == self.capacity:
+            self._spill.write(self.records[0].pack())
+        self.records.append(record)
+        self.count += 1
+        return record
+
+    def last(self):
+        return self.records[-1] if self.records else None
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def close(self):
+        """Flush the records still in memory to the spill file, if any, and close it"""
+        if self._spill is None:
+            return
+        for record in self.records:
+            self._spill.write(record.pack())
+        self._spill.close()
+        self._spill = None
@@ -0,0 +1,187 @@
+"""
+Persistent lighthouse index updated from per-turn diffs
+
+Lighthouse positions never change after InitialState, so every lighthouse gets
+a stable id (its position in the initial list). Each turn the owner, energy and
+key of every lighthouse are compared with the last ones, its connection list is
+only decoded when it may have changed, and the derived views (owned set,
+connectable destinations, energy heap of targets) are patched for the changed ids.
+"""
+import heapq
+
+import numpy as np
+
+
+class LighthouseChanges:
+    """Ids touched by one update, split by what changed"""
+
+    __slots__ = ("owner", "energy", "key", "connections")
+
+    def __init__(self):
+        self.owner = []
+        self.energy = []
+        self.key = []
+        self.connections = []
+
+    def __bool__(self):
+        return bool(self.owner or self.energy or self.key or self.connections)
+
+
+class LighthouseIndex:
+    """
+    Lighthouse state keyed by id, with owner/energy/key held in NumPy arrays
+    ``connectable[a]`` holds the ids we can link to while standing on ``a``
+    """
+
+    def __init__(self, positions, player_num):
+        self.player_num = player_num
+        self.positions = [tuple(pos) for pos in positions]
+        self.ids = {pos: lh_id for lh_id, pos in enumerate(self.positions)}
+        count = len(self.positions)
+        self.xs = np.array([pos[0] for pos in self.positions], dtype=np.int32)
+        self.ys = np.array([pos[1] for pos in self.positions], dtype=np.int32)
+        self.owner = np.full(count, -1, dtype=np.int32)
+        self.energy = np.zeros(count, dtype=np.int32)
+        self.have_key = np.zeros(count, dtype=bool)
+        self.neighbours = [set() for _ in range(count)]
+        self.owned = set()
+        self.keyed_owned = set()
+        self.connectable = {}
+        self.revision = 0  # bumped by every update that changed something
+        self.key_count = 0  # lighthouses whose key we hold
+        self._fields = [None] * count      # (owner, energy, key) last seen, None before the first turn
+        self._link_counts = [0] * count    # length of the last connection list
+        # Min-heap of (energy, version, id) over lighthouses we do not own, stale
+        # entries are skipped by comparing versions and compacted when they pile up
+        self._heap = []
+        self._version = [0] * count
+        self._targeted = [False] * count
+        self._live = 0
+
+    @classmethod
+    def from_lighthouses(cls, lighthouses, player_num):
+        return cls([(lh.Position.X, lh.Position.Y) for lh in lighthouses], player_num)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def update(self, lighthouses):
+        """
+        Apply the lighthouse list of a NewTurn, returning what changed
+        The scan reads three fields per lighthouse; decoding connections and
+        the derived views are O(changes). The engine only drops a link when one
+        of its ends changes owner, and a new link lengthens both lists, so a
+        connection list is decoded when its length changed or when it links to
+        a lighthouse that changed owner
+        """
+        changes = LighthouseChanges()
+        ids, fields, link_counts = self.ids, self._fields, self._link_counts
+        unsure = []  # (id, message) whose links only change if a linked owner changed
+        for lh in lighthouses:
+            lh_id = ids.get((lh.Position.X, lh.Position.Y))
+            if lh_id is None:
+                continue
+            current = (lh.Owner, lh.Energy, lh.HaveKey)
+            before = fields[lh_id]
+            if current != before:
+                fields[lh_id] = current
+                self._apply(lh_id, current, before, changes)
+            if before is None or len(lh.Connections) != link_counts[lh_id]:
+                self._apply_links(lh_id, lh, changes)
+            elif link_counts[lh_id]:
+                unsure.append((lh_id, lh))
+        if changes.owner and unsure:
+            moved = set(changes.owner)
+            for lh_id, lh in unsure:
+                if lh_id in moved or not moved.isdisjoint(self.neighbours[lh_id]):
+                    self._apply_links(lh_id, lh, changes)
+        if changes:
+            self.revision += 1
+            self._refresh(changes)
+        return changes
+
+    def _apply(self, lh_id, current, before, changes):
+        owner, energy, have_key = current
+        if before is None or before[0] != owner:
+            self.owner[lh_id] = owner
+            changes.owner.append(lh_id)
+        if before is None or before[1] != energy:
+            self.energy[lh_id] = energy
+            changes.energy.append(lh_id)
+        if before is None or before[2] != have_key:
+            self.key_count += int(have_key) - int(self.have_key[lh_id])
+            self.have_key[lh_id] = have_key
+            changes.key.append(lh_id)
+
+    def _apply_links(self, lh_id, lh, changes):
+        self._link_counts[lh_id] = len(lh.Connections)
+        linked = set()
+        for pos in lh.Connections:
+            other = self.ids.get((pos.X, pos.Y))
+            if other is not None:
+                linked.add(other)
+        if linked != self.neighbours[lh_id]:
+            self.neighbours[lh_id] = linked
+            changes.connections.append(lh_id)
+
+    def _refresh(self, changes):
+        player = self.player_num
+        for lh_id in changes.owner:
+            if self.owner[lh_id] == player:
+                self.owned.add(lh_id)
+            else:
+                self.owned.discard(lh_id)
+                self.connectable.pop(lh_id, None)
+        for lh_id in set(changes.owner) | set(changes.key):
+            if lh_id in self.owned and self.have_key[lh_id]:
+                self.keyed_owned.add(lh_id)
+            else:
+                self.keyed_owned.discard(lh_id)
+
+        # Sources whose own state changed are rebuilt, every other owned source
+        # only needs the changed destinations patched in or out
+        touched = set(changes.owner) | set(changes.key) | set(changes.connections)
+        for src in self.owned:
+            if src in touched or src not in self.connectable:
+                self.connectable[src] = self.keyed_owned - self.neighbours[src] - {src}
+                continue
+            reachable = self.connectable[src]
+            for dst in touched:
+                if dst != src and dst in self.keyed_owned and dst not in self.neighbours[src]:
+                    reachable.add(dst)
+                else:
+                    reachable.discard(dst)
+
+        for lh_id in set(changes.owner) | set(changes.energy):
+            self._push(lh_id)
+
+    def _push(self, lh_id):
+        self._version[lh_id] += 1
+        is_target = bool(self.owner[lh_id] != self.player_num)
+        self._live += is_target - self._targeted[lh_id]
+        self._targeted[lh_id] = is_target
+        if is_target:
+            heapq.heappush(self._heap, (int(self.energy[lh_id]), self._version[lh_id], lh_id))
+        if len(self._heap) > 2 * self._live + 16:
+            self._heap = [entry for entry in self._heap if self._version[entry[2]] == entry[1]]
+            heapq.heapify(self._heap)
+
+    def targets_by_energy(self):
+        """
+        Yield (energy, id) of the lighthouses we do not own, lowest energy first
+        Walks the heap lazily, so stopping early costs O(k log k)
+        """
+        heap, version = self._heap, self._version
+        if not heap:
+            return
+        frontier = [(heap[0], 0)]
+        while frontier:
+            (energy, entry_version, lh_id), index = heapq.heappop(frontier)
+            if version[lh_id] == entry_version:
+                yield energy, lh_id
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def connectable_from(self, lh_id):
+        return self.connectable.get(lh_id, ())
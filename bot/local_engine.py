@@ -0,0 +1,300 @@
+"""
+Local stand-in for the game engine
+
+LocalGame runs a match on the forward model of bot.simulation and speaks the
+same protobuf messages as the real engine: it hands out player ids on Join,
+builds NewPlayerInitialState and NewTurn messages, and applies the NewAction
+answers once per round. Bots are driven through anything shaped like a
+GameServiceStub (``InitialState`` and ``Turn`` taking a request and a timeout):
+a real stub on a gRPC channel, or DirectBot to call a BotGame in-process.
+"""
+import random
+import threading
+import time
+
+import numpy as np
+from grpc import RpcError
+
+from bot.navigation import NavigationGrid
+from bot.scheduler import Deadline
+from bot.simulation import PASS, SimState, StaticMap, step
+from internal.handler.coms import game_pb2
+from internal.handler.coms import game_pb2_grpc as game_grpc
+
+DEFAULT_TURNS = 200
+
+
+def parse_map(text):
+    """
+    Read a map in the engine's text format
+    ``x`` is a wall, ``!`` a lighthouse, digits are player starts, anything else is playable
+    Returns (walkable[y, x], lighthouse positions, start positions)
+    """
+    rows = [line.rstrip("\n") for line in text.strip("\n").splitlines()]
+    width = max(len(row) for row in rows)
+    walkable = np.zeros((len(rows), width), dtype=bool)
+    lighthouses, starts = [], []
+    for y, row in enumerate(rows):
+        for x, cell in enumerate(row):
+            walkable[y, x] = cell != "x"
+            if cell == "!":
+                lighthouses.append((x, y))
+            elif cell.isdigit():
+                starts.append((int(cell), (x, y)))
+    return walkable, lighthouses, [pos for _, pos in sorted(starts)]
+
+
+def generate_map(width, height, lighthouses, players=2, wall_ratio=0.15, seed=0):
+    """Random map with a wall border, returns (walkable, lighthouse positions, start positions)"""
+    rng = random.Random(seed)
+    walkable = np.array(
+        [[rng.random() >= wall_ratio for _ in range(width)] for _ in range(height)], dtype=bool
+    )
+    walkable[0, :] = walkable[-1, :] = False
+    walkable[:, 0] = walkable[:, -1] = False
+    ys, xs = np.nonzero(walkable)
+    cells = list(zip(xs.tolist(), ys.tolist()))
+    rng.shuffle(cells)
+    return walkable, cells[:lighthouses], cells[lighthouses:lighthouses + players]
+
+
+def _position(pos):
+    return game_pb2.Position(X=pos[0], Y=pos[1])
+
+
+class LocalGame:
+    """One match between ``len(starts)`` players"""
+
+    def __init__(self, walkable, lighthouses, starts, turns=DEFAULT_TURNS):
+        walkable = np.asarray(walkable, dtype=bool)
+        navigation = NavigationGrid(walkable, lighthouses, cache_size=0)
+        self.static = StaticMap.build(walkable, lighthouses, navigation)
+        self.starts = [tuple(pos) for pos in starts]
+        self.turns = turns
+        self.player_ids = []
+        self.state = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def random(cls, width, height, lighthouses, players=2, turns=DEFAULT_TURNS, seed=0):
+        walkable, positions, starts = generate_map(width, height, lighthouses, players, seed=seed)
+        return cls(walkable, positions, starts, turns)
+
+    def join(self):
+        """Register a new player and return its id"""
+        with self._lock:
+            if len(self.player_ids) >= len(self.starts):
+                raise ValueError("The game is full")
+            player_id = len(self.player_ids) + 1
+            self.player_ids.append(player_id)
+            return player_id
+
+    @property
+    def full(self):
+        return len(self.player_ids) == len(self.starts)
+
+    def start(self):
+        starts = [(player_id, *self.starts[index]) for index, player_id in enumerate(self.player_ids)]
+        self.state = SimState.initial(self.static, starts)
+
+    @property
+    def finished(self):
+        return self.state is not None and self.state.turn >= self.turns
+
+    def _player(self, player_id):
+        return self.state.players[self.player_ids.index(player_id)]
+
+    def initial_state(self, player_id):
+        static = self.static
+        player = self._player(player_id)
+        return game_pb2.NewPlayerInitialState(
+            PlayerID=player_id,
+            PlayerCount=len(self.player_ids),
+            Position=_position((player.x, player.y)),
+            Map=[game_pb2.MapRow(Row=row.astype(int).tolist()) for row in static.walkable],
+            Lighthouses=[
+                game_pb2.Lighthouse(Position=_position(pos), Owner=owner, Energy=energy)
+                for pos, owner, energy in zip(static.coords, self.state.owner, self.state.lh_energy)
+            ],
+        )
+
+    def new_turn(self, player_id):
+        state = self.state
+        coords = state.static.coords
+        player = self._player(player_id)
+        connections = [[] for _ in coords]
+        for a, b in state.links:
+            connections[a].append(_position(coords[b]))
+            connections[b].append(_position(coords[a]))
+        return game_pb2.NewTurn(
+            Position=_position((player.x, player.y)),
+            Score=player.score,
+            Energy=player.energy,
+            View=[game_pb2.MapRow(Row=row) for row in state.view(player)],
+            Lighthouses=[
+                game_pb2.Lighthouse(
+                    Position=_position(pos),
+                    Owner=state.owner[lh_id],
+                    Energy=state.lh_energy[lh_id],
+                    Connections=connections[lh_id],
+                    HaveKey=lh_id in player.keys,
+                )
+                for lh_id, pos in enumerate(coords)
+            ],
+        )
+
+    def play_round(self, actions):
+        """Apply one NewAction per player id (None or missing means PASS)"""
+        sim_actions = []
+        for player_id in self.player_ids:
+            action = actions.get(player_id)
+            if action is None:
+                sim_actions.append((PASS, 0, 0, 0))
+            else:
+                sim_actions.append(
+                    (action.Action, action.Destination.X, action.Destination.Y, action.Energy)
+                )
+        step(self.state, sim_actions)
+
+    def scores(self):
+        return {player.player_id: player.score for player in self.state.players}
+
+
+class LocalEngineServicer(game_grpc.GameServiceServicer):
+    """Join endpoint of the local engine, the bots call it like the real one"""
+
+    def __init__(self, game):
+        self.game = game
+        self.addresses = {}
+        self.all_joined = threading.Event()
+
+    def Join(self, request, context):
+        player_id = self.game.join()
+        self.addresses[player_id] = request.serverAddress
+        if self.game.full:
+            self.all_joined.set()
+        return game_pb2.PlayerID(PlayerID=player_id)
+
+
+class DirectBot:
+    """GameServiceStub-shaped adapter that calls a BotGame in-process"""
+
+    def __init__(self, bot_game, recorder=None):
+        self.bot_game = bot_game
+        self.recorder = recorder  # a bot.replay.ReplayWriter, or None
+
+    def InitialState(self, request, timeout=None):
+        self.bot_game.load_initial_state(request)
+        if self.recorder is not None:
+            self.recorder.initial_state(request)
+        return game_pb2.PlayerReady(Ready=True)
+
+    def Turn(self, request, timeout=None):
+        deadline = None
+        if timeout is not None:
+            deadline = Deadline(timeout - self.bot_game.scheduler.margin)
+        action = self.bot_game.new_turn_action(request, deadline)
+        if self.recorder is not None:
+            self.recorder.turn(request, action)
+        return action
+
+
+class MatchResult:
+    __slots__ = ("scores", "latencies", "turns", "elapsed", "search")
+
+    def __init__(self, scores, latencies, turns, elapsed, search=None):
+        self.scores = scores          # {player id: final score}
+        self.latencies = latencies    # {player id: [seconds per Turn call]}
+        self.turns = turns
+        self.elapsed = elapsed
+        self.search = search or {}    # {player id: SchedulerStats.as_dict()}, when the runner has the bots
+
+    @property
+    def winners(self):
+        best = max(self.scores.values())
+        return [player_id for player_id, score in self.scores.items() if score == best]
+
+
+def play_match(game, stubs, turn_timeout=1.0):
+    """
+    Run ``game`` to the end, ``stubs`` maps player id to a GameServiceStub-shaped object
+    A Turn call that fails or times out counts as PASS
+    """
+    if game.state is None:
+        game.start()
+    for player_id, stub in stubs.items():
+        stub.InitialState(game.initial_state(player_id), timeout=turn_timeout)
+
+    latencies = {player_id: [] for player_id in stubs}
+    clock = time.perf_counter
+    start = clock()
+    while not game.finished:
+        actions = {}
+        for player_id, stub in stubs.items():
+            request = game.new_turn(player_id)
+            called = clock()
+            try:
+                actions[player_id] = stub.Turn(request, timeout=turn_timeout)
+            except RpcError:
+                actions[player_id] = None
+            latencies[player_id].append(clock() - called)
+        game.play_round(actions)
+    return MatchResult(game.scores(), latencies, game.state.turn, clock() - start)
+
+
+class MatchReport:
+    """Aggregated throughput, latency and win rates over several matches"""
+
+    def __init__(self):
+        self.matches = 0
+        self.decisions = 0
+        self.elapsed = 0.0
+        self.latencies = []
+        self.wins = {}
+        self.search = {}  # label -> summed SchedulerStats counts
+
+    def add(self, result, labels):
+        """Count ``result``, ``labels`` maps its player ids to bot labels"""
+        self.matches += 1
+        self.elapsed += result.elapsed
+        for samples in result.latencies.values():
+            self.decisions += len(samples)
+            self.latencies.extend(samples)
+        for label in labels.values():
+            self.wins.setdefault(label, 0.0)
+        for player_id, stats in result.search.items():
+            totals = self.search.setdefault(
+                labels[player_id], {"turns": 0, "full_depth": 0, "fallback": 0, "overruns": 0},
+            )
+            for key in totals:
+                totals[key] += stats[key]
+        winners = result.winners
+        for player_id in winners:
+            self.wins[labels[player_id]] += 1.0 / len(winners)
+
+    def percentile(self, fraction):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def as_dict(self):
+        return {
+            "matches": self.matches,
+            "turns_per_second": self.decisions / self.elapsed if self.elapsed else 0.0,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "win_rates": {
+                label: wins / self.matches if self.matches else 0.0
+                for label, wins in sorted(self.wins.items())
+            },
+            # How often every search stage finished, and how often only the fallback answered
+            "search": {
+                label: {
+                    **totals,
+                    "full_depth_rate": totals["full_depth"] / totals["turns"] if totals["turns"] else 0.0,
+                    "fallback_rate": totals["fallback"] / totals["turns"] if totals["turns"] else 0.0,
+                }
+                for label, totals in sorted(self.search.items())
+            },
+        }
@@ -0,0 +1,325 @@
+"""
+Map data shared between the bots of one process
+
+Everything that only depends on the map (the navigation grid, the regeneration
+field, the simulation's StaticMap with the lighthouse pairs blocked by a third
+one) is built once per distinct map and handed to every BotGame playing
+it. Maps are identified by a fingerprint of the walkable grid and the
+lighthouse positions. Maps in use are reference counted, unused ones stay in a
+small LRU in case the next game is played on the same map.
+
+MapCache persists the same data across processes and games: one file per map
+fingerprint, a JSON header followed by 64-byte aligned raw arrays, mapped
+read-only at load so nothing is copied or recomputed. The header carries a
+checksum of the payload; a file that fails it is deleted and rebuilt. The
+directory is kept under a size limit by dropping the least recently used files.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from bot.navigation import NavigationGrid, walkable_from_initial_state
+from bot.simulation import StaticMap, regen_field
+
+
+def lighthouse_positions(initial_state):
+    return [(lh.Position.X, lh.Position.Y) for lh in initial_state.Lighthouses]
+
+
+def map_fingerprint(walkable, positions):
+    """Hex digest identifying a map by its shape, walls and lighthouse positions"""
+    walkable = np.ascontiguousarray(walkable, dtype=bool)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.array(walkable.shape, dtype=np.int64).tobytes())
+    digest.update(np.packbits(walkable).tobytes())
+    digest.update(np.array(positions, dtype=np.int64).reshape(-1, 2).tobytes())
+    return digest.hexdigest()
+
+
+CACHE_MAGIC = b"LHMAP\x00\x00\x02"  # version 2 stores the regen field
+CACHE_SUFFIX = ".lhmap"
+_PREFIX = struct.Struct("<8sI")  # magic, header length
+_ALIGN = 64
+
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class MapCache:
+    """
+    Directory of map files keyed by fingerprint, at most ``max_bytes`` in total
+    ``load`` returns read-only arrays backed by the mapped file, or None
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, verify=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self.hits = 0
+        self.misses = 0
+        self.corrupt = 0
+        os.makedirs(path, exist_ok=True)
+
+    def file_for(self, fingerprint):
+        return os.path.join(self.path, fingerprint + CACHE_SUFFIX)
+
+    def store(self, fingerprint, arrays):
+        """Write ``arrays`` ({name: ndarray}) atomically, then enforce the size limit"""
+        layout, offset = [], 0
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            layout.append((name, array.dtype.str, list(array.shape), offset, array.nbytes))
+            offset = _aligned(offset + array.nbytes)
+        payload = bytearray(offset)
+        for (name, _, _, start, size), array in zip(layout, arrays.values()):
+            payload[start:start + size] = np.ascontiguousarray(array).tobytes()
+        header = json.dumps({
+            "fingerprint": fingerprint,
+            "arrays": layout,
+            "payload": len(payload),
+            "checksum": hashlib.blake2b(payload, digest_size=16).hexdigest(),
+        }).encode()
+        padding = _aligned(_PREFIX.size + len(header)) - _PREFIX.size - len(header)
+        header += b" " * padding
+
+        handle, temporary = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as stream:
+                stream.write(_PREFIX.pack(CACHE_MAGIC, len(header)))
+                stream.write(header)
+                stream.write(payload)
+            os.replace(temporary, self.file_for(fingerprint))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.evict()
+
+    def load(self, fingerprint):
+        path = self.file_for(fingerprint)
+        try:
+            with open(path, "rb") as stream:
+                mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return None
+        arrays = self._parse(mapped, fingerprint)
+        if arrays is None:
+            mapped.close()
+            self.corrupt += 1
+            self.misses += 1
+            self.remove(fingerprint)
+            return None
+        os.utime(path)
+        self.hits += 1
+        return arrays
+
+    def _parse(self, mapped, fingerprint):
+        if len(mapped) < _PREFIX.size:
+            return None
+        magic, header_size = _PREFIX.unpack_from(mapped, 0)
+        start = _PREFIX.size + header_size
+        if magic != CACHE_MAGIC or start > len(mapped):
+            return None
+        # A header that parses but misses a key or holds the wrong types is as corrupt as a bad checksum
+        try:
+            header = json.loads(mapped[_PREFIX.size:start])
+            if header["fingerprint"] != fingerprint or len(mapped) - start != header["payload"]:
+                return None
+            checksum, layout = header["checksum"], header["arrays"]
+        except (ValueError, KeyError, TypeError):
+            return None
+        payload = memoryview(mapped)[start:]
+        if self.verify and hashlib.blake2b(payload, digest_size=16).hexdigest() != checksum:
+            payload.release()
+            return None
+        # The arrays keep the view, and through it the mapping, alive
+        try:
+            return {
+                name: np.ndarray(tuple(shape), dtype=dtype, buffer=payload, offset=offset)
+                for name, dtype, shape, offset, _ in layout
+            }
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def remove(self, fingerprint):
+        try:
+            os.unlink(self.file_for(fingerprint))
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        """[(last use, size, path)] of the cached maps, least recently used first"""
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith(CACHE_SUFFIX):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                info = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def as_dict(self):
+        entries = self.entries()
+        return {
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "corrupt": self.corrupt,
+        }
+
+
+class MapData:
+    """Precomputed data of one map, read-only once built"""
+
+    def __init__(self, fingerprint, walkable, positions, navigation=None, static=None, cache=None, regen=None):
+        self.fingerprint = fingerprint
+        self.walkable = walkable
+        self.positions = positions
+        self.navigation = navigation if navigation is not None else NavigationGrid(walkable, positions)
+        if regen is None:
+            regen = static.regen if static is not None else regen_field(self.navigation.walkable, positions)
+        self.regen = regen
+        self.cache = cache
+        self.users = 0
+        self._static_map = static
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_initial_state(cls, initial_state, cache=None):
+        walkable = walkable_from_initial_state(initial_state)
+        positions = lighthouse_positions(initial_state)
+        return cls.load_or_build(map_fingerprint(walkable, positions), walkable, positions, cache)
+
+    @classmethod
+    def load_or_build(cls, fingerprint, walkable, positions, cache=None):
+        """Map the data from ``cache`` when it has this map, else build it and store it there"""
+        if cache is not None:
+            arrays = cache.load(fingerprint)
+            if arrays is not None:
+                return cls.from_arrays(fingerprint, arrays, cache)
+        data = cls(fingerprint, walkable, positions, cache=cache)
+        data.save()
+        return data
+
+    @classmethod
+    def from_arrays(cls, fingerprint, arrays, cache=None):
+        positions = [tuple(pos) for pos in arrays["positions"].tolist()]
+        navigation = NavigationGrid(
+            arrays["walkable"], positions,
+            target_dist=arrays["lh_dist"], target_step=arrays["lh_step"],
+        )
+        static = None
+        if all(name in arrays for name in StaticMap.ARRAYS):
+            static = StaticMap(**{name: arrays[name] for name in StaticMap.ARRAYS})
+        return cls(fingerprint, arrays["walkable"], positions, navigation, static, cache, arrays.get("regen"))
+
+    def arrays(self):
+        """Everything computed so far, by the StaticMap array names"""
+        if self._static_map is not None:
+            return self._static_map.arrays()
+        return {
+            "walkable": self.navigation.walkable,
+            "regen": self.regen,
+            "positions": np.array(self.positions, dtype=np.int32).reshape(-1, 2),
+            "lh_dist": self.navigation.target_dist,
+            "lh_step": self.navigation.target_step,
+        }
+
+    def save(self):
+        if self.cache is not None:
+            self.cache.store(self.fingerprint, self.arrays())
+
+    def static_map(self):
+        """StaticMap of the simulation, built on first use (and then cached with the rest)"""
+        with self._lock:
+            if self._static_map is None:
+                self._static_map = StaticMap.build(self.walkable, self.positions, self.navigation, self.regen)
+                self.save()
+            return self._static_map
+
+    @property
+    def nbytes(self):
+        return self.navigation.nbytes
+
+
+class SharedMaps:
+    """
+    Registry of MapData by fingerprint
+    ``acquire`` and ``release`` bracket every game, ``keep`` unused maps are kept warm
+    """
+
+    def __init__(self, keep=4, cache=None):
+        self.keep = keep
+        self.cache = cache
+        self.in_use = {}
+        self.idle = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, initial_state):
+        walkable = walkable_from_initial_state(initial_state)
+        positions = lighthouse_positions(initial_state)
+        fingerprint = map_fingerprint(walkable, positions)
+        with self._lock:
+            data = self.in_use.get(fingerprint) or self.idle.pop(fingerprint, None)
+            if data is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+                # Built under the lock so concurrent sessions on a new map wait for one build
+                data = MapData.load_or_build(fingerprint, walkable, positions, self.cache)
+            data.users += 1
+            self.in_use[fingerprint] = data
+            return data
+
+    def release(self, data):
+        with self._lock:
+            data.users -= 1
+            if data.users > 0:
+                return
+            self.in_use.pop(data.fingerprint, None)
+            if self.keep > 0:
+                self.idle[data.fingerprint] = data
+                while len(self.idle) > self.keep:
+                    self.idle.popitem(last=False)
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            maps = list(self.in_use.values()) + list(self.idle.values())
+        return sum(data.nbytes for data in maps)
+
+    def as_dict(self):
+        return {
+            "in_use": len(self.in_use),
+            "idle": len(self.idle),
+            "hits": self.hits,
+            "misses": self.misses,
+            "bytes": self.nbytes,
+            "disk": self.cache.as_dict() if self.cache is not None else None,
+        }
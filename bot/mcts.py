@@ -0,0 +1,324 @@
+"""
+Monte Carlo tree search over our own actions
+
+The search runs UCT on the forward model in bot.simulation, with greedy-ish
+random rollouts. It is root-parallel: every worker of a ProcessPoolExecutor
+grows its own tree from the same state with its own seed, and the root visit
+counts are merged. The pool stays warm between turns and the StaticMap arrays
+are copied once per game into shared memory, so a task only ships the small
+mutable state. Several planners (one per hosted bot) can share one pool. With a fixed iteration count the result only depends on the seed.
+Workers come from a forkserver, never from forking the bot process: that one runs
+gRPC threads, and a fork taken while they hold a lock can deadlock the child.
+"""
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from bot.simulation import (
+    ATTACK, CONNECT, MOVE, PASS, SimState, StaticMap, legal_actions, step,
+)
+
+DEFAULT_HORIZON = 12
+DEFAULT_ITERATIONS = 200
+ATTACHED_MAPS = 8  # maps a worker keeps attached, one per game its pool serves
+_PASS_ACTION = (PASS, 0, 0, 0)
+
+
+class SharedStaticMap:
+    """StaticMap arrays copied into one shared memory block"""
+
+    def __init__(self, static):
+        layout, offset = [], 0
+        arrays = static.arrays()
+        for name, array in arrays.items():
+            layout.append((name, array.dtype.str, array.shape, offset))
+            offset += (array.nbytes + 7) // 8 * 8
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 8))
+        for name, dtype, shape, start in layout:
+            target = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=start)
+            target[...] = arrays[name]
+        self.spec = (self.shm.name, tuple(layout))
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Worker-side cache of attached maps, least recently used first:
+# shared memory name -> (SharedMemory, StaticMap)
+_attached = OrderedDict()
+
+
+def attach_static_map(spec):
+    """Map a SharedStaticMap spec to a StaticMap without copying the arrays"""
+    name, layout = spec
+    cached = _attached.get(name)
+    if cached is not None:
+        _attached.move_to_end(name)
+        return cached[1]
+    while len(_attached) >= ATTACHED_MAPS:
+        _, (stale_shm, _) = _attached.popitem(last=False)
+        stale_shm.close()
+    shm = shared_memory.SharedMemory(name=name)
+    arrays = {
+        field: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+        for field, dtype, shape, start in layout
+    }
+    static = StaticMap(**arrays)
+    _attached[name] = (shm, static)
+    return static
+
+
+class _Node:
+    __slots__ = ("children", "untried", "visits", "value")
+
+    def __init__(self, untried):
+        self.children = {}
+        self.untried = untried
+        self.visits = 0
+        self.value = 0.0
+
+
+def _pick_target(state, player, rng):
+    """Random lighthouse we do not own, nearer ones more likely"""
+    static = state.static
+    candidates = [
+        lh_id for lh_id, owner in enumerate(state.owner)
+        if owner != player.player_id and static.lh_dist[lh_id, player.y, player.x] > 0
+    ]
+    if not candidates:
+        return None
+    weights = [1.0 / (1 + int(static.lh_dist[lh_id, player.y, player.x])) for lh_id in candidates]
+    return rng.choices(candidates, weights)[0]
+
+
+def rollout_action(state, player, target, rng):
+    """Default policy: take or link the lighthouse we stand on, else walk to the target"""
+    static = state.static
+    lh_id = state.lighthouse_at(player.x, player.y)
+    if lh_id is not None:
+        if state.owner[lh_id] != player.player_id and player.energy > state.lh_energy[lh_id]:
+            return (ATTACK, player.x, player.y, state.lh_energy[lh_id] + 1)
+        if state.owner[lh_id] == player.player_id:
+            for dest in sorted(player.keys):
+                if state.can_connect(player, lh_id, dest):
+                    x, y = static.coords[dest]
+                    return (CONNECT, x, y, 0)
+    if target is not None and rng.random() < 0.9:
+        move = static.step_towards(player.x, player.y, target)
+        if move is not None:
+            return (MOVE, player.x + move[0], player.y + move[1], 0)
+    moves = [action for action in legal_actions(state, player, ()) if action[0] == MOVE]
+    return rng.choice(moves) if moves else _PASS_ACTION
+
+
+def _advance(state, action):
+    step(state, [action] + [_PASS_ACTION] * (len(state.players) - 1))
+
+
+def rollout(state, turns, rng):
+    """Play ``turns`` rounds with the default policy, mutating ``state``"""
+    player = state.players[0]
+    target = None
+    for _ in range(turns):
+        if target is None or state.static.coords[target] == (player.x, player.y):
+            target = _pick_target(state, player, rng)
+        _advance(state, rollout_action(state, player, target, rng))
+
+
+def search(state, iterations=None, budget=None, seed=0, horizon=DEFAULT_HORIZON, exploration=1.0):
+    """
+    Grow a UCT tree from ``state`` for ``iterations`` rollouts or ``budget`` seconds
+    Returns ({root action: (visits, value sum)}, rollouts)
+    """
+    if iterations is None and budget is None:
+        iterations = DEFAULT_ITERATIONS
+    rng = random.Random(seed)
+    clock = time.perf_counter
+    stop_at = clock() + budget if budget is not None else None
+    base_score = state.players[0].score
+    base_energy = state.players[0].energy
+    root = _Node(legal_actions(state, state.players[0]))
+    scale = 1.0
+    rollouts = 0
+    while iterations is None or rollouts < iterations:
+        if stop_at is not None and clock() >= stop_at:
+            break
+        sim = state.copy()
+        node, path, depth = root, [root], 0
+
+        # Selection
+        while not node.untried and node.children and depth < horizon:
+            log_visits = math.log(node.visits)
+            bonus = exploration * scale
+
+            def ucb(item):
+                child = item[1]
+                return child.value / child.visits + bonus * math.sqrt(log_visits / child.visits)
+
+            action, node = max(node.children.items(), key=ucb)
+            _advance(sim, action)
+            path.append(node)
+            depth += 1
+
+        # Expansion
+        if node.untried and depth < horizon:
+            action = node.untried.pop(rng.randrange(len(node.untried)))
+            _advance(sim, action)
+            depth += 1
+            child = _Node(legal_actions(sim, sim.players[0]))
+            node.children[action] = child
+            path.append(child)
+
+        rollout(sim, horizon - depth, rng)
+        player = sim.players[0]
+        # Score gained over the horizon, energy left is a tie breaker
+        reward = (player.score - base_score) + 0.01 * (player.energy - base_energy)
+        scale = max(scale, abs(reward))
+        for visited in path:
+            visited.visits += 1
+            visited.value += reward
+        rollouts += 1
+    stats = {action: (child.visits, child.value) for action, child in root.children.items()}
+    return stats, rollouts
+
+
+def _pack_state(state):
+    return (state.energy, state.owner, state.lh_energy, state.links, state.players, state.turn)
+
+
+def _search_task(spec, packed, iterations, budget, seed, horizon, exploration):
+    static = attach_static_map(spec)
+    state = SimState(static, *packed)
+    return search(state, iterations, budget, seed, horizon, exploration)
+
+
+def _warm_up(spec=None):
+    if spec is not None:
+        attach_static_map(spec)
+    return os.getpid()
+
+
+def start_pool(workers):
+    """
+    Warm process pool for MCTSPlanner, best created before the gRPC server starts
+    Uses the forkserver start method, or spawn where there is no forkserver
+    """
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    wait([pool.submit(_warm_up) for _ in range(workers)])
+    return pool
+
+
+class PlanResult:
+    __slots__ = ("action", "visits", "rollouts", "elapsed")
+
+    def __init__(self, action, visits, rollouts, elapsed):
+        self.action = action        # (kind, x, y, energy) or None
+        self.visits = visits        # {action: (visits, value sum)}
+        self.rollouts = rollouts
+        self.elapsed = elapsed
+
+    @property
+    def rollouts_per_second(self):
+        return self.rollouts / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class MCTSPlanner:
+    """
+    Root-parallel MCTS on a warm process pool
+    ``workers=0`` runs the search in-process. A ``pool`` from start_pool is used
+    instead of a pool of the planner's own, and is left running on close
+    """
+
+    def __init__(self, static, workers=None, horizon=DEFAULT_HORIZON, exploration=1.0, seed=0,
+                 dispatch_slack=0.02, pool=None):
+        self.static = static
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.horizon = horizon
+        self.exploration = exploration
+        self.seed = seed
+        self.dispatch_slack = dispatch_slack
+        self.total_rollouts = 0
+        self.total_seconds = 0.0
+        self._pool = pool
+        self._owns_pool = pool is None
+        self._shared = None
+
+    def start(self):
+        """Create the shared map and the worker processes, ahead of the first turn"""
+        if self.workers <= 0 or self._shared is not None:
+            return
+        self._shared = SharedStaticMap(self.static)
+        if self._pool is None:
+            self._pool = start_pool(self.workers)
+        wait([self._pool.submit(_warm_up, self._shared.spec) for _ in range(self.workers)])
+
+    def close(self):
+        if self._pool is not None and self._owns_pool:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def _seed(self, turn, worker):
+        return (self.seed * 1_000_003 + turn) * 1024 + worker
+
+    def plan(self, state, deadline=None, iterations=None):
+        """
+        Most visited root action for ``state.players[0]``
+        Stops at ``iterations`` rollouts in total, at the deadline, or both
+        """
+        start = time.perf_counter()
+        budget = None
+        if deadline is not None:
+            budget = max(0.0, deadline.remaining() - self.dispatch_slack)
+        if iterations is None and budget is None:
+            iterations = DEFAULT_ITERATIONS
+        args = (self.horizon, self.exploration)
+
+        if self.workers <= 0:
+            results = [search(state, iterations, budget, self._seed(state.turn, 0), *args)]
+        else:
+            self.start()
+            packed = _pack_state(state)
+            futures = []
+            for worker in range(self.workers):
+                share = None
+                if iterations is not None:
+                    share = iterations // self.workers + (worker < iterations % self.workers)
+                futures.append(self._pool.submit(
+                    _search_task, self._shared.spec, packed, share, budget,
+                    self._seed(state.turn, worker), *args,
+                ))
+            timeout = deadline.remaining() if deadline is not None else None
+            wait(futures, timeout=timeout, return_when=FIRST_EXCEPTION)
+            # Workers that missed the deadline are simply left out of the merge
+            results = [future.result() for future in futures if future.done()]
+
+        visits, rollouts = {}, 0
+        for stats, count in results:
+            rollouts += count
+            for action, (count_visits, value) in stats.items():
+                total = visits.get(action, (0, 0.0))
+                visits[action] = (total[0] + count_visits, total[1] + value)
+        action = None
+        if visits:
+            action = max(sorted(visits), key=lambda candidate: visits[candidate])
+        elapsed = time.perf_counter() - start
+        self.total_rollouts += rollouts
+        self.total_seconds += elapsed
+        return PlanResult(action, visits, rollouts, elapsed)
+
+    @property
+    def rollouts_per_second(self):
+        return self.total_rollouts / self.total_seconds if self.total_seconds > 0 else 0.0
@@ -0,0 +1,309 @@
+"""
+Low-overhead metrics and logging
+
+Latency histograms, counters and phase timers live in a Metrics registry.
+Log lines go to a BufferedLogSink that a background thread writes out in
+batches, so the turn path never blocks on stdout. A disabled registry hands
+out shared no-op objects, which keeps the cost of instrumented code to a
+method call. ``MetricsServer`` optionally serves the registry over HTTP as
+Prometheus text (``/metrics``) or JSON (``/metrics.json``).
+"""
+import bisect
+import json
+import sys
+import threading
+import time
+from collections import deque
+
+# Upper bounds in seconds, from 10 us to 10 s
+LATENCY_BUCKETS = tuple(
+    base * scale for scale in (1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0) for base in (1, 2.5, 5)
+) + (10.0,)
+
+SMOOTHING = 0.2  # weight of the newest sample in the moving cost averages
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "count", "total", "lock")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += value
+
+    def snapshot(self):
+        """(bucket counts, count, total) read together under the lock"""
+        with self.lock:
+            return list(self.counts), self.count, self.total
+
+    def quantile(self, fraction, snapshot=None):
+        """Upper bound of the bucket holding the ``fraction`` quantile"""
+        counts, total_count, _ = snapshot if snapshot is not None else self.snapshot()
+        if not total_count:
+            return 0.0
+        wanted = fraction * total_count
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= wanted:
+                return self.bounds[index] if index < len(self.bounds) else float("inf")
+        return float("inf")
+
+    def as_dict(self):
+        snapshot = self.snapshot()
+        return {
+            "count": snapshot[1],
+            "sum": snapshot[2],
+            "p50": self.quantile(0.5, snapshot),
+            "p99": self.quantile(0.99, snapshot),
+        }
+
+
+class Counter:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class _PhaseTimer:
+    __slots__ = ("histogram", "started")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _Null:
+    """Stands in for every metric object when metrics are disabled"""
+
+    __slots__ = ()
+
+    def observe(self, value):
+        pass
+
+    def inc(self, amount=1):
+        pass
+
+    def log(self, message):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL = _Null()
+
+
+class BufferedLogSink:
+    """
+    Collects log lines in memory and writes them from a daemon thread every ``interval`` seconds
+    Logging is a deque append, the writer never wakes up per message
+    """
+
+    def __init__(self, stream=None, interval=0.05):
+        self.stream = stream if stream is not None else sys.stdout
+        self.interval = interval
+        self.pending = deque()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self.thread.start()
+
+    def log(self, message):
+        self.pending.append(message)
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        lines = []
+        pending = self.pending
+        while pending:
+            lines.append(pending.popleft())
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+            self.stream.flush()
+
+    def close(self):
+        self.stopping.set()
+        self.thread.join(timeout=1.0)
+
+
+class Metrics:
+    """Registry of histograms and counters, ``enabled=False`` turns everything into no-ops"""
+
+    def __init__(self, enabled=True, sink=None):
+        self.enabled = enabled
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+        if not enabled:
+            self.sink = NULL
+        else:
+            self.sink = sink if sink is not None else BufferedLogSink()
+
+    def histogram(self, name):
+        if not self.enabled:
+            return NULL
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, Histogram())
+        return histogram
+
+    def counter(self, name):
+        if not self.enabled:
+            return NULL
+        counter = self.counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self.counters.setdefault(name, Counter())
+        return counter
+
+    def phase(self, name):
+        """Context manager timing a phase into the ``phase.<name>`` histogram"""
+        if not self.enabled:
+            return NULL
+        return _PhaseTimer(self.histogram(f"phase.{name}"))
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counter(name).inc(amount)
+
+    def log(self, message):
+        self.sink.log(message)
+
+    def close(self):
+        self.sink.close()
+
+    def _items(self):
+        """Sorted (name, metric) lists, copied under the lock as handler threads may add names"""
+        with self._lock:
+            return sorted(self.histograms.items()), sorted(self.counters.items())
+
+    def as_dict(self):
+        histograms, counters = self._items()
+        return {
+            "histograms": {name: h.as_dict() for name, h in histograms},
+            "counters": {name: c.value for name, c in counters},
+        }
+
+    def to_json(self):
+        return json.dumps(self.as_dict())
+
+    def prometheus_families(self, prefix="bot", labels=None):
+        """
+        {metric name: (type, sample lines)}, ``labels`` are added to every sample
+        Registries are merged family by family, so each TYPE line appears once
+        """
+        base = "".join(f'{key}="{value}",' for key, value in sorted((labels or {}).items()))
+        plain = f"{{{base[:-1]}}}" if base else ""
+        families = {}
+        histograms, counters = self._items()
+        for name, histogram in histograms:
+            metric = f"{prefix}_{_sanitize(name)}_seconds"
+            counts, total_count, total = histogram.snapshot()
+            samples = []
+            cumulative = 0
+            for bound, count in zip(histogram.bounds, counts):
+                cumulative += count
+                samples.append(f'{metric}_bucket{{{base}le="{bound:g}"}} {cumulative}')
+            samples.append(f'{metric}_bucket{{{base}le="+Inf"}} {total_count}')
+            samples.append(f"{metric}_sum{plain} {total}")
+            samples.append(f"{metric}_count{plain} {total_count}")
+            families[metric] = ("histogram", samples)
+        for name, counter in counters:
+            metric = f"{prefix}_{_sanitize(name)}_total"
+            families[metric] = ("counter", [f"{metric}{plain} {counter.value}"])
+        return families
+
+    def to_prometheus(self, prefix="bot"):
+        return format_prometheus([self.prometheus_families(prefix)])
+
+
+def format_prometheus(family_sets):
+    """Prometheus text of several ``prometheus_families`` results"""
+    merged = {}
+    for families in family_sets:
+        for metric, (kind, samples) in families.items():
+            merged.setdefault(metric, (kind, []))[1].extend(samples)
+    lines = []
+    for metric, (kind, samples) in sorted(merged.items()):
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def _sanitize(name):
+    return "".join(char if char.isalnum() else "_" for char in name).strip("_").lower()
+
+
+NULL_METRICS = Metrics(enabled=False)
+
+
+class MetricsServer:
+    """Serves a Metrics registry on ``/metrics`` (Prometheus text) and ``/metrics.json``"""
+
+    def __init__(self, metrics, port, host="0.0.0.0"):
+        # Imported here: most processes never serve metrics and http.server is slow to import
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        registry = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = registry.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,213 @@
+"""
+Wall-aware navigation over the playable map
+
+The map received in ``NewPlayerInitialState.Map`` is turned into a walkable
+grid once, and BFS distance / next-step fields over the 8-neighbour moves are
+precomputed for every lighthouse. Fields towards any other cell are computed
+lazily and kept in a small LRU cache, so every turn only does array lookups.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Same order as NAVIGATION_VECTORS in main.py, the step field stores indexes into it
+MOVES = (
+    (-1, -1),  # NORTHWEST
+    (-1, 0),   # WEST
+    (-1, 1),   # SOUTHWEST
+    (0, -1),   # SOUTH
+    (0, 1),    # NORTH
+    (1, 1),    # NORTHEAST
+    (1, 0),    # EAST
+    (1, -1),   # SOUTHEAST
+)
+
+UNREACHABLE = np.iinfo(np.uint16).max
+NO_STEP = -1
+
+
+def walkable_from_initial_state(initial_state):
+    """Walkable grid [y, x] of a NewPlayerInitialState (non-zero is playable)"""
+    return np.array([list(row.Row) for row in initial_state.Map], dtype=np.int32) != 0
+
+
+def _shift_slices(shape, dx, dy):
+    """Slices (dst, src) such that ``dst[y, x]`` lines up with ``src[y + dy, x + dx]``"""
+    height, width = shape
+    dst = (slice(max(0, -dy), min(height, height - dy)), slice(max(0, -dx), min(width, width - dx)))
+    src = (slice(max(0, dy), min(height, height + dy)), slice(max(0, dx), min(width, width + dx)))
+    return dst, src
+
+
+def _shifted(values, dx, dy, fill):
+    """
+    Return ``out`` with ``out[y, x] == values[y + dy, x + dx]``
+    Cells whose neighbour falls outside the grid get ``fill``
+    """
+    out = np.full_like(values, fill)
+    dst, src = _shift_slices(values.shape, dx, dy)
+    out[dst] = values[src]
+    return out
+
+
+class DistanceField:
+    """BFS distances towards one destination plus the move to take from every cell"""
+
+    __slots__ = ("dist", "step")
+
+    def __init__(self, dist, step):
+        self.dist = dist  # uint16[h, w], UNREACHABLE for walls / disconnected cells
+        self.step = step  # int8[h, w], index into MOVES or NO_STEP
+
+    @property
+    def nbytes(self):
+        return self.dist.nbytes + self.step.nbytes
+
+
+def compute_field(walkable, destination, dist=None, step=None):
+    """
+    Compute the distance and next-step field towards ``destination`` (x, y)
+    The BFS expands the whole frontier at once with array shifts; ``dist`` and
+    ``step`` may be preallocated uint16/int8 buffers to fill in place
+    """
+    height, width = walkable.shape
+    if dist is None:
+        dist = np.empty((height, width), dtype=np.uint16)
+    if step is None:
+        step = np.empty((height, width), dtype=np.int8)
+    dist.fill(UNREACHABLE)
+    step.fill(NO_STEP)
+    dx0, dy0 = destination
+    if not (0 <= dx0 < width and 0 <= dy0 < height) or not walkable[dy0, dx0]:
+        return DistanceField(dist, step)
+
+    dist[dy0, dx0] = 0
+    frontier = np.zeros((height, width), dtype=bool)
+    frontier[dy0, dx0] = True
+    unvisited = walkable.copy()
+    unvisited[dy0, dx0] = False
+    shifts = [_shift_slices(walkable.shape, mx, my) for mx, my in MOVES]
+    grown = np.empty_like(frontier)
+    level = 0
+    while frontier.any():
+        level += 1
+        grown.fill(False)
+        for dst, src in shifts:
+            grown[dst] |= frontier[src]
+        np.logical_and(grown, unvisited, out=frontier)
+        dist[frontier] = level
+        unvisited &= ~frontier
+
+    # A cell steps to the first neighbour (in MOVES order) that is one closer
+    reachable = (dist != UNREACHABLE) & (dist != 0)
+    wanted = dist.astype(np.int32) - 1
+    pending = reachable.copy()
+    for index, (mx, my) in enumerate(MOVES):
+        neighbour = _shifted(dist, mx, my, UNREACHABLE).astype(np.int32)
+        hit = pending & (neighbour == wanted)
+        step[hit] = index
+        pending &= ~hit
+    return DistanceField(dist, step)
+
+
+class NavigationGrid:
+    """
+    Precomputed navigation data for one map
+    Lighthouse fields are built eagerly, any other destination is cached on demand
+    """
+
+    def __init__(self, walkable, targets=(), cache_size=64, target_dist=None, target_step=None):
+        self.walkable = np.ascontiguousarray(walkable, dtype=bool)
+        self.height, self.width = self.walkable.shape
+        self.cache_size = cache_size
+        self.targets = [tuple(target) for target in targets]
+        self.fields = {}
+        self._lazy_fields = OrderedDict()
+        # Grids can be shared by several bots of one process, only the lazy cache is mutable
+        self._lazy_lock = threading.Lock()
+        # Fields of every target stacked as [target, y, x], the DistanceFields are views into them
+        # Precomputed stacks (e.g. mapped from the map cache) are used as they are
+        if target_dist is None or target_step is None:
+            shape = (len(self.targets), self.height, self.width)
+            target_dist = np.empty(shape, dtype=np.uint16)
+            target_step = np.empty(shape, dtype=np.int8)
+            for index, target in enumerate(self.targets):
+                compute_field(self.walkable, target, target_dist[index], target_step[index])
+        self.target_dist = target_dist
+        self.target_step = target_step
+        for index, target in enumerate(self.targets):
+            self.fields[target] = DistanceField(target_dist[index], target_step[index])
+
+    @classmethod
+    def from_initial_state(cls, initial_state, cache_size=64):
+        """Build the grid from a NewPlayerInitialState (rows indexed by Y, non-zero is playable)"""
+        walkable = walkable_from_initial_state(initial_state)
+        targets = [(lh.Position.X, lh.Position.Y) for lh in initial_state.Lighthouses]
+        return cls(walkable, targets, cache_size=cache_size)
+
+    def is_walkable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and bool(self.walkable[y, x])
+
+    def field(self, destination):
+        """Return the DistanceField towards ``destination``, computing it if needed"""
+        destination = tuple(destination)
+        field = self.fields.get(destination)
+        if field is not None:
+            return field
+        with self._lazy_lock:
+            field = self._lazy_fields.get(destination)
+            if field is not None:
+                self._lazy_fields.move_to_end(destination)
+                return field
+        field = compute_field(self.walkable, destination)
+        if self.cache_size > 0:
+            with self._lazy_lock:
+                self._lazy_fields[destination] = field
+                if len(self._lazy_fields) > self.cache_size:
+                    self._lazy_fields.popitem(last=False)
+        return field
+
+    def distance(self, source, destination):
+        """Number of moves from ``source`` to ``destination``, or None if unreachable"""
+        x, y = source
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        value = int(self.field(destination).dist[y, x])
+        return None if value == UNREACHABLE else value
+
+    def target_distances(self, source):
+        """Distance from ``source`` to every eager target, in target order (UNREACHABLE if none)"""
+        x, y = source
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return np.full(len(self.targets), UNREACHABLE, dtype=np.uint16)
+        return self.target_dist[:, y, x]
+
+    def next_move(self, source, destination):
+        """Move vector (dx, dy) along a shortest path, or None if there is no useful step"""
+        x, y = source
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        index = int(self.field(destination).step[y, x])
+        return None if index == NO_STEP else MOVES[index]
+
+    def path(self, source, destination, limit=None):
+        """Moves along a shortest path from ``source`` to ``destination``, at most ``limit`` of them"""
+        x, y = source
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return []
+        step = self.field(destination).step
+        moves = []
+        while limit is None or len(moves) < limit:
+            index = int(step[y, x])
+            if index == NO_STEP:
+                break
+            dx, dy = MOVES[index]
+            moves.append((dx, dy))
+            x, y = x + dx, y + dy
+        return moves
+
+    @property
+    def nbytes(self):
+        lazy = sum(field.nbytes for field in self._lazy_fields.values())
+        return self.walkable.nbytes + self.target_dist.nbytes + self.target_step.nbytes + lazy
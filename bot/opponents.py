@@ -0,0 +1,248 @@
+"""
+What the other players have been doing, inferred from the lighthouses
+
+The engine never shows the other bots, but their actions leave marks on the
+lighthouse list: an owner switching to player P means P stood there and
+attacked with more than the lighthouse had, an owned lighthouse holding more
+energy than the decay leaves means its owner reinforced it. OpponentModel reads
+those marks from the ids in each LighthouseChanges, so a turn costs
+O(changes), and keeps per rival where it was last seen, how much it spends and
+how often it acts. The queries built on top are cheap heuristics:
+
+- ``reserve``: energy a rival probably holds, its spending rate (never less than
+  the income we see ourselves) times the turns since it last spent, capped at its
+  largest attack or ``_SAVING_TURNS`` turns of that rate; 0 until it is seen acting
+- ``contest_probability``: chance a rival reaches a lighthouse within N turns,
+  from its last known position, how long ago that was and how active it is
+- ``safe_attack_energy``: energy to take a lighthouse with enough left that the
+  rivals likely to contest it cannot take it straight back, and never less than
+  ``_HOLD_TURNS`` turns of decay so an uncontested capture does not lapse at once
+"""
+from bot.metrics import SMOOTHING
+from bot.navigation import UNREACHABLE
+from bot.simulation import LIGHTHOUSE_DECAY, NEUTRAL
+
+_UNKNOWN = -1
+_PRIOR_ACTIVITY = 0.5   # chance a rival we have not seen yet acts in a turn
+_SAVING_TURNS = 10      # turns of income a rival is assumed to save beyond its largest attack
+_HOLD_TURNS = 10        # turns of decay an attack covers when no rival threatens the lighthouse
+
+
+class OpponentState:
+    """Everything known about one rival"""
+
+    __slots__ = (
+        "player_id", "lighthouse", "seen_turn", "spent", "spend_rate", "largest_spend",
+        "last_spend_turn", "actions", "captures", "first_turn",
+    )
+
+    def __init__(self, player_id, first_turn=0):
+        self.player_id = player_id
+        self.lighthouse = None       # lighthouse it was last seen acting on
+        self.seen_turn = None
+        self.spent = 0
+        self.spend_rate = 0.0        # energy spent per turn, moving average
+        self.largest_spend = 0
+        self.last_spend_turn = first_turn
+        self.actions = 0
+        self.captures = 0
+        self.first_turn = first_turn
+
+    def activity(self, turn):
+        """Share of the turns with an action we could see"""
+        turns = turn - self.first_turn
+        if turns <= 0:
+            return _PRIOR_ACTIVITY
+        return min(1.0, (self.actions + _PRIOR_ACTIVITY) / (turns + 1))
+
+    def as_dict(self, turn):
+        return {
+            "lighthouse": self.lighthouse,
+            "seen_turn": self.seen_turn,
+            "spent": self.spent,
+            "spend_rate": self.spend_rate,
+            "largest_spend": self.largest_spend,
+            "actions": self.actions,
+            "captures": self.captures,
+            "activity": self.activity(turn),
+        }
+
+
+class OpponentModel:
+    """
+    Rivals of ``index.player_num`` in a game of ``player_count`` players
+    ``update`` must see every turn, right after ``LighthouseIndex.update``
+    """
+
+    def __init__(self, index, navigation, player_count, decay=LIGHTHOUSE_DECAY):
+        self.index = index
+        self.navigation = navigation
+        self.decay = decay
+        self.player_num = index.player_num
+        self.owner = index.owner.copy()
+        self.energy = index.energy.copy()
+        self.turn = 0
+        self.income = 0.0            # our own income per turn, a floor for the rivals
+        self._last_energy = None
+        self.opponents = {
+            player_id: OpponentState(player_id)
+            for player_id in range(1, max(player_count, 1) + 1)
+            if player_id != self.player_num
+        }
+
+    def opponent(self, player_id):
+        state = self.opponents.get(player_id)
+        if state is None:
+            state = self.opponents[player_id] = OpponentState(player_id, self.turn)
+        return state
+
+    def update(self, changes, turn, our_energy=None, our_spent=0, our_lighthouse=None):
+        """
+        Read the rivals' actions out of ``changes`` (a LighthouseChanges)
+        ``our_spent`` and ``our_lighthouse`` describe our own attack of the previous
+        turn, so its effects are not blamed on anyone else
+        """
+        self.turn = turn
+        if our_energy is not None:
+            if self._last_energy is not None:
+                gained = max(0, our_energy - self._last_energy + our_spent)
+                self.income += SMOOTHING * (gained - self.income)
+            self._last_energy = our_energy
+
+        index = self.index
+        touched = set(changes.owner)
+        touched.update(changes.energy)
+        for lh_id in touched:
+            before_owner, before_energy = int(self.owner[lh_id]), int(self.energy[lh_id])
+            owner, energy = int(index.owner[lh_id]), int(index.energy[lh_id])
+            self.owner[lh_id], self.energy[lh_id] = owner, energy
+            if before_owner == _UNKNOWN or lh_id == our_lighthouse:
+                continue
+            self._infer(lh_id, before_owner, before_energy, owner, energy, turn)
+
+    def _infer(self, lh_id, before_owner, before_energy, owner, energy, turn):
+        decayed = before_energy - self.decay if before_owner != NEUTRAL else before_energy
+        if owner != before_owner and owner not in (NEUTRAL, self.player_num):
+            # Captured: the attack paid the old energy and left ``energy`` after the decay
+            spent = energy + self.decay + before_energy
+            self._acted(self.opponent(owner), lh_id, spent, turn, capture=True)
+        elif owner == before_owner and owner not in (NEUTRAL, self.player_num) and energy > decayed:
+            # Reinforced by its owner
+            self._acted(self.opponent(owner), lh_id, energy - decayed, turn)
+
+    def _acted(self, state, lh_id, spent, turn, capture=False):
+        if state.seen_turn is not None and state.seen_turn < turn:
+            gap = turn - state.last_spend_turn
+            state.spend_rate += SMOOTHING * (spent / max(gap, 1) - state.spend_rate)
+        state.lighthouse = lh_id
+        state.seen_turn = turn
+        state.spent += spent
+        state.largest_spend = max(state.largest_spend, spent)
+        state.last_spend_turn = turn
+        state.actions += 1
+        state.captures += capture
+
+    def reserve(self, player_id, turn=None):
+        """Energy ``player_id`` probably holds right now, 0 for a rival never seen acting"""
+        turn = self.turn if turn is None else turn
+        state = self.opponents.get(player_id)
+        if state is None or state.seen_turn is None:
+            return 0.0
+        rate = max(state.spend_rate, self.income)
+        saved = rate * max(turn - state.last_spend_turn, 0)
+        return min(saved, max(state.largest_spend, rate * _SAVING_TURNS))
+
+    def _distance(self, state, lh_id):
+        """Moves from where ``state`` was last seen to ``lh_id``, None if never seen"""
+        if state.lighthouse is None:
+            return None
+        x, y = self.index.positions[state.lighthouse]
+        if self.navigation is None:
+            # No map: 8-neighbour moves without walls
+            tx, ty = self.index.positions[lh_id]
+            return max(abs(tx - x), abs(ty - y))
+        distance = int(self.navigation.target_dist[lh_id, y, x])
+        return None if distance == UNREACHABLE else distance
+
+    def reach_probability(self, player_id, lh_id, within):
+        """Chance ``player_id`` stands on ``lh_id`` at some point in the next ``within`` turns"""
+        state = self.opponents.get(player_id)
+        if state is None:
+            return 0.0
+        activity = state.activity(self.turn)
+        distance = self._distance(state, lh_id)
+        if distance is None:
+            # Never seen: any lighthouse is as likely as the next
+            return activity * min(1.0, within / max(len(self.index), 1))
+        # It may have walked ``elapsed`` moves towards the lighthouse since we last saw it
+        elapsed = self.turn - state.seen_turn
+        slack = within + elapsed - distance
+        if slack < 0:
+            return 0.0
+        return activity * min(1.0, (slack + 1) / (within + 1))
+
+    def contest_probability(self, lh_id, within=5):
+        """Chance any rival reaches ``lh_id`` within ``within`` turns"""
+        free = 1.0
+        for player_id in self.opponents:
+            free *= 1.0 - self.reach_probability(player_id, lh_id, within)
+        return 1.0 - free
+
+    def min_energy_to_take(self, lh_id):
+        """Smallest attack that captures ``lh_id`` as it is now (0 if it is already ours)"""
+        if int(self.owner[lh_id]) == self.player_num:
+            return 0
+        return int(self.energy[lh_id]) + 1
+
+    def min_energy_to_hold(self, lh_id, turns=1):
+        """Smallest attack that captures ``lh_id`` and keeps it through ``turns`` decay steps"""
+        return self.min_energy_to_take(lh_id) + self.decay * turns
+
+    def safe_attack_energy(self, lh_id, within=20, threshold=0.0):
+        """
+        Attack that captures ``lh_id`` and leaves more energy on it than any rival
+        able (reach chance above ``threshold``) to come within ``within`` turns can bring
+        With no such rival it still covers ``_HOLD_TURNS`` turns of decay
+        """
+        needed = self.min_energy_to_take(lh_id)
+        threat = self.threat(lh_id, within, threshold)
+        cushion = self.decay * (within if threat > 0 else _HOLD_TURNS)
+        if int(self.owner[lh_id]) == self.player_num:
+            # Already ours: top it up above the threat, decay included
+            return max(0, int(threat + cushion) + 1 - int(self.energy[lh_id]))
+        return needed + int(threat + cushion)
+
+    def threat(self, lh_id, within=20, threshold=0.0):
+        """Largest reserve of the rivals that may reach ``lh_id`` within ``within`` turns"""
+        threat = 0.0
+        for player_id in self.opponents:
+            if self.reach_probability(player_id, lh_id, within) > threshold:
+                threat = max(threat, self.reserve(player_id, self.turn + within))
+        return threat
+
+    def likely_targets(self, player_id, k=3):
+        """
+        Lighthouses ``player_id`` is most likely to go for next: the closest to where it was
+        last seen that it does not own, cheapest first on ties
+        """
+        state = self.opponents.get(player_id)
+        if state is None or state.lighthouse is None:
+            return []
+        candidates = []
+        for lh_id in range(len(self.index)):
+            if int(self.owner[lh_id]) == player_id:
+                continue
+            distance = self._distance(state, lh_id)
+            if distance is not None:
+                candidates.append((distance, int(self.energy[lh_id]), lh_id))
+        candidates.sort()
+        return [lh_id for _, _, lh_id in candidates[:k]]
+
+    def as_dict(self):
+        return {
+            "turn": self.turn,
+            "income": self.income,
+            "opponents": {
+                player_id: state.as_dict(self.turn) for player_id, state in sorted(self.opponents.items())
+            },
+        }
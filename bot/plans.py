@@ -0,0 +1,162 @@
+"""
+Multi-turn movement plans
+
+Routing to the target (the energy route DP of bot.energy) is the expensive
+part of a turn, and its answer rarely changes from one turn to the next.
+PlanCache keeps the path of the last route and hands out its next move in O(1)
+for as long as the plan holds. A plan is dropped, and the caller routes
+afresh, when:
+
+- ``owner``: the target lighthouse changed owner
+- ``energy``: its energy moved more than ``energy_threshold`` from when we planned
+- ``key``: we got hold of a new key (new connections, maybe a better target)
+- ``blocked``: the next cell is not walkable
+- ``harvested``: the next cell is expected to hold ``harvest_tolerance`` less
+  than when we planned (someone got there first), the route is no longer the best
+- ``moved``: we are not where the plan expected (a move was refused)
+- ``finished``: the path is walked (partial paths end at the route horizon)
+- ``target``: the caller now wants another target (the target is still chosen
+  every turn: freezing it loses games)
+
+The attack and connect once there are left to the strategies that run before
+the move, see bot.strategies.
+"""
+import time
+
+from bot.metrics import NULL_METRICS, SMOOTHING
+
+
+class Plan:
+    __slots__ = ("target", "position", "owner", "energy", "keys", "moves", "yields", "step", "expected")
+
+    def __init__(self, target, position, owner, energy, keys, moves, yields, start):
+        self.target = target        # lighthouse id
+        self.position = position    # (x, y) of the target
+        self.owner = owner
+        self.energy = energy
+        self.keys = keys            # LighthouseIndex.key_count when planned
+        self.moves = moves          # [(dx, dy)]
+        self.yields = yields        # energy expected on the cell reached by each move, or None
+        self.step = 0               # index of the next move
+        self.expected = start       # where we should be before the next move
+
+
+class PlanStats:
+    __slots__ = ("hits", "misses", "invalidated", "hit_cost", "miss_cost")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = {}
+        self.hit_cost = 0.0      # seconds to follow a plan, moving average
+        self.miss_cost = 0.0     # seconds to route afresh, moving average
+
+    def as_dict(self):
+        asked = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / asked if asked else 0.0,
+            "invalidated": dict(sorted(self.invalidated.items())),
+            "hit_cost": self.hit_cost,
+            "miss_cost": self.miss_cost,
+            "saved_seconds": self.hits * max(0.0, self.miss_cost - self.hit_cost),
+        }
+
+
+class PlanCache:
+    """
+    The current plan of one bot
+    ``follow`` returns the next move of a plan still valid or None; after a None the caller
+    routes and hands the path to ``start``, and ``record_miss`` times that.
+    ``turn`` is the bot's turn counter, a move made on turn t reaches its cell on t + 1
+    """
+
+    def __init__(self, index, walkable=None, field=None, energy_threshold=20, harvest_tolerance=10,
+                 metrics=NULL_METRICS, clock=time.perf_counter):
+        self.index = index
+        self.walkable = walkable
+        self.field = field  # bot.energy.EnergyField for the ``harvested`` check, optional
+        self.energy_threshold = energy_threshold
+        self.harvest_tolerance = harvest_tolerance
+        self.metrics = metrics
+        self.clock = clock
+        self.plan = None
+        self.stats = PlanStats()
+
+    def invalid(self, position, turn, target=None):
+        """Why the current plan cannot give the next move, None when it can"""
+        plan = self.plan
+        if plan is None:
+            return "none"
+        if target is not None and target != plan.target:
+            return "target"
+        if plan.step >= len(plan.moves):
+            return "finished"
+        if position != plan.expected:
+            return "moved"
+        index = self.index
+        if index.owner[plan.target] != plan.owner:
+            return "owner"
+        if abs(int(index.energy[plan.target]) - plan.energy) > self.energy_threshold:
+            return "energy"
+        if index.key_count > plan.keys:
+            return "key"
+        dx, dy = plan.moves[plan.step]
+        x, y = position[0] + dx, position[1] + dy
+        if self.walkable is not None:
+            height, width = self.walkable.shape
+            if not (0 <= x < width and 0 <= y < height and self.walkable[y, x]):
+                return "blocked"
+        if plan.yields is not None:
+            if self.field.cell_estimate(x, y, turn + 1) < plan.yields[plan.step] - self.harvest_tolerance:
+                return "harvested"
+        return None
+
+    def follow(self, position, turn, target=None):
+        """Next move of the plan if it still holds (and aims at ``target`` when given)"""
+        start = self.clock()
+        reason = self.invalid(position, turn, target)
+        if reason is not None:
+            self.drop(reason)
+            return None
+        plan = self.plan
+        move = plan.moves[plan.step]
+        plan.step += 1
+        plan.expected = (position[0] + move[0], position[1] + move[1])
+        stats = self.stats
+        stats.hits += 1
+        stats.hit_cost += SMOOTHING * (self.clock() - start - stats.hit_cost)
+        self.metrics.count("plan.hit")
+        return move
+
+    def drop(self, reason):
+        if self.plan is not None:
+            invalidated = self.stats.invalidated
+            invalidated[reason] = invalidated.get(reason, 0) + 1
+            self.metrics.count(f"plan.invalidated.{reason}")
+        self.plan = None
+
+    def start(self, position, turn, target, moves):
+        """Commit to ``moves`` from ``position`` towards lighthouse ``target``; returns the first move"""
+        if not moves:
+            self.plan = None
+            return None
+        yields = None
+        if self.field is not None:
+            yields = self.field.yields(position, moves, turn)
+        index = self.index
+        self.plan = Plan(
+            target, index.positions[target], int(index.owner[target]), int(index.energy[target]),
+            index.key_count, moves, yields, position,
+        )
+        move = moves[0]
+        self.plan.step = 1
+        self.plan.expected = (position[0] + move[0], position[1] + move[1])
+        return move
+
+    def record_miss(self, seconds):
+        stats = self.stats
+        stats.misses += 1
+        stats.miss_cost += SMOOTHING * (seconds - stats.miss_cost)
+        self.metrics.count("plan.miss")
@@ -0,0 +1,182 @@
+"""
+Binary replays of what the engine sent and what we answered
+
+A replay file is a magic header followed by records: a kind byte, the length
+of the payload, then the serialized protobuf (NewPlayerInitialState, NewTurn
+or NewAction). A new game starts at every initial state record, so one file
+can hold several games. Messages are serialized on the caller's thread (that
+is a few microseconds and keeps later mutations of the message out of the
+file) and written out by a background thread every ``interval`` seconds.
+
+``read_replay`` streams the records back, ``read_games`` groups them into
+RecordedGames, and ``replay_game`` feeds a recorded game through any BotGame
+and compares its decisions with the recorded ones.
+"""
+import os
+import random
+import struct
+import threading
+import time
+from collections import deque
+
+from internal.handler.coms import game_pb2
+
+REPLAY_MAGIC = b"LHREPLAY"
+INITIAL_STATE, TURN, ACTION = 1, 2, 3
+_MESSAGES = {
+    INITIAL_STATE: game_pb2.NewPlayerInitialState,
+    TURN: game_pb2.NewTurn,
+    ACTION: game_pb2.NewAction,
+}
+_HEADER = struct.Struct("<BI")  # kind, payload length
+
+
+class ReplayWriter:
+    """Appends records to ``path`` from a daemon thread"""
+
+    def __init__(self, path, interval=0.05):
+        self.path = path
+        self.interval = interval
+        self.pending = deque()
+        self.records = 0
+        self.stream = open(path, "ab")
+        if self.stream.tell() == 0:
+            self.stream.write(REPLAY_MAGIC)
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="replay-writer", daemon=True)
+        self.thread.start()
+
+    def _add(self, kind, message):
+        data = message.SerializeToString()
+        self.pending.append(_HEADER.pack(kind, len(data)) + data)
+        self.records += 1
+
+    def initial_state(self, message):
+        self._add(INITIAL_STATE, message)
+
+    def turn(self, turn, action):
+        self._add(TURN, turn)
+        self._add(ACTION, action)
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        chunks = []
+        pending = self.pending
+        while pending:
+            chunks.append(pending.popleft())
+        if chunks:
+            self.stream.write(b"".join(chunks))
+            self.stream.flush()
+
+    def close(self):
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        self.thread.join(timeout=5.0)
+        self.stream.close()
+
+
+def read_replay(path):
+    """Yield (kind, message) for every record of a replay file"""
+    with open(path, "rb") as stream:
+        if stream.read(len(REPLAY_MAGIC)) != REPLAY_MAGIC:
+            raise ValueError(f"{path} is not a replay file")
+        while True:
+            header = stream.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            kind, size = _HEADER.unpack(header)
+            data = stream.read(size)
+            if len(data) < size:
+                return  # cut short by a crash, keep what is complete
+            message = _MESSAGES[kind]()
+            message.ParseFromString(data)
+            yield kind, message
+
+
+class RecordedGame:
+    __slots__ = ("source", "initial_state", "turns")
+
+    def __init__(self, source, initial_state):
+        self.source = source
+        self.initial_state = initial_state
+        self.turns = []  # [(NewTurn, NewAction)]
+
+
+def read_games(path):
+    """Yield the RecordedGames of a replay file"""
+    game, pending_turn = None, None
+    for kind, message in read_replay(path):
+        if kind == INITIAL_STATE:
+            if game is not None:
+                yield game
+            game, pending_turn = RecordedGame(path, message), None
+        elif kind == TURN:
+            pending_turn = message
+        elif kind == ACTION and game is not None and pending_turn is not None:
+            game.turns.append((pending_turn, message))
+            pending_turn = None
+    if game is not None:
+        yield game
+
+
+def replay_paths(paths):
+    """Expand directories into the replay files they hold"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".replay")
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def same_action(a, b):
+    return (
+        a.Action == b.Action
+        and a.Destination.X == b.Destination.X
+        and a.Destination.Y == b.Destination.Y
+        and a.Energy == b.Energy
+    )
+
+
+class ReplayResult:
+    __slots__ = ("source", "turns", "latencies", "diffs")
+
+    def __init__(self, source):
+        self.source = source
+        self.turns = 0
+        self.latencies = []
+        self.diffs = []   # (turn number, recorded NewAction, new NewAction)
+
+
+def replay_game(game, bot_factory, seed=0):
+    """
+    Play ``game`` through ``bot_factory(player_id)`` turn by turn
+    The bot sees exactly the recorded turns; ``random`` is seeded so reruns agree
+    """
+    random.seed(seed)
+    bot = bot_factory(game.initial_state.PlayerID)
+    result = ReplayResult(game.source)
+    clock = time.perf_counter
+    try:
+        bot.load_initial_state(game.initial_state)
+        for number, (turn, recorded) in enumerate(game.turns, 1):
+            start = clock()
+            action = bot.new_turn_action(turn)
+            result.latencies.append(clock() - start)
+            result.turns += 1
+            if not same_action(recorded, action):
+                # Pooled actions are reused by later turns, keep a copy
+                copy = game_pb2.NewAction()
+                copy.CopyFrom(action)
+                result.diffs.append((number, recorded, copy))
+    finally:
+        bot.close()
+    return result
@@ -0,0 +1,133 @@
+"""
+Per-turn deadline handling and anytime decision making
+
+A turn always starts with a cheap fallback action. Deeper search stages then
+refine it one after the other while the budget lasts, and the best action found
+so far is returned before the engine deadline. A stage that raises ends the
+search for the turn without losing that answer.
+"""
+import time
+
+from bot.metrics import NULL_METRICS
+
+DEFAULT_MARGIN = 0.1  # seconds kept in reserve for serialization and network
+
+
+class Deadline:
+    """Point in time by which the turn answer must be ready"""
+
+    __slots__ = ("expires_at", "clock")
+
+    def __init__(self, budget, clock=time.perf_counter):
+        self.clock = clock
+        self.expires_at = clock() + max(0.0, budget)
+
+    @classmethod
+    def from_context(cls, context, margin, default_budget):
+        """
+        Build the deadline of a gRPC call, keeping ``margin`` seconds in reserve
+        Falls back to ``default_budget`` when the call carries no deadline
+        """
+        remaining = context.time_remaining() if context is not None else None
+        if remaining is None:
+            remaining = default_budget
+        return cls(remaining - margin)
+
+    def remaining(self):
+        return self.expires_at - self.clock()
+
+    def expired(self):
+        return self.clock() >= self.expires_at
+
+
+class SchedulerStats:
+    """Counts how deep each turn got before answering"""
+
+    __slots__ = ("turns", "full_depth", "fallback", "depth_counts", "overruns", "failures")
+
+    def __init__(self):
+        self.turns = 0
+        self.full_depth = 0      # every stage finished
+        self.fallback = 0        # no stage finished, the fallback was sent
+        self.depth_counts = {}   # completed stages -> turns
+        self.overruns = 0        # answered after the deadline
+        self.failures = 0        # a stage raised, the answer of the stages before it was sent
+
+    def record(self, depth, stages, overrun, failed=False):
+        self.turns += 1
+        self.depth_counts[depth] = self.depth_counts.get(depth, 0) + 1
+        if depth == stages:
+            self.full_depth += 1
+        if depth == 0 and stages > 0:
+            self.fallback += 1
+        if overrun:
+            self.overruns += 1
+        if failed:
+            self.failures += 1
+
+    def as_dict(self):
+        turns = self.turns or 1
+        return {
+            "turns": self.turns,
+            "full_depth": self.full_depth,
+            "fallback": self.fallback,
+            "overruns": self.overruns,
+            "failures": self.failures,
+            "full_depth_rate": self.full_depth / turns,
+            "fallback_rate": self.fallback / turns,
+            "depth_counts": dict(sorted(self.depth_counts.items())),
+        }
+
+
+class AnytimeScheduler:
+    """
+    Runs a fallback and then refinement stages until the deadline
+    Stages are callables ``stage(deadline) -> action or None`` ordered from the
+    cheapest to the deepest; they must check the deadline themselves when they
+    loop, and returning None keeps the previous answer. A stage that raises is
+    counted as a failure and no further stage runs that turn
+    """
+
+    def __init__(self, margin=DEFAULT_MARGIN, default_budget=1.0, metrics=NULL_METRICS):
+        self.margin = margin
+        self.default_budget = default_budget
+        self.metrics = metrics
+        self.stats = SchedulerStats()
+
+    def deadline(self, context=None):
+        return Deadline.from_context(context, self.margin, self.default_budget)
+
+    def run(self, fallback, stages, deadline):
+        best = fallback()
+        depth = 0
+        failed = False
+        for stage in stages:
+            if deadline.expired():
+                break
+            try:
+                refined = stage(deadline)
+            except Exception as error:
+                failed = True
+                self.metrics.log(f"Search stage {depth} failed: {error!r}")
+                break
+            if refined is not None:
+                best = refined
+            depth += 1
+        overrun = deadline.expired()
+        self.stats.record(depth, len(stages), overrun, failed)
+        if self.metrics.enabled:
+            self.count(depth, len(stages), overrun, failed)
+        return best
+
+    def count(self, depth, stages, overrun, failed=False):
+        """The turn's SchedulerStats outcome as Metrics counters, rates are scheduler.* / scheduler.turns"""
+        metrics = self.metrics
+        metrics.count("scheduler.turns")
+        if depth == stages:
+            metrics.count("scheduler.full_depth")
+        if depth == 0 and stages > 0:
+            metrics.count("scheduler.fallback")
+        if overrun:
+            metrics.count("scheduler.overrun")
+        if failed:
+            metrics.count("scheduler.failure")
@@ -0,0 +1,213 @@
+"""
+Many bot identities and games in one process
+
+A SessionManager holds one isolated session per bot identity: its own servicer
+and BotGame, and its own Metrics registry writing to the shared log sink. Map
+data is shared through bot.maps.SharedMaps, so sessions on the same map build
+it once. Calls reach a session in one of two ways:
+
+- by metadata: a SessionRouter behind a single listener reads the
+  ``x-bot-session`` header of every call
+- by port: each session gets its own listener, and all listeners share one
+  thread pool (the engine only knows the address a bot joined with)
+
+The number of sessions is capped. When the cap is hit, the least recently used
+idle session is closed; sessions still waiting for their game are never closed.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import grpc
+
+from bot.metrics import Metrics, format_prometheus
+from internal.handler.coms import game_pb2_grpc as game_grpc
+
+SESSION_METADATA_KEY = "x-bot-session"
+
+
+class Session:
+    __slots__ = ("session_id", "servicer", "metrics", "created", "last_seen", "calls", "server")
+
+    def __init__(self, session_id, servicer, metrics):
+        self.session_id = session_id
+        self.servicer = servicer      # ClientServer-shaped, owns the BotGame as ``bg``
+        self.metrics = metrics
+        self.created = time.monotonic()
+        self.last_seen = self.created
+        self.calls = 0
+        self.server = None            # dedicated listener when routed by port
+
+    @property
+    def bot_game(self):
+        return self.servicer.bg
+
+    @property
+    def started(self):
+        """A call reached the session, it is no longer waiting for the engine"""
+        return self.calls > 0
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+        self.calls += 1
+
+    def close(self):
+        if self.server is not None:
+            self.server.stop(0)
+            self.server = None
+        self.servicer.close()
+
+    def as_dict(self):
+        bot_game = self.servicer.bg
+        return {
+            "player": bot_game.player_num,
+            "turns": bot_game.countT - 1,
+            "calls": self.calls,
+            "idle_seconds": time.monotonic() - self.last_seen,
+            "map": bot_game.map_data.fingerprint if bot_game.map_data is not None else None,
+            "metrics": self.metrics.as_dict(),
+        }
+
+
+class SessionManager:
+    """
+    Creates, finds and closes sessions
+    ``servicer_factory(session_id, bot_id, metrics)`` builds the servicer of a new session,
+    ``on_evict(session)`` is told about a session closed to make room, before it is closed
+    """
+
+    def __init__(self, servicer_factory, max_sessions=64, idle_after=30.0, metrics=None, on_evict=None):
+        self.servicer_factory = servicer_factory
+        self.on_evict = on_evict
+        self.max_sessions = max_sessions
+        self.idle_after = idle_after
+        self.metrics = metrics if metrics is not None else Metrics(enabled=False)
+        self.sessions = OrderedDict()
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def open(self, session_id, bot_id=None):
+        with self._lock:
+            if session_id in self.sessions:
+                raise ValueError(f"Session {session_id!r} already exists")
+            self._make_room()
+            # Every session has its own registry, they all log to the shared sink
+            if self.metrics.enabled:
+                metrics = Metrics(sink=self.metrics.sink)
+            else:
+                metrics = self.metrics
+            session = Session(session_id, self.servicer_factory(session_id, bot_id, metrics), metrics)
+            self.sessions[session_id] = session
+            return session
+
+    def _make_room(self):
+        while len(self.sessions) >= self.max_sessions:
+            now = time.monotonic()
+            idle = [
+                session for session in self.sessions.values()
+                if session.started and now - session.last_seen >= self.idle_after
+            ]
+            if not idle:
+                raise RuntimeError(f"All {self.max_sessions} sessions are busy")
+            victim = min(idle, key=lambda session: session.last_seen)
+            del self.sessions[victim.session_id]
+            if self.on_evict is not None:
+                self.on_evict(victim)
+            victim.close()
+            self.evictions += 1
+
+    def get(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.touch()
+        return session
+
+    def get_or_open(self, session_id):
+        session = self.get(session_id)
+        if session is None:
+            try:
+                session = self.open(session_id)
+                session.touch()
+            except ValueError:
+                # Opened by a concurrent call
+                session = self.get(session_id)
+        return session
+
+    def close(self, session_id):
+        with self._lock:
+            session = self.sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def as_dict(self):
+        return {
+            "sessions": {session_id: session.as_dict() for session_id, session in list(self.sessions.items())},
+            "evictions": self.evictions,
+            "process": self.metrics.as_dict(),
+        }
+
+    # Registry interface of bot.metrics.MetricsServer
+    def to_json(self):
+        return json.dumps(self.as_dict())
+
+    def to_prometheus(self, prefix="bot"):
+        family_sets = [self.metrics.prometheus_families(prefix)]
+        for session_id, session in list(self.sessions.items()):
+            if session.metrics is not self.metrics:
+                family_sets.append(session.metrics.prometheus_families(prefix, {"session": session_id}))
+        return format_prometheus(family_sets)
+
+
+class SessionRouter(game_grpc.GameServiceServicer):
+    """
+    Servicer of the shared listener, hands each call to the session named in its metadata
+    Unknown sessions are opened on InitialState, any other call for them is rejected
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def _session_id(self, context):
+        for key, value in context.invocation_metadata():
+            if key == SESSION_METADATA_KEY:
+                return value
+        context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Missing {SESSION_METADATA_KEY} metadata")
+
+    def Join(self, request, context):
+        return None
+
+    def InitialState(self, request, context):
+        session = self.manager.get_or_open(self._session_id(context))
+        return session.servicer.InitialState(request, context)
+
+    def Turn(self, request, context):
+        session_id = self._session_id(context)
+        session = self.manager.get(session_id)
+        if session is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"Unknown session {session_id!r}")
+        return session.servicer.Turn(request, context)
+
+
+class PinnedSession(SessionRouter):
+    """Servicer of a per-session listener, every call goes to ``session_id``"""
+
+    def __init__(self, manager, session_id):
+        super().__init__(manager)
+        self.session_id = session_id
+
+    def _session_id(self, context):
+        return self.session_id
+
+
+def session_metadata(session_id):
+    """Call metadata that routes a call to ``session_id``"""
+    return ((SESSION_METADATA_KEY, session_id),)
+
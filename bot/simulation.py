@@ -0,0 +1,344 @@
+"""
+Lightweight forward model of the Lighthouses rules
+
+Everything that never changes during a game (walkable cells, per-cell energy
+regeneration, lighthouse positions, navigation fields and which lighthouse
+pairs have another lighthouse in between) lives in a StaticMap. The mutable
+part of a game is a SimState, cheap to copy, and ``step`` advances it by one
+round:
+
+1. every playable cell regenerates energy from the nearby lighthouses
+2. players collect the energy of their cell (split when they share it)
+3. players act in order: move, attack, connect or pass
+4. owned lighthouses decay, and become neutral (dropping their links) at 0
+5. players score their lighthouses, links and closed triangles
+"""
+import numpy as np
+
+from bot.connections import on_segment, segments_intersect, triangle_cells
+from bot.navigation import MOVES, NO_STEP, NavigationGrid, walkable_from_initial_state
+
+# Same values as game_pb2.Action
+PASS, MOVE, ATTACK, CONNECT = 0, 1, 2, 3
+
+NEUTRAL = 0
+RDIST = 5                 # lighthouses feed the cells closer than this
+CELL_ENERGY_MAX = 100
+LIGHTHOUSE_DECAY = 10
+LIGHTHOUSE_POINTS = 2
+CONNECTION_POINTS = 2
+VIEW_RADIUS = 3
+
+
+def regen_field(walkable, positions):
+    """Energy every playable cell gains per round: sum of floor(RDIST - distance) per lighthouse"""
+    height, width = walkable.shape
+    ys, xs = np.mgrid[0:height, 0:width]
+    regen = np.zeros((height, width), dtype=np.int32)
+    for lx, ly in positions:
+        gain = np.floor(RDIST - np.hypot(xs - lx, ys - ly)).astype(np.int32)
+        regen += np.maximum(gain, 0)
+    regen[~walkable] = 0
+    return regen
+
+
+class StaticMap:
+    """Read-only game data shared by every simulated state of one map"""
+
+    ARRAYS = ("walkable", "regen", "positions", "blocked", "lh_dist", "lh_step")
+
+    def __init__(self, walkable, regen, positions, blocked, lh_dist, lh_step):
+        self.walkable = walkable      # bool[h, w]
+        self.regen = regen            # int32[h, w]
+        self.positions = positions    # int32[n, 2] as (x, y)
+        self.blocked = blocked        # bool[n, n], another lighthouse lies on the segment
+        self.lh_dist = lh_dist        # uint16[n, h, w], distance to each lighthouse
+        self.lh_step = lh_step        # int8[n, h, w], move index towards each lighthouse
+        self.height, self.width = walkable.shape
+        self.coords = [tuple(pos) for pos in positions.tolist()]
+        self.ids = {pos: lh_id for lh_id, pos in enumerate(self.coords)}
+
+    @classmethod
+    def build(cls, walkable, positions, navigation=None, regen=None):
+        walkable = np.ascontiguousarray(walkable, dtype=bool)
+        coords = [tuple(pos) for pos in positions]
+        if navigation is None:
+            navigation = NavigationGrid(walkable, coords, cache_size=0)
+        count = len(coords)
+        blocked = np.zeros((count, count), dtype=bool)
+        for a in range(count):
+            for b in range(a + 1, count):
+                blocked[a, b] = blocked[b, a] = any(
+                    on_segment(coords[a], coords[b], coords[c])
+                    for c in range(count) if c != a and c != b
+                )
+        return cls(
+            walkable,
+            regen if regen is not None else regen_field(walkable, coords),
+            np.array(coords, dtype=np.int32).reshape(count, 2),
+            blocked,
+            navigation.target_dist,
+            navigation.target_step,
+        )
+
+    @classmethod
+    def from_initial_state(cls, initial_state, navigation=None):
+        walkable = walkable_from_initial_state(initial_state)
+        positions = [(lh.Position.X, lh.Position.Y) for lh in initial_state.Lighthouses]
+        return cls.build(walkable, positions, navigation)
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    def is_walkable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and bool(self.walkable[y, x])
+
+    def step_towards(self, x, y, lh_id):
+        index = int(self.lh_step[lh_id, y, x])
+        return None if index == NO_STEP else MOVES[index]
+
+
+class SimPlayer:
+    __slots__ = ("player_id", "x", "y", "energy", "score", "keys")
+
+    def __init__(self, player_id, x, y, energy=0, score=0, keys=()):
+        self.player_id = player_id
+        self.x = x
+        self.y = y
+        self.energy = energy
+        self.score = score
+        self.keys = set(keys)
+
+    def copy(self):
+        return SimPlayer(self.player_id, self.x, self.y, self.energy, self.score, self.keys)
+
+
+class SimState:
+    """Mutable part of a simulated game"""
+
+    __slots__ = ("static", "energy", "owner", "lh_energy", "links", "players", "turn")
+
+    def __init__(self, static, energy, owner, lh_energy, links, players, turn=0):
+        self.static = static
+        self.energy = energy          # int32[h, w] cell energy
+        self.owner = owner            # list, player id or NEUTRAL per lighthouse
+        self.lh_energy = lh_energy    # list, energy per lighthouse
+        self.links = links            # set of (a, b) with a < b
+        self.players = players        # list of SimPlayer
+        self.turn = turn
+
+    @classmethod
+    def initial(cls, static, starts):
+        """Fresh game: neutral lighthouses, empty cells, one player per (player id, x, y)"""
+        count = len(static.coords)
+        return cls(
+            static,
+            np.zeros((static.height, static.width), dtype=np.int32),
+            [NEUTRAL] * count,
+            [0] * count,
+            set(),
+            [SimPlayer(player_id, x, y) for player_id, x, y in starts],
+        )
+
+    @classmethod
+    def from_turn(cls, static, turn, player_id, energy=None, turn_number=0):
+        """
+        Our view of a live game: only our own player is known
+        Cells outside the View use ``energy`` if given, else one round of regeneration
+        ``turn_number`` is the game turn, the NewTurn message does not carry it
+        """
+        if energy is None:
+            energy = static.regen.copy()
+        else:
+            energy = np.array(energy, dtype=np.int32)
+        x, y = turn.Position.X, turn.Position.Y
+        size = len(turn.View)
+        radius = size // 2
+        for row_index, row in enumerate(turn.View):
+            cy = y + row_index - radius
+            for col_index, value in enumerate(row.Row):
+                cx = x + col_index - radius
+                if value >= 0 and static.is_walkable(cx, cy):
+                    energy[cy, cx] = value
+
+        count = len(static.coords)
+        owner, lh_energy = [NEUTRAL] * count, [0] * count
+        links, keys = set(), set()
+        for lh in turn.Lighthouses:
+            lh_id = static.ids.get((lh.Position.X, lh.Position.Y))
+            if lh_id is None:
+                continue
+            owner[lh_id], lh_energy[lh_id] = lh.Owner, lh.Energy
+            if lh.HaveKey:
+                keys.add(lh_id)
+            for pos in lh.Connections:
+                other = static.ids.get((pos.X, pos.Y))
+                if other is not None:
+                    links.add((min(lh_id, other), max(lh_id, other)))
+        player = SimPlayer(player_id, x, y, turn.Energy, turn.Score, keys)
+        return cls(static, energy, owner, lh_energy, links, [player], turn_number)
+
+    def copy(self):
+        return SimState(
+            self.static,
+            self.energy.copy(),
+            list(self.owner),
+            list(self.lh_energy),
+            set(self.links),
+            [player.copy() for player in self.players],
+            self.turn,
+        )
+
+    def lighthouse_at(self, x, y):
+        return self.static.ids.get((x, y))
+
+    def can_connect(self, player, a, b):
+        """Rules of CONNECT from lighthouse ``a`` to ``b`` for ``player``"""
+        owner = self.owner
+        if a == b or owner[a] != player.player_id or owner[b] != player.player_id:
+            return False
+        if b not in player.keys or (min(a, b), max(a, b)) in self.links:
+            return False
+        if self.static.blocked[a, b]:
+            return False
+        coords = self.static.coords
+        pa, pb = coords[a], coords[b]
+        for c, d in self.links:
+            if c == a or c == b or d == a or d == b:
+                continue
+            if segments_intersect(pa, pb, coords[c], coords[d]):
+                return False
+        return True
+
+    def view(self, player, radius=VIEW_RADIUS):
+        """Energy rows around ``player`` as sent in NewTurn.View, -1 outside the map"""
+        static = self.static
+        rows = []
+        for cy in range(player.y - radius, player.y + radius + 1):
+            row = []
+            for cx in range(player.x - radius, player.x + radius + 1):
+                row.append(int(self.energy[cy, cx]) if static.is_walkable(cx, cy) else -1)
+            rows.append(row)
+        return rows
+
+
+def legal_actions(state, player, attack_fractions=(1.0,)):
+    """
+    Candidate actions of ``player`` as (kind, x, y, energy) tuples
+    Attacks are limited to the amounts needed to take the lighthouse and to
+    ``attack_fractions`` of our energy to keep the branching factor small
+    """
+    static = state.static
+    actions = []
+    for dx, dy in MOVES:
+        nx, ny = player.x + dx, player.y + dy
+        if static.is_walkable(nx, ny):
+            actions.append((MOVE, nx, ny, 0))
+    lh_id = state.lighthouse_at(player.x, player.y)
+    if lh_id is not None:
+        amounts = {int(player.energy * fraction) for fraction in attack_fractions}
+        if state.owner[lh_id] != player.player_id and player.energy > state.lh_energy[lh_id]:
+            amounts.add(state.lh_energy[lh_id] + 1)
+        for amount in sorted(amounts):
+            if 0 < amount <= player.energy:
+                actions.append((ATTACK, player.x, player.y, amount))
+        for dest in sorted(player.keys):
+            if state.can_connect(player, lh_id, dest):
+                x, y = static.coords[dest]
+                actions.append((CONNECT, x, y, 0))
+    if not actions:
+        actions.append((PASS, player.x, player.y, 0))
+    return actions
+
+
+def _drop_links(state, lh_id):
+    state.links = {link for link in state.links if lh_id not in link}
+
+
+def apply_action(state, player, action):
+    """Apply one (kind, x, y, energy) action of ``player``, illegal actions are ignored"""
+    kind, x, y, amount = action
+    static = state.static
+    if kind == MOVE:
+        if max(abs(x - player.x), abs(y - player.y)) == 1 and static.is_walkable(x, y):
+            player.x, player.y = x, y
+            lh_id = state.lighthouse_at(x, y)
+            if lh_id is not None:
+                player.keys.add(lh_id)
+    elif kind == ATTACK:
+        lh_id = state.lighthouse_at(player.x, player.y)
+        amount = min(amount, player.energy)
+        if lh_id is None or amount <= 0:
+            return
+        player.energy -= amount
+        if state.owner[lh_id] == player.player_id:
+            state.lh_energy[lh_id] += amount
+        elif amount > state.lh_energy[lh_id]:
+            if state.owner[lh_id] != NEUTRAL:
+                _drop_links(state, lh_id)
+            state.owner[lh_id] = player.player_id
+            state.lh_energy[lh_id] = amount - state.lh_energy[lh_id]
+        else:
+            state.lh_energy[lh_id] -= amount
+            if state.lh_energy[lh_id] == 0 and state.owner[lh_id] != NEUTRAL:
+                state.owner[lh_id] = NEUTRAL
+                _drop_links(state, lh_id)
+    elif kind == CONNECT:
+        src = state.lighthouse_at(player.x, player.y)
+        dest = state.lighthouse_at(x, y)
+        if src is not None and dest is not None and state.can_connect(player, src, dest):
+            state.links.add((min(src, dest), max(src, dest)))
+            player.keys.discard(dest)
+
+
+def round_points(state, player_id):
+    """Points ``player_id`` scores at the end of a round"""
+    owned = [lh_id for lh_id, owner in enumerate(state.owner) if owner == player_id]
+    if not owned:
+        return 0
+    owned_set = set(owned)
+    links = [(a, b) for a, b in state.links if a in owned_set]
+    points = LIGHTHOUSE_POINTS * len(owned) + CONNECTION_POINTS * len(links)
+    if len(links) >= 3:
+        neighbours = {}
+        for a, b in links:
+            neighbours.setdefault(a, set()).add(b)
+            neighbours.setdefault(b, set()).add(a)
+        coords = state.static.coords
+        for a, b in links:
+            for c in neighbours[a] & neighbours[b]:
+                if c > b:
+                    points += triangle_cells(coords[a], coords[b], coords[c])
+    return points
+
+
+def step(state, actions):
+    """Advance ``state`` by one round, ``actions[i]`` belongs to ``state.players[i]``"""
+    static = state.static
+    energy = state.energy
+    np.minimum(energy + static.regen, CELL_ENERGY_MAX, out=energy)
+
+    cells = {}
+    for player in state.players:
+        cells.setdefault((player.x, player.y), []).append(player)
+    for (x, y), sharing in cells.items():
+        share = int(energy[y, x]) // len(sharing)
+        for player in sharing:
+            player.energy += share
+        energy[y, x] = 0
+
+    for player, action in zip(state.players, actions):
+        apply_action(state, player, action)
+
+    for lh_id, owner in enumerate(state.owner):
+        if owner != NEUTRAL:
+            state.lh_energy[lh_id] -= LIGHTHOUSE_DECAY
+            if state.lh_energy[lh_id] <= 0:
+                state.lh_energy[lh_id] = 0
+                state.owner[lh_id] = NEUTRAL
+                _drop_links(state, lh_id)
+
+    for player in state.players:
+        player.score += round_points(state, player.player_id)
+    state.turn += 1
+    return state
@@ -0,0 +1,110 @@
+"""
+Joining the game engine
+
+The bot starts listening before it sends Join, so an InitialState sent as soon
+as the engine accepts us always finds the listener up. Join goes over one
+persistent channel with ``wait_for_ready``: while the engine is not reachable
+yet the call waits for the channel to connect instead of failing at once, and a
+call that still fails is retried after an exponential backoff with jitter, so
+a crowd of bots starting together does not retry in lockstep.
+
+StartupClock keeps the milestones of the process start (listening, joined,
+ready) for the log and the startup benchmark.
+"""
+import os
+import random
+import time
+
+import grpc
+
+from internal.handler.coms import game_pb2
+from internal.handler.coms import game_pb2_grpc as game_grpc
+
+# gRPC reconnects a failed channel after 1 s and then backs off up to 2 minutes;
+# an engine that comes up late is picked up within a tenth of a second instead
+JOIN_CHANNEL_OPTIONS = (
+    ("grpc.initial_reconnect_backoff_ms", 50),
+    ("grpc.min_reconnect_backoff_ms", 50),
+    ("grpc.max_reconnect_backoff_ms", 250),
+)
+
+
+class Backoff:
+    """
+    Delays growing by ``factor`` from ``initial`` up to ``maximum`` seconds
+    Each delay is drawn in [(1 - jitter) * d, d] around the exponential value d
+    """
+
+    def __init__(self, initial=0.05, maximum=2.0, factor=2.0, jitter=0.5, rng=None):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.jitter = jitter
+        self.rng = rng if rng is not None else random.Random()
+        self.attempts = 0
+
+    def next_delay(self):
+        delay = min(self.maximum, self.initial * self.factor ** self.attempts)
+        self.attempts += 1
+        return delay * (1.0 - self.jitter * self.rng.random())
+
+    def reset(self):
+        self.attempts = 0
+
+
+def process_start(clock=time.perf_counter):
+    """
+    When this process started, on the ``clock`` timeline
+    Read from /proc as the uptime minus the start time in ticks since boot;
+    where that is not available, now
+    """
+    try:
+        with open("/proc/self/stat") as stat:
+            # The command name may hold spaces, fields are counted after its closing parenthesis
+            fields = stat.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as uptime:
+            since_boot = float(uptime.read().split()[0])
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return clock()
+    return clock() - max(0.0, since_boot - started)
+
+
+class StartupClock:
+    """Seconds since ``started`` (the process start by default) of each startup milestone"""
+
+    def __init__(self, started=None, clock=time.perf_counter):
+        self.clock = clock
+        self.started = started if started is not None else process_start(clock)
+        self.milestones = {}
+
+    def mark(self, name):
+        self.milestones[name] = self.clock() - self.started
+        return self.milestones[name]
+
+    def summary(self):
+        return ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.milestones.items())
+
+
+def join_channel(game_server_address):
+    return grpc.insecure_channel(game_server_address, options=JOIN_CHANNEL_OPTIONS)
+
+
+def join(channel, bot_name, my_address, timeout=1.0, backoff=None, log=print, sleep=time.sleep, attempts=None):
+    """
+    Join the game over ``channel``, retrying until the engine answers; returns the PlayerID
+    After ``attempts`` failed calls the last error is raised, None retries for ever
+    """
+    backoff = backoff if backoff is not None else Backoff()
+    client = game_grpc.GameServiceStub(channel)
+    player = game_pb2.NewPlayer(name=bot_name, serverAddress=my_address)
+    failed = 0
+    while True:
+        try:
+            return client.Join(player, timeout=timeout, wait_for_ready=True)
+        except grpc.RpcError as e:
+            failed += 1
+            log(f"Could not join game: {e.details()}")
+            if attempts is not None and failed >= attempts:
+                raise
+            sleep(backoff.next_delay())
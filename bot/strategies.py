@@ -0,0 +1,336 @@
+"""
+Pluggable strategies for the greedy stage of a turn
+
+A Strategy looks at the turn and either proposes an action or passes. The
+StrategySelector asks them in priority order and sends the first proposal,
+skipping a strategy when its cost estimate no longer fits in what is left of
+the deadline. Each strategy names the sub-state its answer depends on
+(``key``), and the selector memoizes answers by that key so an unchanged
+situation is not evaluated twice. Costs start from the strategy's declared
+estimate and follow the measured run times.
+
+The default line-up reproduces the old hard-coded branch order:
+
+- ``connect``: on an owned lighthouse, link to the one closing the largest triangles
+- ``attack``: on a lighthouse of someone else, take it if we can afford it
+- ``defend``: top up the owned lighthouse we stand on, or walk back to our
+  lighthouses once we hold more than ``defend_threshold``
+- ``expand``: walk to the best scored lighthouse we do not own
+- ``harvest``: nothing left to take, walk to the richest neighbouring cell
+
+Defend and expand walk along a multi-turn plan (bot.plans) and only route
+again when the target changes or the plan stops holding.
+"""
+import random
+import time
+from collections import OrderedDict
+
+from bot.metrics import NULL_METRICS, SMOOTHING
+from bot.navigation import MOVES
+
+
+def open_moves(navigation, position):
+    """MOVES that land on a playable cell, all of them while the map is unknown"""
+    if navigation is None:
+        return MOVES
+    x, y = position
+    return [(mx, my) for mx, my in MOVES if navigation.is_walkable(x + mx, y + my)]
+
+
+class TurnContext:
+    """What every strategy reads from the turn, computed once and refilled every turn"""
+
+    __slots__ = ("turn", "position", "energy", "current", "revision")
+
+    def __init__(self):
+        self.turn = None
+        self.position = None
+        self.energy = 0
+        self.current = None
+        self.revision = 0
+
+    def update(self, bot, turn):
+        self.turn = turn
+        self.position = (turn.Position.X, turn.Position.Y)
+        self.energy = turn.Energy
+        index = bot.lighthouse_index
+        self.current = index.ids.get(self.position)  # lighthouse we stand on, if any
+        self.revision = index.revision
+
+
+class Strategy:
+    """
+    One way of answering a turn
+    ``propose`` returns a NewAction, or None when the strategy does not apply.
+    ``key`` names the sub-state the proposal depends on, None disables memoization.
+    ``cost`` is the expected run time in seconds. Actions come from ``bot.actions``
+    (bot.actions.ActionPool)
+    """
+
+    name = "strategy"
+    cost = 1e-5
+
+    def key(self, bot, ctx):
+        return None
+
+    def propose(self, bot, ctx, deadline):
+        raise NotImplementedError
+
+    def as_dict(self):
+        """Strategy specific counters, merged into the selector stats"""
+        return {}
+
+
+class ConnectStrategy(Strategy):
+    name = "connect"
+    cost = 5e-5
+
+    def __init__(self):
+        self.ties = []  # scratch list of the best destinations
+
+    def key(self, bot, ctx):
+        # The index revision covers owners, keys and links, hence the connection graph
+        return (ctx.current, ctx.revision)
+
+    def propose(self, bot, ctx, deadline):
+        index = bot.lighthouse_index
+        current = ctx.current
+        if current is None or index.owner[current] != bot.player_num:
+            return None
+        connections, ties = bot.connections, self.ties
+        ties.clear()
+        best_score = None
+        # El índice ya descarta: el propio faro, los faros sin clave,
+        # las conexiones existentes y los faros que no controlamos
+        for dest in index.connectable_from(current):
+            # No conectar si la conexión cruza otra o pasa por encima de un faro
+            if not connections.is_legal(current, dest):
+                continue
+            # Preferir las conexiones que cierran los triángulos más grandes
+            score = connections.triangle_score(current, dest)
+            if best_score is None or score > best_score:
+                best_score = score
+                ties.clear()
+            if score == best_score:
+                ties.append(dest)
+        if not ties:
+            return None
+        ties.sort()
+        x, y = index.positions[random.choice(ties)]
+        return bot.actions.connect(x, y)
+
+
+class AttackStrategy(Strategy):
+    """Takes the lighthouse we stand on; the amount follows the opponent model, so no memo"""
+
+    name = "attack"
+    cost = 2e-5
+
+    def propose(self, bot, ctx, deadline):
+        current = ctx.current
+        if current is None or bot.lighthouse_index.owner[current] == bot.player_num:
+            return None
+        # Atacar con la energía justa para quedarnos el faro frente a los rivales
+        energy = bot.attack_energy(current, ctx.energy)
+        if energy <= 0:
+            return None
+        x, y = ctx.position
+        return bot.actions.attack(x, y, energy)
+
+
+class DefendStrategy(Strategy):
+    name = "defend"
+    cost = 5e-4
+
+    def propose(self, bot, ctx, deadline):
+        index = bot.lighthouse_index
+        current = ctx.current
+        if current is not None and index.owner[current] == bot.player_num:
+            energy = bot.attack_energy(current, ctx.energy)
+            if energy > 0:
+                x, y = ctx.position
+                return bot.actions.attack(x, y, energy)
+        # If we control many lighthouses, focus on defending what we have
+        if len(index.owned) <= bot.defend_threshold:
+            return None
+        home = min(index.owned)
+        bot.last_target = index.positions[home]
+        return bot.actions.step(ctx.position, bot.planned_move(ctx.turn, home))
+
+
+class ExpandStrategy(Strategy):
+    """
+    Walks to the best scored lighthouse we do not own
+    The target is chosen every turn (memoized by position, energy and index revision); the
+    route to it comes from the plan cache while that holds, and is only planned again when not
+    """
+
+    name = "expand"
+    cost = 2e-3
+
+    def __init__(self, memo_size=64):
+        self.targets = OrderedDict()
+        self.memo_size = memo_size
+        self.hits = 0
+
+    def target(self, bot, ctx):
+        key = (ctx.position, ctx.energy, ctx.revision)
+        targets = self.targets
+        if key in targets:
+            targets.move_to_end(key)
+            self.hits += 1
+            return targets[key]
+        with bot.metrics.phase("scoring"):
+            target = bot.get_chosen_non_conquered_lighthouse(ctx.turn.Position, ctx.energy)
+        targets[key] = target
+        if len(targets) > self.memo_size:
+            targets.popitem(last=False)
+        return target
+
+    def propose(self, bot, ctx, deadline):
+        target = self.target(bot, ctx)
+        if target is None:
+            return None
+        bot.last_target = target
+        lh_id = bot.lighthouse_index.ids[target]
+        return bot.actions.step(ctx.position, bot.planned_move(ctx.turn, lh_id))
+
+    def as_dict(self):
+        return {"target_hits": self.hits}
+
+
+class HarvestStrategy(Strategy):
+    """
+    Step to the neighbouring cell expected to hold the most energy next turn
+    Never into a wall; with no playable neighbour the strategy does not apply
+    """
+
+    name = "harvest"
+    cost = 5e-5
+
+    def __init__(self):
+        self.best_moves = []  # scratch list of the richest moves
+
+    def propose(self, bot, ctx, deadline):
+        field = bot.energy_field
+        if field is None:
+            moves = open_moves(bot.navigation, ctx.position)
+            return bot.actions.step(ctx.position, random.choice(moves)) if moves else None
+        x, y = ctx.position
+        height, width = field.walkable.shape
+        window = (slice(max(y - 1, 0), y + 2), slice(max(x - 1, 0), x + 2))
+        estimate = field.estimate(bot.countT + 1, window)
+        best, best_moves = 0, self.best_moves
+        best_moves.clear()
+        for mx, my in MOVES:
+            nx, ny = x + mx, y + my
+            if not (0 <= nx < width and 0 <= ny < height) or not field.walkable[ny, nx]:
+                continue
+            value = int(estimate[ny - window[0].start, nx - window[1].start])
+            if value > best:
+                best = value
+                best_moves.clear()
+                best_moves.append((mx, my))
+            elif value == best:
+                best_moves.append((mx, my))
+        if not best_moves:
+            return None
+        return bot.actions.step(ctx.position, random.choice(best_moves))
+
+
+def default_strategies():
+    return [ConnectStrategy(), AttackStrategy(), DefendStrategy(), ExpandStrategy(), HarvestStrategy()]
+
+
+class StrategyStats:
+    """Timing and hit counts of one strategy"""
+
+    __slots__ = ("cost", "calls", "proposed", "chosen", "memo_hits", "skipped", "seconds")
+
+    def __init__(self, cost):
+        self.cost = cost          # expected seconds per run, moving average
+        self.calls = 0            # runs, memo hits excluded
+        self.proposed = 0         # runs that returned an action
+        self.chosen = 0           # answers sent, memo hits included
+        self.memo_hits = 0
+        self.skipped = 0          # not run, the cost did not fit in the deadline
+        self.seconds = 0.0
+
+    def as_dict(self):
+        asked = self.calls + self.memo_hits
+        return {
+            "cost": self.cost,
+            "calls": self.calls,
+            "proposed": self.proposed,
+            "chosen": self.chosen,
+            "memo_hits": self.memo_hits,
+            "skipped": self.skipped,
+            "seconds": self.seconds,
+            "hit_rate": self.proposed / self.calls if self.calls else 0.0,
+            "memo_hit_rate": self.memo_hits / asked if asked else 0.0,
+        }
+
+
+class StrategySelector:
+    """
+    Runs ``strategies`` in order until one proposes an action
+    Answers are memoized per strategy and key in an LRU of ``memo_size`` entries
+    """
+
+    def __init__(self, strategies=None, memo_size=256, metrics=NULL_METRICS, clock=time.perf_counter):
+        self.strategies = list(strategies) if strategies is not None else default_strategies()
+        self.memo = OrderedDict()
+        self.memo_size = memo_size
+        self.metrics = metrics
+        self.clock = clock
+        self.context = TurnContext()
+        self.stats = {strategy.name: StrategyStats(strategy.cost) for strategy in self.strategies}
+
+    def select(self, bot, turn, deadline):
+        """The first proposal of the turn, None when no strategy applies or fits"""
+        ctx = self.context
+        ctx.update(bot, turn)
+        for strategy in self.strategies:
+            action = self.run(strategy, bot, ctx, deadline)
+            if action is not None:
+                self.stats[strategy.name].chosen += 1
+                if self.metrics.enabled:
+                    self.metrics.count(f"strategy.{strategy.name}.chosen")
+                return action
+        return None
+
+    def run(self, strategy, bot, ctx, deadline):
+        stats = self.stats[strategy.name]
+        key = strategy.key(bot, ctx)
+        if key is not None:
+            memo_key = (strategy.name, key)
+            if memo_key in self.memo:
+                self.memo.move_to_end(memo_key)
+                stats.memo_hits += 1
+                return self.memo[memo_key]
+        if deadline.remaining() < stats.cost:
+            stats.skipped += 1
+            return None
+
+        start = self.clock()
+        action = strategy.propose(bot, ctx, deadline)
+        elapsed = self.clock() - start
+        stats.calls += 1
+        stats.seconds += elapsed
+        stats.cost += SMOOTHING * (elapsed - stats.cost)
+        if action is not None:
+            stats.proposed += 1
+        if self.metrics.enabled:
+            self.metrics.histogram(f"strategy.{strategy.name}").observe(elapsed)
+
+        if key is not None:
+            self.memo[memo_key] = action
+            if len(self.memo) > self.memo_size:
+                self.memo.popitem(last=False)
+        return action
+
+    def as_dict(self):
+        return {
+            strategy.name: {**self.stats[strategy.name].as_dict(), **strategy.as_dict()}
+            for strategy in self.strategies
+        }
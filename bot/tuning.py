@@ -0,0 +1,220 @@
+"""
+Self-play tuning of the BotGame parameters
+
+Candidates are parameter sets drawn from PARAMETERS (plus DEFAULTS, the values
+the bot ships with). They play local matches (bot.local_engine) against each
+other and successive halving picks the best: every round each survivor plays
+``matches * eta ** round`` matches against the other survivors, ranked by its
+mean share of the points over every match so far, and the best 1 / ``eta``
+go on. All candidates of a round play the same maps, so they are compared on
+equal terms.
+
+Every match is appended to a JSON checkpoint as soon as it finishes. The
+rounds are a pure function of the configuration and the results, so a run
+started again on the same checkpoint replays the decisions and only plays the
+matches that are missing.
+
+A round in which no match scored a single point says nothing about the
+candidates (every share would be the 0.5 of a tie), so it stops the run with
+a RuntimeError instead of ranking them on noise.
+"""
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from bot.local_engine import DirectBot, LocalGame, play_match
+from bot.scoring import power_ratio_objective
+
+
+class Parameter:
+    __slots__ = ("name", "low", "high", "integer")
+
+    def __init__(self, name, low, high, integer=False):
+        self.name = name
+        self.low = low
+        self.high = high
+        self.integer = integer
+
+    def sample(self, rng):
+        if self.integer:
+            return rng.randint(self.low, self.high)
+        return round(rng.uniform(self.low, self.high), 3)
+
+
+PARAMETERS = (
+    Parameter("attack_probability", 0, 100, integer=True),
+    Parameter("defend_threshold", 3, 30, integer=True),
+    # compute_ratio as 1 / ((energy + 1) ** energy_exponent * (distance + 1) ** distance_exponent)
+    Parameter("energy_exponent", 0.25, 2.0),
+    Parameter("distance_exponent", 0.25, 2.0),
+)
+DEFAULTS = {"attack_probability": 60, "defend_threshold": 15, "energy_exponent": 1.0, "distance_exponent": 1.0}
+
+
+def sample_candidates(count, seed=0, parameters=PARAMETERS):
+    """``count`` parameter sets, DEFAULTS first"""
+    rng = random.Random(seed)
+    candidates = [dict(DEFAULTS)]
+    while len(candidates) < count:
+        candidates.append({parameter.name: parameter.sample(rng) for parameter in parameters})
+    return candidates
+
+
+def bot_options(params):
+    """BotGame keyword arguments of a parameter set"""
+    return {
+        "attack_probability": params["attack_probability"],
+        "defend_threshold": params["defend_threshold"],
+        "objective": power_ratio_objective(params["energy_exponent"], params["distance_exponent"]),
+    }
+
+
+def play_pair(factory, params, opponent, game_options, seed, swap=False):
+    """
+    One match of ``params`` against ``opponent``, in a worker process
+    ``factory(player_id, **options)`` builds a BotGame. Returns the share of the points of
+    ``params`` (0.5 when nobody scored), 1 / 0.5 / 0 for a win / tie / loss, the points of
+    both sides and the seconds the match took
+    """
+    random.seed(seed)
+    game = LocalGame.random(seed=seed, **game_options)
+    sides = [params, opponent] if not swap else [opponent, params]
+    bots = {}
+    for side in sides:
+        player_id = game.join()
+        bots[player_id] = factory(player_id, **bot_options(side))
+    start = time.perf_counter()
+    try:
+        result = play_match(game, {player_id: DirectBot(bot) for player_id, bot in bots.items()})
+    finally:
+        for bot in bots.values():
+            bot.close()
+    ours = game.player_ids[1 if swap else 0]
+    total = sum(result.scores.values())
+    winners = result.winners
+    return {
+        "share": result.scores[ours] / total if total else 0.5,
+        "won": (1.0 / len(winners)) if ours in winners else 0.0,
+        "points": total,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+class Checkpoint:
+    """Configuration, candidates and match results of a run, kept in a JSON file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.config = None
+        self.candidates = []
+        self.results = {}  # (round, candidate, match) -> result dict
+
+    def load(self):
+        """False when there is no checkpoint to resume"""
+        if self.path is None or not os.path.exists(self.path):
+            return False
+        with open(self.path) as stream:
+            data = json.load(stream)
+        self.config = data["config"]
+        self.candidates = data["candidates"]
+        self.results = {
+            (record["round"], record["candidate"], record["match"]): record for record in data["results"]
+        }
+        return True
+
+    def add(self, record):
+        self.results[(record["round"], record["candidate"], record["match"])] = record
+        self.save()
+
+    def save(self):
+        if self.path is None:
+            return
+        data = {"config": self.config, "candidates": self.candidates, "results": list(self.results.values())}
+        # Written aside and renamed, so an interrupted run never leaves half a file
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as stream:
+            json.dump(data, stream)
+        os.replace(temporary, self.path)
+
+
+class SuccessiveHalving:
+    """
+    ``config`` holds ``matches`` (first round, per candidate), ``eta``, ``seed`` and the
+    ``game`` options of LocalGame.random
+    """
+
+    def __init__(self, checkpoint, factory, log=print, clock=time.perf_counter):
+        self.checkpoint = checkpoint
+        self.factory = factory
+        self.log = log
+        self.clock = clock
+        self.played = 0          # matches played by this process, resumed ones excluded
+        self.match_seconds = 0.0
+        self.elapsed = 0.0
+        self.rounds = []         # [(round, [(candidate, fitness, matches)])]
+
+    def fitness(self, candidate, last_round):
+        """Mean share and matches of ``candidate`` up to ``last_round``, later results are left out"""
+        shares = [
+            record["share"] for (number, index, _), record in self.checkpoint.results.items()
+            if index == candidate and number <= last_round
+        ]
+        return (sum(shares) / len(shares) if shares else 0.0), len(shares)
+
+    def jobs(self, round_number, survivors):
+        """(candidate, opponent, match, seed, swap) of a round, the same maps for every candidate"""
+        config = self.checkpoint.config
+        count = config["matches"] * config["eta"] ** round_number
+        for position, candidate in enumerate(survivors):
+            for match in range(count):
+                opponent = survivors[(position + 1 + match % (len(survivors) - 1)) % len(survivors)]
+                seed = config["seed"] + round_number * 100_003 + match
+                yield candidate, opponent, match, seed, match % 2 == 1
+
+    def run(self, pool):
+        """Play every round on ``pool`` (an Executor) and return the index of the best candidate"""
+        checkpoint = self.checkpoint
+        config, candidates = checkpoint.config, checkpoint.candidates
+        start = self.clock()
+        survivors = list(range(len(candidates)))
+        round_number = 0
+        while len(survivors) > 1:
+            pending = {}
+            for candidate, opponent, match, seed, swap in self.jobs(round_number, survivors):
+                if (round_number, candidate, match) in checkpoint.results:
+                    continue
+                future = pool.submit(
+                    play_pair, self.factory, candidates[candidate], candidates[opponent], config["game"], seed, swap,
+                )
+                pending[future] = {
+                    "round": round_number, "candidate": candidate, "opponent": opponent, "match": match, "seed": seed,
+                }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = pending.pop(future)
+                    record.update(future.result())
+                    checkpoint.add(record)
+                    self.played += 1
+                    self.match_seconds += record["seconds"]
+
+            played = [record for (number, _, _), record in checkpoint.results.items() if number == round_number]
+            if played and all(record.get("points", 1) == 0 for record in played):
+                raise RuntimeError(
+                    f"Every match of round {round_number} ended without points, the shares cannot rank candidates"
+                )
+            scores = {index: self.fitness(index, round_number) for index in survivors}
+            ranked = sorted(survivors, key=lambda index: (-scores[index][0], index))
+            self.rounds.append((round_number, [(index, *scores[index]) for index in ranked]))
+            best, (share, matches) = ranked[0], scores[ranked[0]]
+            self.log(
+                f"round {round_number}: {len(survivors)} candidates, best #{best} "
+                f"share {share:.3f} over {matches} matches"
+            )
+            survivors = ranked[:max(1, math.ceil(len(survivors) / config["eta"]))]
+            round_number += 1
+        self.elapsed = self.clock() - start
+        return survivors[0]
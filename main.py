@@ -1,13 +1,30 @@
 import argparse
 import enum
+import os
 import random
 import time
 from concurrent import futures
 
 import grpc
-from google.protobuf import json_format
-from grpc import RpcError
 
+from bot import startup
+from bot.actions import ActionPool
+from bot.beam import CAPTURE, CONNECT, BeamPlanner
+from bot.connections import ConnectionGraph
+from bot.energy import EnergyField
+from bot.history import TurnHistory
+from bot.lighthouses import LighthouseIndex
+from bot.maps import MapCache, SharedMaps
+from bot.metrics import NULL_METRICS, Metrics, MetricsServer
+from bot.navigation import NavigationGrid
+from bot.opponents import OpponentModel
+from bot.plans import PlanCache
+from bot.replay import ReplayWriter
+from bot.scheduler import DEFAULT_MARGIN, AnytimeScheduler
+from bot.scoring import ScoringEngine, path_ratio_objective
+from bot.sessions import PinnedSession, SessionManager, SessionRouter
+from bot.simulation import SimState, StaticMap
+from bot.strategies import StrategySelector
 from internal.handler.coms import game_pb2
 from internal.handler.coms import game_pb2_grpc as game_grpc
 
@@ -41,120 +58,262 @@ class Movements(enum.Enum):
 timeout_to_response = 1  # 1 second
 
 
-class BotGameTurn:
-    def __init__(self, turn, action):
-        self.turn = turn
-        self.action = action
-
-
 class BotGame:
-    def __init__(self, player_num=None):
+    def __init__(self, player_num=None, margin=DEFAULT_MARGIN, history_size=256, history_spill=None,
+                 objective=path_ratio_objective, mcts_workers=None, metrics=None, maps=None,
+                 harvest_slack=2, attack_probability=60, defend_threshold=15, strategies=None,
+                 plan_energy_threshold=20, beam_depth=None, beam_width=8, mcts_pool=None):
         self.player_num = player_num
+        self.maps = maps
+        self.map_data = None
+        self.metrics = metrics if metrics is not None else NULL_METRICS
         self.initial_state = None
-        self.turn_states = []
+        self.navigation = None
+        self.lighthouse_index = None
+        self.objective = objective
+        self.scoring = None
+        self.connections = None
+        self.mcts_workers = mcts_workers
+        self.mcts_pool = mcts_pool  # shared worker pool from bot.mcts.start_pool, else the planner's own
+        self.static_map = None
+        self.planner = None
+        self.energy_field = None
+        self.harvest_slack = harvest_slack
+        self.opponents = None
+        self.attack_probability = attack_probability
+        self.last_attack = (None, 0)  # (lighthouse id, energy) of our previous turn
+        self.defend_threshold = defend_threshold
+        self.strategies = StrategySelector(strategies, metrics=self.metrics)
+        self.actions = ActionPool()
+        self.plan_energy_threshold = plan_energy_threshold
+        self.plans = None     # PlanCache, built with the lighthouse index
+        self.beam_depth = beam_depth
+        self.beam_width = beam_width
+        self.beam = None      # BeamPlanner when beam_depth is set
+        self.greedy_answer = None  # what the greedy stage answered this turn
+        self.turn = None      # NewTurn being answered, read by the stages
+        self.stages = None    # built once per game by search_stages
+        self.scheduler = AnytimeScheduler(margin=margin, default_budget=timeout_to_response, metrics=self.metrics)
+        self.last_target = None
+        self.history = TurnHistory(capacity=history_size, spill_path=history_spill)
         self.countT = 1
 
-    def new_turn_action(self, turn: game_pb2.NewTurn) -> game_pb2.NewAction:
-        cx, cy = turn.Position.X, turn.Position.Y
-
-        lighthouses = dict()
-        for lh in turn.Lighthouses:
-            lighthouses[(lh.Position.X, lh.Position.Y)] = lh
-
-        # Si estamos en un faro...
-        if (cx, cy) in lighthouses:
-            # Conectar con faro remoto válido si podemos
-            if lighthouses[(cx, cy)].Owner == self.player_num:
-                possible_connections = []
-                for dest in lighthouses:
-                    # No conectar con sigo mismo
-                    # No conectar si no tenemos la clave
-                    # No conectar si ya existe la conexión
-                    # No conectar si no controlamos el destino
-                    # Nota: no comprobamos si la conexión se cruza.
-                    if (
-                        dest != (cx, cy)
-                        and lighthouses[dest].HaveKey
-                        and [cx, cy] not in lighthouses[dest].Connections
-                        and lighthouses[dest].Owner == self.player_num
-                    ):
-                        possible_connections.append(dest)
-
-                if possible_connections:
-                    possible_connection = random.choice(possible_connections)
-                    action = game_pb2.NewAction(
-                        Action=game_pb2.CONNECT,
-                        Destination=game_pb2.Position(
-                            X=possible_connection[0], Y=possible_connection[1]
-                        ),
-                    )
-                    bgt = BotGameTurn(turn, action)
-                    self.turn_states.append(bgt)
-
-                    self.countT += 1
-                    return action
-
-            # 60% de posibilidades de atacar el faro
-            if random.randrange(100) < 60:
-                energy = random.randrange(turn.Energy + 1)
-                action = game_pb2.NewAction(
-                    Action=game_pb2.ATTACK,
-                    Energy=energy,
-                    Destination=game_pb2.Position(X=turn.Position.X, Y=turn.Position.Y),
-                )
-                bgt = BotGameTurn(turn, action)
-                self.turn_states.append(bgt)
-
-                self.countT += 1
-                return action
-
-        # Mover aleatoriamente
-
-        # Buscar el faro apropiado basado en el ratio
-        # Movernos en la direcciñon adecuada, dandole nuestra posicion y la del faro que buscamos
-
-        # Determine strategy based on how many lighthouses we control
-        controlled_lighthouses = [lh for lh in turn.Lighthouses if lh.Owner == self.player_num]
-        control_count = len(controlled_lighthouses)
-
-        # If we control many lighthouses, focus on defending what we have
-        if control_count > 15:
-            # Simply target the first lighthouse we own
-            target_lighthouse = controlled_lighthouses[0]
-            chosen_lighthouse = target_lighthouse
+    def load_initial_state(self, initial_state: game_pb2.NewPlayerInitialState):
+        """
+        Store the initial state and precompute everything that only depends on the map
+        """
+        self.initial_state = initial_state
+        self.stages = None
+        if self.player_num is None:
+            self.player_num = initial_state.PlayerID
+        self.release_map()
+        if self.maps is not None:
+            self.map_data = self.maps.acquire(initial_state)
+            self.navigation = self.map_data.navigation
         else:
-            # Offensive strategy: evaluate and target the most valuable lighthouse
-            lighthouse_evaluations = {}
-
-            # Calculate value score for each lighthouse
-            for beacon in turn.Lighthouses:
-                # Calculate efficiency score based on distance and energy
-                value_score = self.compute_ratio(turn.Position, beacon)
-                # Store score with lighthouse coordinates and owner as key
-                position_key = (beacon.Position.X, beacon.Position.Y, beacon.Owner)
-                lighthouse_evaluations[position_key] = value_score
-
-            # Select the best lighthouse to target (not already owned)
-            chosen_lighthouse = self.get_chosen_non_conquered_lighthouse(lighthouse_evaluations)
-        next_movement = self.get_next_movement(turn.Position, chosen_lighthouse)
-        move = next_movement
-        action = game_pb2.NewAction(
-            Action=game_pb2.MOVE,
-            Destination=game_pb2.Position(
-                X=turn.Position.X + move[0], Y=turn.Position.Y + move[1]
-            ),
+            self.navigation = NavigationGrid.from_initial_state(initial_state)
+        regen = self.map_data.regen if self.map_data is not None else None
+        self.energy_field = EnergyField.build(self.navigation.walkable, self.navigation.targets, regen)
+        self.build_lighthouse_state(initial_state.Lighthouses)
+        if self.mcts_workers is not None:
+            if self.map_data is not None:
+                self.static_map = self.map_data.static_map()
+            else:
+                self.static_map = StaticMap.from_initial_state(initial_state, self.navigation)
+            if self.planner is not None:
+                self.planner.close()
+            from bot.mcts import MCTSPlanner  # process pools are only loaded when MCTS is on
+            self.planner = MCTSPlanner(self.static_map, workers=self.mcts_workers, pool=self.mcts_pool)
+            self.planner.start()
+
+    def build_lighthouse_state(self, lighthouses):
+        """
+        Create the lighthouse index and the structures that hang from it
+        """
+        self.lighthouse_index = LighthouseIndex.from_lighthouses(lighthouses, self.player_num)
+        self.scoring = ScoringEngine(self.lighthouse_index, self.navigation, self.objective)
+        self.connections = ConnectionGraph(self.lighthouse_index.positions)
+        self.actions.prebuild(self.lighthouse_index.positions)
+        walkable = self.navigation.walkable if self.navigation is not None else None
+        self.plans = PlanCache(
+            self.lighthouse_index, walkable, self.energy_field, self.plan_energy_threshold, metrics=self.metrics
         )
+        if self.beam_depth is not None and self.navigation is not None:
+            self.beam = BeamPlanner(
+                self.lighthouse_index, self.connections, self.scoring, self.navigation, self.energy_field,
+                depth=self.beam_depth, width=self.beam_width,
+            )
+        player_count = self.initial_state.PlayerCount if self.initial_state is not None else 2
+        self.opponents = OpponentModel(self.lighthouse_index, self.navigation, player_count)
+
+    def new_turn_action(self, turn: game_pb2.NewTurn, deadline=None) -> game_pb2.NewAction:
+        """
+        Answer the turn before the deadline
+        The fallback is ready first, then the search stages refine it while time remains
+        """
+        if deadline is None:
+            deadline = self.scheduler.deadline()
+
+        metrics = self.metrics
+        if self.energy_field is not None:
+            with metrics.phase("energy"):
+                self.energy_field.observe(self.countT, turn.Position, turn.View)
+                # Standing on a cell empties it at the start of the next round
+                self.energy_field.harvested(turn.Position.X, turn.Position.Y, self.countT)
+
+        with metrics.phase("index"):
+            if self.lighthouse_index is None:
+                self.build_lighthouse_state(turn.Lighthouses)
+            changes = self.lighthouse_index.update(turn.Lighthouses)
+            if changes.connections:
+                self.connections.sync(self.lighthouse_index.neighbours, changes.connections)
+
+        with metrics.phase("opponents"):
+            attacked, spent = self.last_attack
+            self.opponents.update(changes, self.countT, turn.Energy, spent, attacked)
+
+        with metrics.phase("search"):
+            if self.stages is None:
+                self.stages = self.search_stages()
+            self.turn = turn
+            action = self.scheduler.run(self.fallback_stage, self.stages, deadline)
+            self.turn = None
+
+        if action.Action == game_pb2.ATTACK:
+            attacked = self.lighthouse_index.ids.get((turn.Position.X, turn.Position.Y))
+            self.last_attack = (attacked, action.Energy)
+        else:
+            self.last_attack = (None, 0)
 
-        bgt = BotGameTurn(turn, action)
-        self.turn_states.append(bgt)
+        with metrics.phase("history"):
+            self.history.append(turn, action)
+        if metrics.enabled:
+            metrics.count(f"action.{game_pb2.Action.Name(action.Action)}")
 
         self.countT += 1
         return action
 
+    def search_stages(self):
+        """
+        Decision stages ordered from the cheapest to the deepest
+        They answer ``self.turn``, so the list is built once and not per turn
+        """
+        stages = [self.greedy_stage]
+        if self.beam is not None:
+            stages.append(self.beam_stage)
+        if self.planner is not None:
+            stages.append(self.mcts_stage)
+        return stages
+
+    def fallback_stage(self):
+        return self.fallback_action(self.turn)
+
+    def greedy_stage(self, deadline):
+        self.greedy_answer = self.greedy_action(self.turn, deadline)
+        return self.greedy_answer
+
+    def beam_stage(self, deadline):
+        return self.beam_action(self.turn, deadline)
+
+    def mcts_stage(self, deadline):
+        return self.mcts_action(self.turn, deadline)
+
+    def close(self):
+        """
+        Release the worker processes and files held by the bot
+        """
+        if self.planner is not None:
+            self.planner.close()
+            self.planner = None
+        self.release_map()
+        self.history.close()
+
+    def release_map(self):
+        if self.map_data is not None:
+            self.maps.release(self.map_data)
+            self.map_data = None
+
+    def fallback_action(self, turn: game_pb2.NewTurn) -> game_pb2.NewAction:
+        """
+        Cheap answer that is always available: keep walking to the last target, else to the
+        cheapest lighthouse we do not own (first of the index's energy heap), or pass
+        """
+        if self.navigation is None:
+            return self.actions.pass_action
+        position = (turn.Position.X, turn.Position.Y)
+        if self.last_target is not None:
+            move = self.navigation.next_move(position, self.last_target)
+            if move is not None:
+                return self.actions.step(position, move)
+        if self.lighthouse_index is not None:
+            for _, lh_id in self.lighthouse_index.targets_by_energy():
+                move = self.navigation.next_move(position, self.lighthouse_index.positions[lh_id])
+                if move is not None:
+                    return self.actions.step(position, move)
+        return self.actions.pass_action
+
+    def greedy_action(self, turn: game_pb2.NewTurn, deadline) -> game_pb2.NewAction:
+        """
+        First proposal of the strategies (connect, attack, defend, expand, harvest)
+        that fit in the deadline, see bot.strategies
+        """
+        return self.strategies.select(self, turn, deadline)
+
+    def attack_energy(self, lh_id, energy):
+        """
+        Energy to put on the lighthouse we stand on, 0 to leave it alone
+        Enemy and neutral lighthouses are attacked once we can take them and keep them through
+        the next decay, with up to what the opponent model says keeps them ours; our own are
+        topped up ``attack_probability``% of the time
+        """
+        opponents = self.opponents
+        if self.lighthouse_index.owner[lh_id] == self.player_num:
+            if random.randrange(100) >= self.attack_probability:
+                return 0
+            return min(energy, opponents.safe_attack_energy(lh_id))
+        # Less would capture a lighthouse the decay hands back before it scores
+        needed = opponents.min_energy_to_hold(lh_id)
+        if energy < needed:
+            return 0
+        return min(energy, max(needed, opponents.safe_attack_energy(lh_id)))
+
+    def beam_action(self, turn: game_pb2.NewTurn, deadline) -> game_pb2.NewAction:
+        """
+        First step of the best capture/visit/connect sequence of a beam search, see bot.beam
+        Attacks and connects of the greedy stage are kept (the search assumes our lighthouses
+        are topped up), as is its answer when no sequence gains anything
+        """
+        greedy = self.greedy_answer
+        if greedy is not None and greedy.Action in (game_pb2.ATTACK, game_pb2.CONNECT):
+            return None
+        position = (turn.Position.X, turn.Position.Y)
+        result = self.beam.plan(position, turn.Energy, self.countT, deadline)
+        if result.action is None:
+            return None
+        kind, lh_id, energy = result.action
+        x, y = self.lighthouse_index.positions[lh_id]
+        if kind == CONNECT:
+            return self.actions.connect(x, y)
+        if kind == CAPTURE and (x, y) == position:
+            return self.actions.attack(x, y, energy)
+        self.last_target = (x, y)
+        return self.actions.step(position, self.planned_move(turn, lh_id))
+
+    def mcts_action(self, turn: game_pb2.NewTurn, deadline) -> game_pb2.NewAction:
+        """
+        Most visited action of a Monte Carlo tree search on the forward model
+        """
+        state = SimState.from_turn(self.static_map, turn, self.player_num, turn_number=self.countT)
+        result = self.planner.plan(state, deadline)
+        if result.action is None:
+            return None
+        return self.actions.build(*result.action)
+
     def compute_ratio(self, current_pos, target_lighthouse):
         """
         Calculate a value score for a lighthouse based on energy required and distance
         Lower energy and shorter distance results in a higher score (more desirable)
+        Scalar reference of bot.scoring.ratio_objective
         """
         # Extract the energy level of the lighthouse
         power_required = target_lighthouse.Energy
@@ -171,28 +330,82 @@ class BotGame:
 
         return efficiency_score
 
-    def get_chosen_non_conquered_lighthouse(self, lighthouse_scores):
+    def get_chosen_non_conquered_lighthouse(self, current_pos, energy=0):
         """
         Select the optimal lighthouse to target based on calculated scores
         Only considers lighthouses not already owned by this player
+        Every lighthouse is scored in one vectorized pass with the bot's objective
         """
-        # Filter out lighthouses we already own
-        available_targets = {
-            coords: score
-            for coords, score in lighthouse_scores.items()
-            if coords[2] != self.player_num  # Check owner ID in the tuple
-        }
+        best = self.scoring.top_k((current_pos.X, current_pos.Y), energy, k=1)
 
         # Return the lighthouse with the highest score, or None if no valid targets
-        if available_targets:
-            return max(available_targets, key=available_targets.get)
+        if best:
+            return self.lighthouse_index.positions[best[0][0]]
         return None
 
+    def planned_move(self, turn, lh_id):
+        """
+        Next move towards lighthouse ``lh_id``: from the plan cache while its plan holds,
+        else routed afresh with get_path and kept as the new plan
+        """
+        position = (turn.Position.X, turn.Position.Y)
+        plans = self.plans
+        started = plans.clock()
+        move = plans.follow(position, self.countT, lh_id)
+        if move is None:
+            path = self.get_path(turn.Position, self.lighthouse_index.positions[lh_id])
+            move = plans.start(position, self.countT, lh_id, path)
+            plans.record_miss(plans.clock() - started)
+            if move is None:
+                move = path[0]
+        return move
+
+    def get_path(self, current_pos, destination):
+        """
+        Moves towards ``destination`` for the plan cache, same preferences as get_next_movement
+        The energy route may stop short of the destination (its horizon), the plan then ends there
+        """
+        source, target = (current_pos.X, current_pos.Y), (destination[0], destination[1])
+        if self.energy_field is not None and self.harvest_slack > 0:
+            route = self.energy_field.committed_route(
+                source, target, self.navigation, self.countT, slack=self.harvest_slack,
+            )
+            if route is not None and route.moves:
+                return route.moves
+
+        if self.navigation is not None:
+            moves = self.navigation.path(source, target)
+            if moves:
+                return moves
+
+        return [self.get_next_movement(current_pos, destination)]
+
     def get_next_movement(self, current_pos, destination):
         """
         Determine the optimal direction to move toward the target lighthouse
-        Prioritizes vertical movement first, then horizontal if needed
+        Takes the most energetic path that arrives at most ``harvest_slack`` turns late,
+        else follows the precomputed shortest path around walls when the map is known,
+        otherwise prioritizes vertical movement first, then horizontal if needed
         """
+        # Nothing left to conquer: wander randomly
+        if destination is None:
+            return random.choice(MOVES)
+
+        if self.energy_field is not None and self.harvest_slack > 0:
+            move = self.energy_field.next_move(
+                (current_pos.X, current_pos.Y), (destination[0], destination[1]),
+                self.navigation, self.countT, slack=self.harvest_slack,
+            )
+            if move is not None:
+                return move
+
+        if self.navigation is not None:
+            move = self.navigation.next_move(
+                (current_pos.X, current_pos.Y), (destination[0], destination[1])
+            )
+            if move is not None:
+                return move
+
         # Calculate vertical and horizontal displacement
         vertical_offset = destination[1] - current_pos.Y
         horizontal_offset = destination[0] - current_pos.X
@@ -208,98 +421,414 @@ class BotGame:
             return Movements.WEST.value
 
 class BotComs:
-    def __init__(self, bot_name, my_address, game_server_address, verbose=False):
+    def __init__(self, bot_name, my_address, game_server_address, verbose=False, margin=DEFAULT_MARGIN,
+                 mcts_workers=None, metrics=None, metrics_port=None, use_aio=False, maps=None,
+                 record_dir=None, startup_clock=None, beam_depth=None, mcts_pool=None):
         self.bot_id = None
+        self.startup = startup_clock if startup_clock is not None else startup.StartupClock()
+        self.maps = maps
+        self.record_dir = record_dir
+        self.use_aio = use_aio
+        self.margin = margin
+        self.mcts_workers = mcts_workers
+        self.mcts_pool = mcts_pool
+        self.beam_depth = beam_depth
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.metrics_port = metrics_port
         self.bot_name = bot_name
         self.my_address = my_address
         self.game_server_address = game_server_address
         self.verbose = verbose
 
     def wait_to_join_game(self):
-        channel = grpc.insecure_channel(self.game_server_address)
-        client = game_grpc.GameServiceStub(channel)
+        """
+        Join over one channel that waits for the engine, retrying with backoff, see bot.startup
+        """
+        with startup.join_channel(self.game_server_address) as channel:
+            player_id = startup.join(channel, self.bot_name, self.my_address, timeout=timeout_to_response)
+        self.joined(player_id)
+
+    async def join_game_aio(self):
+        """
+        Same as wait_to_join_game, on a grpc.aio channel
+        """
+        from bot import aio as aio_server  # grpc.aio is only loaded in --aio mode
 
-        player = game_pb2.NewPlayer(name=self.bot_name, serverAddress=self.my_address)
+        player_id = await aio_server.join(
+            self.game_server_address, self.bot_name, self.my_address, timeout=timeout_to_response
+        )
+        self.joined(player_id)
 
-        while True:
-            try:
-                player_id = client.Join(player, timeout=timeout_to_response)
-                self.bot_id = player_id.PlayerID
-                print(f"Joined game with ID {player_id.PlayerID}")
-                if self.verbose:
-                    print(json_format.MessageToJson(player_id))
-                break
-            except RpcError as e:
-                print(f"Could not join game: {e.details()}")
-                time.sleep(1)
+    def joined(self, player_id):
+        self.bot_id = player_id.PlayerID
+        self.startup.mark("joined")
+        print(f"Joined game with ID {player_id.PlayerID}")
+        if self.verbose:
+            print(to_json(player_id))
+
+    def client_server(self, bot_game=None):
+        recorder = open_recorder(self.record_dir, self.bot_name)
+        return ClientServer(
+            bot_id=self.bot_id, verbose=self.verbose, margin=self.margin,
+            mcts_workers=self.mcts_workers, bot_game=bot_game, metrics=self.metrics, maps=self.maps,
+            recorder=recorder, startup_clock=self.startup, beam_depth=self.beam_depth,
+            mcts_pool=self.mcts_pool,
+        )
 
-    def start_listening(self):
+    def serve(self, bot_game=None):
+        """
+        Start the bot's gRPC server without blocking, returns (server, servicer)
+        """
         print("Starting to listen on", self.my_address)
 
         # configure gRPC server
         grpc_server = grpc.server(
             futures.ThreadPoolExecutor(max_workers=10),
-            interceptors=(ServerInterceptor(),),
+            interceptors=(ServerInterceptor(self.metrics),),
         )
 
         # registry of the service
-        cs = ClientServer(bot_id=self.bot_id, verbose=self.verbose)
+        cs = self.client_server(bot_game)
         game_grpc.add_GameServiceServicer_to_server(cs, grpc_server)
 
         # server start
         grpc_server.add_insecure_port(self.my_address)
         grpc_server.start()
+        self.startup.mark("listening")
+        return grpc_server, cs
+
+    async def serve_aio(self, bot_game=None):
+        """
+        Start the bot's grpc.aio server in the running event loop, returns (server, servicer)
+        """
+        from bot import aio as aio_server
+
+        print("Starting to listen on", self.my_address, "(asyncio)")
+        served = await aio_server.serve(self.client_server(bot_game), self.my_address, self.metrics)
+        self.startup.mark("listening")
+        return served
+
+    def start_metrics_server(self):
+        if self.metrics_port is None or not self.metrics.enabled:
+            return None
+        metrics_server = MetricsServer(self.metrics, self.metrics_port)
+        print("Serving metrics on port", metrics_server.port)
+        return metrics_server
+
+    def start_listening(self):
+        """
+        Listen, join the game unless already joined, and serve until the server stops
+        The listener is up before Join so the engine's InitialState cannot arrive too early
+        """
+        grpc_server, cs = self.serve()
+        metrics_server = self.start_metrics_server()
 
         try:
+            if self.bot_id is None:
+                self.wait_to_join_game()
+                cs.joined(self.bot_id)
             grpc_server.wait_for_termination()  # wait until server finish
         except KeyboardInterrupt:
             grpc_server.stop(0)
+        finally:
+            cs.close()
+            if metrics_server is not None:
+                metrics_server.close()
+            self.metrics.close()
+
+    async def run_aio(self):
+        """
+        Listen, join and serve the whole game on one event loop
+        """
+        grpc_server, servicer = await self.serve_aio()
+        metrics_server = self.start_metrics_server()
+
+        try:
+            await self.join_game_aio()
+            servicer.cs.joined(self.bot_id)
+            await grpc_server.wait_for_termination()
+        finally:
+            await grpc_server.stop(0)
+            servicer.close()
+            servicer.cs.close()
+            if metrics_server is not None:
+                metrics_server.close()
+            self.metrics.close()
+
+
+class SessionHost:
+    """
+    Several bot identities in one process, see bot.sessions
+    Every bot joins with its own address and is served on its own port, all ports share
+    one thread pool, the map data and the MCTS worker pool; ``serve_shared`` adds a
+    listener routed by metadata
+    """
+
+    def __init__(self, game_server_address, verbose=False, margin=DEFAULT_MARGIN, metrics=None,
+                 max_sessions=64, history_size=64, keep_maps=4, max_workers=10, map_cache=None,
+                 mcts_workers=None, beam_depth=None, record_dir=None, mcts_pool=None):
+        self.game_server_address = game_server_address
+        self.verbose = verbose
+        self.margin = margin
+        self.mcts_workers = mcts_workers  # searches each bot runs at once on the shared pool
+        self.mcts_pool = mcts_pool
+        self.beam_depth = beam_depth
+        self.record_dir = record_dir
+        self.bot_names = {}  # session id -> name the bot joined with, names its replays
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.history_size = history_size
+        self.maps = SharedMaps(keep=keep_maps, cache=map_cache)
+        self.sessions = SessionManager(
+            self.make_servicer, max_sessions=max_sessions, metrics=self.metrics, on_evict=self.forget,
+        )
+        self.executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.servers = []
+
+    def make_servicer(self, session_id, bot_id, metrics):
+        bot_game = BotGame(
+            bot_id, margin=self.margin, history_size=self.history_size, metrics=metrics, maps=self.maps,
+            mcts_workers=self.mcts_workers, beam_depth=self.beam_depth, mcts_pool=self.mcts_pool,
+        )
+        recorder = open_recorder(self.record_dir, self.bot_names.get(session_id, session_id))
+        return ClientServer(
+            bot_id=bot_id, verbose=self.verbose, bot_game=bot_game, metrics=metrics, recorder=recorder,
+        )
+
+    def forget(self, session):
+        """Drop an evicted session from the host's registries"""
+        self.bot_names.pop(session.session_id, None)
+        if session.server in self.servers:
+            self.servers.remove(session.server)
+
+    def new_server(self):
+        server = grpc.server(self.executor, interceptors=(ServerInterceptor(self.metrics),))
+        self.servers.append(server)
+        return server
+
+    def add_bot(self, bot_name, my_address):
+        """
+        Join the game as ``bot_name`` and serve it on ``my_address``, returns the session
+        """
+        coms = BotComs(bot_name, my_address, self.game_server_address, verbose=self.verbose)
+        self.bot_names[my_address] = bot_name
+        # Listen first, the player id is filled in once Join answers
+        session = self.sessions.open(my_address)
+        server = self.new_server()
+        game_grpc.add_GameServiceServicer_to_server(PinnedSession(self.sessions, my_address), server)
+        server.add_insecure_port(my_address)
+        server.start()
+        session.server = server
+        print("Starting to listen on", my_address, "for", bot_name)
+        coms.wait_to_join_game()
+        session.servicer.joined(coms.bot_id)
+        return session
+
+    def serve_shared(self, address):
+        """
+        One listener for every session, calls are routed by their x-bot-session metadata
+        """
+        server = self.new_server()
+        game_grpc.add_GameServiceServicer_to_server(SessionRouter(self.sessions), server)
+        port = server.add_insecure_port(address)
+        server.start()
+        return server, port
+
+    def wait(self, metrics_port=None):
+        metrics_server = None
+        if metrics_port is not None and self.metrics.enabled:
+            # Per-session metrics, labelled by session
+            metrics_server = MetricsServer(self.sessions, metrics_port)
+        try:
+            for server in list(self.servers):
+                server.wait_for_termination()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+            if metrics_server is not None:
+                metrics_server.close()
+            self.metrics.close()
+
+    def close(self):
+        for server in self.servers:
+            server.stop(0)
+        self.servers = []
+        self.sessions.close_all()
+        self.executor.shutdown(wait=False)
 
 
 class ServerInterceptor(grpc.ServerInterceptor):
+    """
+    Times the real handler of every unary RPC, and the request parsing apart
+    Wrapped handlers are built once per method and reused
+    """
+
+    def __init__(self, metrics=None):
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self._handlers = {}
+
     def intercept_service(self, continuation, handler_call_details):
-        start_time = time.time_ns()
         method_name = handler_call_details.method
+        handler = self._handlers.get(method_name)
+        if handler is not None:
+            return handler
+
+        handler = continuation(handler_call_details)
+        if handler is None or handler.unary_unary is None or not self.metrics.enabled:
+            return handler
+
+        behavior = handler.unary_unary
+        deserializer = handler.request_deserializer
+        latency = self.metrics.histogram(f"rpc{method_name}")
+        parsing = self.metrics.histogram(f"parse{method_name}")
+        clock = time.perf_counter
+
+        def timed_behavior(request, context):
+            start_time = clock()
+            try:
+                return behavior(request, context)
+            finally:
+                latency.observe(clock() - start_time)
 
-        # Invoke the actual RPC
-        response = continuation(handler_call_details)
-
-        # Log after the call
-        duration = time.time_ns() - start_time
-        print(f"Unary call: {method_name}, Duration: {duration:.2f} nanoseconds")
-        return response
+        def timed_deserializer(data):
+            start_time = clock()
+            try:
+                return deserializer(data)
+            finally:
+                parsing.observe(clock() - start_time)
+
+        handler = grpc.unary_unary_rpc_method_handler(
+            timed_behavior,
+            request_deserializer=timed_deserializer if deserializer is not None else None,
+            response_serializer=handler.response_serializer,
+        )
+        self._handlers[method_name] = handler
+        return handler
 
 
 class ClientServer(game_grpc.GameServiceServicer):
-    def __init__(self, bot_id, verbose=False):
-        self.bg = BotGame(bot_id)
+    def __init__(self, bot_id, verbose=False, margin=DEFAULT_MARGIN, mcts_workers=None, bot_game=None,
+                 metrics=None, maps=None, recorder=None, startup_clock=None, beam_depth=None, mcts_pool=None):
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.recorder = recorder
+        self.startup = startup_clock  # reported once, when the first InitialState is answered
+        if bot_game is None:
+            bot_game = BotGame(
+                bot_id, margin=margin, mcts_workers=mcts_workers, metrics=self.metrics, maps=maps,
+                beam_depth=beam_depth, mcts_pool=mcts_pool,
+            )
+        self.bg = bot_game
         self.verbose = verbose
 
     def Join(self, request, context):
         return None
 
     def InitialState(self, request, context):
-        print("Receiving InitialState")
+        return self.initial_state(request)
+
+    def Turn(self, request, context):
+        deadline = self.bg.scheduler.deadline(context)
+        return self.turn(request, deadline)
+
+    def initial_state(self, request):
+        self.metrics.log("Receiving InitialState")
         if self.verbose:
-            print(json_format.MessageToJson(request))
-        self.bg.initial_state = request
+            print(to_json(request))
+        self.bg.load_initial_state(request)
+        if self.recorder is not None:
+            self.recorder.initial_state(request)
+        if self.startup is not None:
+            self.startup.mark("ready")
+            print("Startup:", self.startup.summary())
+            self.startup = None
         return game_pb2.PlayerReady(Ready=True)
 
-    def Turn(self, request, context):
-        print(f"Processing turn: {self.bg.countT}")
+    def joined(self, bot_id):
+        """The Join answer came back; the listener may already have served InitialState"""
+        if self.bg.player_num is None:
+            self.bg.player_num = bot_id
+
+    def turn(self, request, deadline):
+        if self.metrics.enabled:
+            self.metrics.log(f"Processing turn: {self.bg.countT}")
         if self.verbose:
-            print(json_format.MessageToJson(request))
-        action = self.bg.new_turn_action(request)
+            print(to_json(request))
+        action = self.bg.new_turn_action(request, deadline)
+        if self.recorder is not None:
+            self.recorder.turn(request, action)
         return action
 
+    def close(self):
+        self.bg.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+
+def open_recorder(record_dir, bot_name):
+    """ReplayWriter for a new game of ``bot_name`` in ``record_dir``, None when not recording"""
+    if record_dir is None:
+        return None
+    os.makedirs(record_dir, exist_ok=True)
+    name = f"{bot_name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.replay"
+    return ReplayWriter(os.path.join(record_dir, name))
+
+
+def to_json(message):
+    # json_format takes a while to import and is only needed in verbose mode
+    from google.protobuf import json_format
+
+    return json_format.MessageToJson(message)
+
 
 def ensure_params():
     parser = argparse.ArgumentParser(description="Bot configuration")
     parser.add_argument("--bn", type=str, default="random-bot", help="Bot name")
     parser.add_argument("--la", type=str, required=True, help="Listen address")
     parser.add_argument("--gs", type=str, required=True, help="Game server address")
+    parser.add_argument(
+        "--tm", type=float, default=DEFAULT_MARGIN,
+        help="Seconds of the turn deadline kept in reserve",
+    )
+    parser.add_argument(
+        "--mcts", type=int, default=None,
+        help="Refine turns with MCTS on this many worker processes (0 runs it in-process)",
+    )
+    parser.add_argument(
+        "--beam", type=int, default=None,
+        help="Refine turns with a beam search over this many capture/connect steps",
+    )
+    parser.add_argument(
+        "--aio", action="store_true",
+        help="Use the asyncio gRPC server and client",
+    )
+    parser.add_argument(
+        "--bots", type=int, default=1,
+        help="Host this many bots in one process, on consecutive ports from the listen address",
+    )
+    parser.add_argument(
+        "--map-cache", type=str, default=None,
+        help="Directory where the precomputed map data is kept between games",
+    )
+    parser.add_argument(
+        "--map-cache-mb", type=int, default=256,
+        help="Size limit of the map cache directory in MB",
+    )
+    parser.add_argument(
+        "--record", type=str, default=None,
+        help="Record every game as a binary replay in this directory",
+    )
+    parser.add_argument(
+        "--no-metrics", action="store_true",
+        help="Disable metrics and turn logging",
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=None,
+        help="Serve metrics over HTTP on this port (/metrics and /metrics.json)",
+    )
 
     args = parser.parse_args()
+    if args.bots > 1 and args.aio:
+        parser.error("--aio serves a single bot, it cannot be combined with --bots")
 
     if not args.bn:
         raise ValueError("Bot name is required")
@@ -308,22 +837,68 @@ def ensure_params():
     if not args.gs:
         raise ValueError("Game server address is required")
 
-    return args.bn, args.la, args.gs
+    return args
 
 
 def main():
+    args = ensure_params()
+    metrics = Metrics(enabled=not args.no_metrics)
+    map_cache = None
+    if args.map_cache:
+        map_cache = MapCache(args.map_cache, max_bytes=args.map_cache_mb * 1024 * 1024)
+
+    # Worker processes are started before any gRPC thread exists, and shared by every bot
+    mcts_pool = None
+    if args.mcts:
+        from bot.mcts import start_pool
+        mcts_pool = start_pool(args.mcts)
+    try:
+        run(args, metrics, map_cache, mcts_pool)
+    finally:
+        if mcts_pool is not None:
+            mcts_pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run(args, metrics, map_cache, mcts_pool):
     verbose = False
-    bot_name, listen_address, game_server_address = ensure_params()
+    if args.bots > 1:
+        # The bots split the workers between them
+        mcts_workers = max(1, args.mcts // args.bots) if args.mcts else args.mcts
+        host = SessionHost(
+            args.gs, verbose=verbose, margin=args.tm, metrics=metrics, map_cache=map_cache,
+            mcts_workers=mcts_workers, beam_depth=args.beam, record_dir=args.record, mcts_pool=mcts_pool,
+        )
+        address, port = args.la.rsplit(":", 1)
+        for index in range(args.bots):
+            host.add_bot(f"{args.bn}-{index + 1}", f"{address}:{int(port) + index}")
+        host.wait(args.metrics_port)
+        return
 
     bot = BotComs(
-        bot_name=bot_name,
-        my_address=listen_address,
-        game_server_address=game_server_address,
+        bot_name=args.bn,
+        my_address=args.la,
+        game_server_address=args.gs,
         verbose=verbose,
+        margin=args.tm,
+        mcts_workers=args.mcts,
+        beam_depth=args.beam,
+        metrics=metrics,
+        metrics_port=args.metrics_port,
+        use_aio=args.aio,
+        maps=SharedMaps(keep=1, cache=map_cache) if map_cache is not None else None,
+        record_dir=args.record,
+        mcts_pool=mcts_pool,
     )
-    bot.wait_to_join_game()
+    if bot.use_aio:
+        import asyncio  # only the --aio mode runs an event loop
+
+        try:
+            asyncio.run(bot.run_aio())
+        except KeyboardInterrupt:
+            pass
+        return
     bot.start_listening()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,42 @@
+from bot.actions import ActionPool
+from internal.handler.coms import game_pb2
+
+
+def test_messages_are_reused():
+    pool = ActionPool()
+    move = pool.move(3, 4)
+    assert pool.move(3, 4) is move
+    assert pool.step((2, 4), (1, 0)) is move
+    assert pool.connect(5, 5) is pool.connect(5, 5)
+    assert pool.move(4, 3) is not move
+    assert move == game_pb2.NewAction(Action=game_pb2.MOVE, Destination=game_pb2.Position(X=3, Y=4))
+
+
+def test_attack_rewrites_its_energy():
+    pool = ActionPool()
+    first = pool.attack(1, 1, 30)
+    assert first.Energy == 30
+    serialized = first.SerializeToString()
+    second = pool.attack(1, 1, 12)
+    assert second is first and second.Energy == 12
+    assert game_pb2.NewAction.FromString(serialized).Energy == 30
+
+
+def test_prebuild_fills_connects_and_attacks():
+    pool = ActionPool()
+    pool.prebuild([(1, 2), (3, 4)])
+    assert set(pool.connects) == set(pool.attacks) == {(1, 2), (3, 4)}
+    assert not pool.moves
+    connect = pool.connects[(1, 2)]
+    assert pool.connect(1, 2) is connect
+    assert connect.Action == game_pb2.CONNECT
+
+
+def test_build_maps_planner_tuples():
+    pool = ActionPool()
+    assert pool.build(game_pb2.MOVE, 1, 2) is pool.move(1, 2)
+    assert pool.build(game_pb2.CONNECT, 1, 2) is pool.connect(1, 2)
+    attack = pool.build(game_pb2.ATTACK, 1, 2, 40)
+    assert attack is pool.attacks[(1, 2)] and attack.Energy == 40
+    assert pool.build(game_pb2.PASS, 0, 0) is pool.pass_action
+    assert pool.pass_action.Action == game_pb2.PASS
@@ -0,0 +1,73 @@
+import asyncio
+import socket
+
+import grpc
+from grpc import aio
+
+from benchmarks.synthetic import TurnGenerator, make_initial_state
+from bot import aio as bot_aio
+from bot.startup import Backoff
+from internal.handler.coms import game_pb2
+from internal.handler.coms import game_pb2_grpc as game_grpc
+from main import ClientServer
+
+
+def free_address():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"127.0.0.1:{sock.getsockname()[1]}"
+
+
+class FakeEngine(game_grpc.GameServiceServicer):
+    """Game engine side of Join, refusing the first ``refusals`` calls"""
+
+    def __init__(self, refusals=0):
+        self.refusals = refusals
+        self.players = []
+
+    async def Join(self, request, context):
+        if self.refusals:
+            self.refusals -= 1
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "not accepting players yet")
+        self.players.append((request.name, request.serverAddress))
+        return game_pb2.PlayerID(PlayerID=len(self.players))
+
+
+async def round_trip(turns, refusals):
+    engine = FakeEngine(refusals)
+    engine_address, bot_address = free_address(), free_address()
+    engine_server = aio.server()
+    game_grpc.add_GameServiceServicer_to_server(engine, engine_server)
+    engine_server.add_insecure_port(engine_address)
+    await engine_server.start()
+
+    logged = []
+    player = await bot_aio.join(engine_address, "aio-bot", bot_address, backoff=Backoff(initial=0.01),
+                                log=logged.append)
+    initial_state = make_initial_state(15, 15, lighthouses=4, player_id=player.PlayerID)
+    server, servicer = await bot_aio.serve(ClientServer(player.PlayerID), bot_address)
+    answers = []
+    try:
+        async with aio.insecure_channel(bot_address) as channel:
+            bot = game_grpc.GameServiceStub(channel)
+            ready = await bot.InitialState(initial_state, timeout=5.0)
+            generator = TurnGenerator(initial_state)
+            for _ in range(turns):
+                answers.append(await bot.Turn(generator.next_turn(), timeout=1.0))
+    finally:
+        await server.stop(None)
+        servicer.close()
+        await engine_server.stop(None)
+    return player, engine.players, bot_address, logged, ready, answers
+
+
+def test_join_then_turns_over_grpc_aio():
+    player, players, bot_address, logged, ready, answers = asyncio.run(round_trip(turns=5, refusals=2))
+    assert player.PlayerID == 1
+    assert players == [("aio-bot", bot_address)]
+    assert len(logged) == 2 and "not accepting players yet" in logged[0]
+    assert isinstance(ready, game_pb2.PlayerReady) and ready.Ready
+    assert len(answers) == 5
+    assert all(isinstance(answer, game_pb2.NewAction) for answer in answers)
+    assert all(answer.Action in (game_pb2.PASS, game_pb2.MOVE, game_pb2.ATTACK, game_pb2.CONNECT)
+               for answer in answers)
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from benchmarks.synthetic import make_walkable, pick_cells
+from bot.beam import CAPTURE, CONNECT, VISIT, BeamPlanner
+from bot.connections import ConnectionGraph, segments_intersect
+from bot.lighthouses import LighthouseIndex
+from bot.navigation import NavigationGrid
+from bot.scheduler import Deadline
+from bot.scoring import ScoringEngine
+from internal.handler.coms import game_pb2
+
+PLAYER = 1
+
+
+def make_planner(seed, count=10, size=18, keys=True, **options):
+    """Half of the lighthouses ours (with their keys when ``keys``), we stand on one of them"""
+    rng = random.Random(seed)
+    walkable = make_walkable(size, size, seed=seed)
+    positions = pick_cells(walkable, count, seed=seed)
+    index = LighthouseIndex(positions, PLAYER)
+    index.update([
+        game_pb2.Lighthouse(
+            Position=game_pb2.Position(X=x, Y=y), Owner=PLAYER if lh_id % 2 == 0 else rng.choice((0, 2)),
+            Energy=rng.randrange(60), HaveKey=keys and lh_id % 2 == 0,
+        )
+        for lh_id, (x, y) in enumerate(positions)
+    ])
+    navigation = NavigationGrid(walkable, positions)
+    planner = BeamPlanner(
+        index, ConnectionGraph(positions), ScoringEngine(index, navigation), navigation, **options
+    )
+    return planner, positions[0]
+
+
+def check_sequence(planner, position, energy, sequence):
+    """Replay ``sequence`` against the rules the planner must respect"""
+    index, connections = planner.index, planner.connections
+    lh = index.ids.get(position)
+    ours = set(index.owned)
+    keys = {lh_id for lh_id in range(len(index)) if index.have_key[lh_id]}
+    added = []
+    for kind, target, amount in sequence:
+        if kind == CAPTURE:
+            assert target not in ours
+            assert 0 < amount <= energy
+            energy -= amount
+            ours.add(target)
+            keys.add(target)
+        elif kind == VISIT:
+            assert target in ours
+            assert amount == 0
+            keys.add(target)
+        else:
+            assert kind == CONNECT
+            assert lh is not None and lh in ours and target in ours
+            assert target in keys and target != lh
+            assert connections.is_legal(lh, target)
+            pa, pb = index.positions[lh], index.positions[target]
+            for c, d in added:
+                if not {c, d} & {lh, target}:
+                    assert not segments_intersect(pa, pb, index.positions[c], index.positions[d])
+            added.append((lh, target))
+            keys.discard(target)
+            continue
+        lh = target
+    return added
+
+
+@pytest.mark.parametrize("keys", (True, False))
+@pytest.mark.parametrize("seed", range(6))
+def test_sequences_are_legal(seed, keys):
+    planner, position = make_planner(seed, keys=keys, depth=5, width=8)
+    result = planner.plan(position, 150, turn=1)
+    assert result.complete
+    assert result.sequence
+    assert result.action == result.sequence[0]
+    check_sequence(planner, position, 150, result.sequence)
+
+
+def test_connects_what_it_can_from_where_it_stands():
+    linked = 0
+    for seed in range(6):
+        planner, position = make_planner(seed, depth=3, width=16)
+        node = planner.root(position, 0)
+        planner.plan(position, 0, turn=1)
+        for child in planner.expand(node, position):
+            kind, target, _ = child.action
+            assert kind != CAPTURE  # nothing to capture with no energy
+            if kind == CONNECT:
+                assert planner.connections.is_legal(node.lh, target)
+                linked += 1
+    assert linked
+
+
+def test_without_energy_nothing_is_captured():
+    planner, position = make_planner(2, depth=4, width=8)
+    result = planner.plan(position, 0, turn=1)
+    assert all(kind != CAPTURE for kind, _, _ in result.sequence)
+    check_sequence(planner, position, 0, result.sequence)
+
+
+def test_expired_deadline_stops_the_search():
+    planner, position = make_planner(3, depth=6, width=16)
+    result = planner.plan(position, 150, turn=1, deadline=Deadline(0.0))
+    assert not result.complete
+    assert result.expanded == 0
+    assert result.action is None
@@ -0,0 +1,103 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+from bot.connections import ConnectionGraph
+
+
+def cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+
+def touches(p, q, r):
+    """True when point ``r`` lies on the closed segment p-q"""
+    return cross(p, q, r) == 0 and min(p[0], q[0]) <= r[0] <= max(p[0], q[0]) \
+        and min(p[1], q[1]) <= r[1] <= max(p[1], q[1])
+
+
+def meet(p1, p2, q1, q2):
+    """True when the closed segments share a point, solved exactly on the parametric form"""
+    r = (p2[0] - p1[0], p2[1] - p1[1])
+    s = (q2[0] - q1[0], q2[1] - q1[1])
+    qp = (q1[0] - p1[0], q1[1] - p1[1])
+    denominator = r[0] * s[1] - r[1] * s[0]
+    if denominator != 0:
+        t = Fraction(qp[0] * s[1] - qp[1] * s[0], denominator)
+        u = Fraction(qp[0] * r[1] - qp[1] * r[0], denominator)
+        return 0 <= t <= 1 and 0 <= u <= 1
+    if qp[0] * r[1] - qp[1] * r[0] != 0:
+        return False  # parallel, on different lines
+    length = r[0] * r[0] + r[1] * r[1]
+    t0 = Fraction(qp[0] * r[0] + qp[1] * r[1], length)
+    t1 = t0 + Fraction(s[0] * r[0] + s[1] * r[1], length)
+    return max(min(t0, t1), 0) <= min(max(t0, t1), 1)
+
+
+def brute_force_legal(positions, links, a, b):
+    if a == b or (min(a, b), max(a, b)) in links:
+        return False
+    pa, pb = positions[a], positions[b]
+    for c, pc in enumerate(positions):
+        if c != a and c != b and touches(pa, pb, pc):
+            return False
+    for c, d in links:
+        if {c, d} & {a, b}:
+            continue
+        if meet(pa, pb, positions[c], positions[d]):
+            return False
+    return True
+
+
+def random_graph(seed, count=14, side=20, bucket_size=4):
+    """Lighthouses on a small map (plenty of collinear triples) with random legal links"""
+    rng = random.Random(seed)
+    cells = [(x, y) for x in range(side) for y in range(side)]
+    positions = rng.sample(cells, count)
+    graph = ConnectionGraph(positions, bucket_size=bucket_size)
+    pairs = [(a, b) for a in range(count) for b in range(a + 1, count)]
+    rng.shuffle(pairs)
+    for a, b in pairs[:count * 2]:
+        if brute_force_legal(graph.positions, graph.links, a, b):
+            graph.add_link(a, b)
+    return graph, rng
+
+
+def check_every_pair(graph):
+    for a in range(len(graph.positions)):
+        for b in range(len(graph.positions)):
+            expected = brute_force_legal(graph.positions, graph.links, a, b)
+            assert graph.is_legal(a, b) == expected, (a, b)
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("bucket_size", [3, 8, 64])
+def test_is_legal_matches_brute_force(seed, bucket_size):
+    graph, _ = random_graph(seed, bucket_size=bucket_size)
+    check_every_pair(graph)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_is_legal_after_links_are_removed(seed):
+    graph, rng = random_graph(seed)
+    for link in rng.sample(sorted(graph.links), len(graph.links) // 2):
+        graph.remove_link(*link)
+    check_every_pair(graph)
+
+
+def test_sync_follows_the_index_neighbours():
+    graph = ConnectionGraph([(0, 0), (4, 0), (0, 4), (4, 4)])
+    graph.add_link(0, 1)
+    neighbours = [{3}, set(), set(), {0}]
+    graph.sync(neighbours, [0, 1, 3])
+    assert graph.links == {(0, 3)}
+    # The diagonals cross, the sides do not
+    assert not graph.is_legal(1, 2)
+    assert graph.is_legal(0, 1) and graph.is_legal(2, 3)
+
+
+def test_link_over_a_lighthouse_is_illegal():
+    graph = ConnectionGraph([(0, 0), (2, 2), (5, 5)])
+    assert not graph.is_legal(0, 2)
+    assert graph.lighthouses_on(0, 2) == [1]
+    assert graph.is_legal(0, 1) and graph.is_legal(1, 2)
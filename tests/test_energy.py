@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_walkable, pick_cells
+from bot.energy import EnergyField
+from bot.navigation import MOVES, NavigationGrid
+from bot.simulation import regen_field
+
+
+def make_field(seed, size=9):
+    walkable = make_walkable(size, size, seed=seed)
+    cells = pick_cells(walkable, 5, seed=seed)
+    field = EnergyField(walkable, regen_field(walkable, cells[2:]))
+    rng = np.random.default_rng(seed)
+    field.energy[:] = rng.integers(0, 60, walkable.shape) * walkable
+    return field, NavigationGrid(walkable), cells[0], cells[1]
+
+
+def brute_force(field, navigation, source, destination, turn, slack):
+    """Most energy harvested over every path that arrives within ``slack`` extra turns"""
+    dist = navigation.field(destination).dist
+    turns = int(dist[source[1], source[0]]) + slack
+    best = -1
+
+    def walk(x, y, steps, total, visited):
+        nonlocal best
+        if (x, y) == tuple(destination):
+            best = max(best, total)
+        for dx, dy in MOVES:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < field.width and 0 <= ny < field.height) or not field.walkable[ny, nx]:
+                continue
+            if steps + 1 + int(dist[ny, nx]) > turns:
+                continue
+            now = turn + steps + 1
+            last = visited.get((nx, ny))
+            if last is None:
+                collected = field.cell_estimate(nx, ny, now)
+            else:
+                collected = min(field.cell_max, (now - last) * int(field.regen[ny, nx]))
+            visited[(nx, ny)] = now
+            walk(nx, ny, steps + 1, total + collected, visited)
+            if last is None:
+                del visited[(nx, ny)]
+            else:
+                visited[(nx, ny)] = last
+
+    walk(source[0], source[1], 0, 0, {tuple(source): turn})
+    return best
+
+
+def simulate(field, source, moves, turn):
+    """Walk ``moves`` on a copy of the field, harvesting every cell reached"""
+    energy, last_seen = field.energy.copy(), field.last_seen.copy()
+    x, y = source
+    total = 0
+    try:
+        for steps, (dx, dy) in enumerate(moves, 1):
+            x, y = x + dx, y + dy
+            assert field.walkable[y, x]
+            total += field.cell_estimate(x, y, turn + steps)
+            field.harvested(x, y, turn + steps)
+    finally:
+        field.energy, field.last_seen = energy, last_seen
+    return total, (x, y)
+
+
+@pytest.mark.parametrize("seed", range(40))
+@pytest.mark.parametrize("slack", [0, 1, 2])
+def test_route_matches_brute_force(seed, slack):
+    field, navigation, source, destination = make_field(seed)
+    shortest = navigation.distance(source, destination)
+    if shortest is None:
+        pytest.skip("destination unreachable")
+    route = field.route(source, destination, navigation, 5, slack=slack, horizon=64)
+    collected, end = simulate(field, source, route.moves, 5)
+    assert end == tuple(destination)
+    assert len(route.moves) <= shortest + slack
+    assert route.energy == collected
+    assert route.energy == brute_force(field, navigation, source, destination, 5, slack)
+
+
+def test_route_bounces_on_a_fast_cell():
+    # A corridor where only the cell after the source regenerates: going back to it pays
+    walkable = np.ones((1, 5), dtype=bool)
+    regen = np.array([[0, 0, 30, 0, 0]], dtype=np.int32)
+    field = EnergyField(walkable, regen)
+    route = field.route((1, 0), (3, 0), NavigationGrid(walkable), 0, slack=2)
+    assert route.energy == 30 + 60
+    cells = [1]
+    for dx, _ in route.moves:
+        cells.append(cells[-1] + dx)
+    assert cells.count(2) == 2 and cells[-1] == 3
+
+
+def test_yields_credit_a_revisit_with_its_regeneration():
+    walkable = np.ones((3, 3), dtype=bool)
+    regen = np.full((3, 3), 2, dtype=np.int32)
+    field = EnergyField(walkable, regen)
+    field.energy[:] = 50
+    assert field.yields((0, 0), [(1, 0), (-1, 0), (1, 0)], 0) == [52, 4, 4]
+
+
+def test_committed_route_keeps_the_deadline_of_each_destination():
+    walkable = np.ones((1, 9), dtype=bool)
+    field = EnergyField(walkable, np.full((1, 9), 5, dtype=np.int32))
+    navigation = NavigationGrid(walkable)
+    # Promised to reach x=8 by turn 0 + 4 + 2; one turn of it is spent standing still
+    assert field.committed_route((4, 0), (8, 0), navigation, 0, slack=2).turns <= 6
+    field.committed_route((4, 0), (0, 0), navigation, 1, slack=2)
+    route = field.committed_route((4, 0), (8, 0), navigation, 1, slack=2)
+    assert route.turns <= 5
@@ -0,0 +1,82 @@
+import pytest
+
+from bot.history import TurnHistory, read_spill
+from internal.handler.coms import game_pb2
+
+POSITIONS = [(1, 1), (4, 2), (2, 5)]
+
+
+def make_turn(turn, owners, energies):
+    return game_pb2.NewTurn(
+        Position=game_pb2.Position(X=turn % 7, Y=turn % 5),
+        Energy=10 * turn,
+        Score=turn,
+        Lighthouses=[
+            game_pb2.Lighthouse(Position=game_pb2.Position(X=x, Y=y), Owner=owner, Energy=energy)
+            for (x, y), owner, energy in zip(POSITIONS, owners, energies)
+        ],
+    )
+
+
+def make_action(turn):
+    if turn % 2:
+        return game_pb2.NewAction(Action=game_pb2.ATTACK, Destination=game_pb2.Position(X=1, Y=1), Energy=turn)
+    return game_pb2.NewAction(Action=game_pb2.MOVE, Destination=game_pb2.Position(X=2, Y=3))
+
+
+def play(history, turns):
+    for turn in range(turns):
+        owners = [turn // 3 % 3, 0, 1]
+        energies = [turn // 3, 5, turn]
+        history.append(make_turn(turn, owners, energies), make_action(turn))
+
+
+def fields(record):
+    return (
+        record.turn, record.x, record.y, record.energy, record.score, record.action,
+        record.dest_x, record.dest_y, record.action_energy, record.lighthouse_deltas,
+    )
+
+
+def test_only_changed_lighthouses_are_recorded():
+    history = TurnHistory(capacity=8)
+    play(history, 4)
+    assert history[0].lighthouse_deltas == ((0, 0, 0), (1, 0, 5), (2, 1, 0))
+    assert history[1].lighthouse_deltas == ((2, 1, 1),)
+    assert history[3].lighthouse_deltas == ((0, 1, 1), (2, 1, 3))
+    record = history.last()
+    assert (record.turn, record.x, record.y, record.energy, record.score) == (3, 3, 3, 30, 3)
+    assert (record.action, record.dest_x, record.dest_y, record.action_energy) == (game_pb2.ATTACK, 1, 1, 3)
+
+
+def test_ring_buffer_keeps_the_newest_records():
+    history = TurnHistory(capacity=5)
+    play(history, 12)
+    assert len(history) == 5
+    assert [record.turn for record in history] == list(range(7, 12))
+    assert history.count == 12
+
+
+@pytest.mark.parametrize("capacity", [1, 4, 50])
+def test_spill_reloads_every_turn(tmp_path, capacity):
+    path = tmp_path / "history.bin"
+    history = TurnHistory(capacity=capacity, spill_path=str(path))
+    play(history, 20)
+    in_memory = [fields(record) for record in history]
+    history.close()
+    spilled = [fields(record) for record in read_spill(str(path))]
+    assert [record[0] for record in spilled] == list(range(20))
+    assert spilled[-len(in_memory):] == in_memory
+    # The deltas replay into the lighthouse states of the last turn
+    owners, energies = {}, {}
+    for record in spilled:
+        for index, owner, energy in record[-1]:
+            owners[index], energies[index] = owner, energy
+    assert [owners[index] for index in range(3)] == [19 // 3 % 3, 0, 1]
+    assert [energies[index] for index in range(3)] == [19 // 3, 5, 19]
+
+
+@pytest.mark.parametrize("capacity", [0, -1])
+def test_capacity_must_hold_a_record(tmp_path, capacity):
+    with pytest.raises(ValueError):
+        TurnHistory(capacity=capacity, spill_path=str(tmp_path / "history.bin"))
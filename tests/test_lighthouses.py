@@ -0,0 +1,121 @@
+import random
+
+import numpy as np
+import pytest
+
+from bot.lighthouses import LighthouseIndex
+from internal.handler.coms import game_pb2
+
+PLAYER = 1
+POSITIONS = [(1, 1), (5, 1), (9, 2), (3, 6), (7, 7), (2, 9)]
+
+
+def lighthouses(owners, energies, keys, links):
+    connections = [[] for _ in POSITIONS]
+    for a, b in links:
+        connections[a].append(game_pb2.Position(X=POSITIONS[b][0], Y=POSITIONS[b][1]))
+        connections[b].append(game_pb2.Position(X=POSITIONS[a][0], Y=POSITIONS[a][1]))
+    return [
+        game_pb2.Lighthouse(
+            Position=game_pb2.Position(X=x, Y=y), Owner=owners[index], Energy=energies[index],
+            HaveKey=keys[index], Connections=connections[index],
+        )
+        for index, (x, y) in enumerate(POSITIONS)
+    ]
+
+
+def check_views(index, owners, energies, keys, links):
+    """Every incremental view must equal the one rebuilt from scratch"""
+    assert index.owner.tolist() == owners
+    assert index.energy.tolist() == energies
+    assert index.have_key.tolist() == keys
+    assert index.key_count == sum(keys)
+    neighbours = [set() for _ in POSITIONS]
+    for a, b in links:
+        neighbours[a].add(b)
+        neighbours[b].add(a)
+    assert index.neighbours == neighbours
+    owned = {lh_id for lh_id, owner in enumerate(owners) if owner == PLAYER}
+    keyed = {lh_id for lh_id in owned if keys[lh_id]}
+    assert index.owned == owned
+    assert index.keyed_owned == keyed
+    assert index.connectable == {src: keyed - neighbours[src] - {src} for src in owned}
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_updates_match_a_full_rebuild(seed):
+    rng = random.Random(seed)
+    count = len(POSITIONS)
+    owners, energies, keys, links = [0] * count, [0] * count, [False] * count, set()
+    index = LighthouseIndex(POSITIONS, PLAYER)
+    pairs = [(a, b) for a in range(count) for b in range(a + 1, count)]
+    for _ in range(40):
+        before = (list(owners), list(energies), list(keys), set(links))
+        for _ in range(rng.randrange(3)):
+            lh_id = rng.randrange(count)
+            owners[lh_id] = rng.choice((0, PLAYER, 2))
+            energies[lh_id] = rng.randrange(50)
+            keys[lh_id] = rng.random() < 0.5
+        if rng.random() < 0.5:
+            links ^= {rng.choice(pairs)}
+        revision = index.revision
+        changes = index.update(lighthouses(owners, energies, keys, links))
+        check_views(index, owners, energies, keys, links)
+        if index.revision == 1:
+            continue  # first update, everything is new
+        assert sorted(changes.owner) == [i for i in range(count) if owners[i] != before[0][i]]
+        assert sorted(changes.energy) == [i for i in range(count) if energies[i] != before[1][i]]
+        assert sorted(changes.key) == [i for i in range(count) if keys[i] != before[2][i]]
+        touched = {lh_id for link in links ^ before[3] for lh_id in link}
+        assert sorted(changes.connections) == sorted(touched)
+        assert index.revision == revision + bool(changes)
+
+
+def test_first_update_reports_every_lighthouse():
+    index = LighthouseIndex(POSITIONS, PLAYER)
+    changes = index.update(lighthouses([0] * 6, [0] * 6, [False] * 6, set()))
+    assert sorted(changes.owner) == list(range(6))
+    assert changes.connections == []
+    assert index.revision == 1
+
+
+def test_repeated_turn_changes_nothing():
+    index = LighthouseIndex(POSITIONS, PLAYER)
+    state = ([PLAYER, PLAYER, 0, 2, 0, 0], [10, 20, 0, 5, 0, 0], [True, True, False, False, False, False], {(0, 1)})
+    index.update(lighthouses(*state))
+    changes = index.update(lighthouses(*state))
+    assert not changes
+    assert index.revision == 1
+    check_views(index, *state)
+
+
+def test_unknown_lighthouses_are_ignored():
+    index = LighthouseIndex(POSITIONS, PLAYER)
+    stray = game_pb2.Lighthouse(Position=game_pb2.Position(X=40, Y=40), Owner=PLAYER, Energy=9)
+    index.update(lighthouses([0] * 6, [0] * 6, [False] * 6, set()) + [stray])
+    assert len(index) == len(POSITIONS)
+    assert not np.any(index.owner == PLAYER)
+
+
+def test_swapped_link_is_seen_through_the_owner_change():
+    # Lighthouse 0 keeps two links, but 2 was lost (it changed owner) and 3 was linked
+    index = LighthouseIndex(POSITIONS, PLAYER)
+    keys = [True] * 6
+    index.update(lighthouses([PLAYER] * 4 + [0, 0], [10] * 6, keys, {(0, 1), (0, 2)}))
+    changes = index.update(lighthouses([PLAYER, PLAYER, 2, PLAYER, 0, 0], [10] * 6, keys, {(0, 1), (0, 3)}))
+    assert sorted(changes.connections) == [0, 2, 3]
+    assert index.neighbours[0] == {1, 3}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_targets_come_out_cheapest_first(seed):
+    rng = random.Random(seed)
+    index = LighthouseIndex(POSITIONS, PLAYER)
+    keys = [False] * 6
+    for _ in range(30):
+        owners = [rng.choice((0, PLAYER, 2)) for _ in POSITIONS]
+        energies = [rng.randrange(50) for _ in POSITIONS]
+        index.update(lighthouses(owners, energies, keys, set()))
+        expected = sorted((energies[i], i) for i in range(6) if owners[i] != PLAYER)
+        assert sorted(index.targets_by_energy()) == expected
+        assert [energy for energy, _ in index.targets_by_energy()] == [energy for energy, _ in expected]
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+from grpc import RpcError
+
+from bot.local_engine import DirectBot, LocalGame, parse_map, play_match
+from bot.simulation import LIGHTHOUSE_POINTS
+from internal.handler.coms import game_pb2
+from main import BotGame
+
+MAP = """
+xxxxxxx
+x1.!.2x
+x.....x
+xxxxxxx
+"""
+
+
+def move(x, y):
+    return game_pb2.NewAction(Action=game_pb2.MOVE, Destination=game_pb2.Position(X=x, Y=y))
+
+
+class ScriptedBot:
+    """GameServiceStub-shaped bot that walks onto the lighthouse and attacks once it has ``attack`` energy"""
+
+    def __init__(self, attack):
+        self.attack = attack
+        self.turns = []
+
+    def InitialState(self, request, timeout=None):
+        return game_pb2.PlayerReady(Ready=True)
+
+    def Turn(self, request, timeout=None):
+        self.turns.append(request)
+        x, y = request.Position.X, request.Position.Y
+        if x < 3:
+            return move(x + 1, y)
+        if request.Energy >= self.attack and request.Lighthouses[0].Owner == 0:
+            return game_pb2.NewAction(Action=game_pb2.ATTACK, Energy=request.Energy)
+        return game_pb2.NewAction(Action=game_pb2.PASS)
+
+
+class FailingBot(ScriptedBot):
+    def Turn(self, request, timeout=None):
+        self.turns.append(request)
+        raise RpcError()
+
+
+def scripted_game(turns):
+    walkable, lighthouses, starts = parse_map(MAP)
+    game = LocalGame(walkable, lighthouses, starts, turns=turns)
+    return game, [game.join(), game.join()]
+
+
+def test_parse_map():
+    walkable, lighthouses, starts = parse_map(MAP)
+    assert walkable.shape == (4, 7)
+    assert not walkable[0].any() and walkable[1, 1:6].all()
+    assert lighthouses == [(3, 1)]
+    assert starts == [(1, 1), (5, 1)]
+
+
+def test_game_refuses_extra_players():
+    game, _ = scripted_game(10)
+    assert game.full
+    with pytest.raises(ValueError):
+        game.join()
+
+
+def test_owned_lighthouse_scores_every_round():
+    game, (first, second) = scripted_game(30)
+    bot = ScriptedBot(attack=60)
+    result = play_match(game, {first: bot, second: FailingBot(attack=0)})
+    assert result.turns == 30
+    assert len(result.latencies[first]) == len(result.latencies[second]) == 30
+    assert any(turn.Lighthouses[0].Owner == first for turn in bot.turns)
+    # A round scores the lighthouse points when it ends with the lighthouse ours
+    for before, after in zip(bot.turns, bot.turns[1:]):
+        owned = after.Lighthouses[0].Owner == first
+        assert after.Score - before.Score == (LIGHTHOUSE_POINTS if owned else 0)
+    assert result.scores[first] > 0
+    assert result.scores[second] == 0
+    assert result.winners == [first]
+
+
+def test_failed_turn_counts_as_pass():
+    game, (first, second) = scripted_game(5)
+    failing = FailingBot(attack=0)
+    play_match(game, {first: ScriptedBot(attack=1000), second: failing})
+    assert {(turn.Position.X, turn.Position.Y) for turn in failing.turns} == {(5, 1)}
+
+
+def seeded_match(seed):
+    random.seed(seed)
+    game = LocalGame.random(15, 15, 4, turns=60, seed=seed)
+    bots = {}
+    for _ in range(2):
+        player_id = game.join()
+        bots[player_id] = BotGame(player_id)
+    try:
+        return play_match(game, {player_id: DirectBot(bot) for player_id, bot in bots.items()})
+    finally:
+        for bot in bots.values():
+            bot.close()
+
+
+def test_seeded_match_is_reproducible():
+    result = seeded_match(3)
+    assert result.turns == 60
+    assert all(len(samples) == 60 for samples in result.latencies.values())
+    assert all(score > 0 for score in result.scores.values())
+    assert seeded_match(3).scores == result.scores
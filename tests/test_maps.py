@@ -0,0 +1,93 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_walkable, pick_cells
+from bot.maps import _PREFIX, MapCache, MapData, map_fingerprint
+from bot.simulation import regen_field
+
+
+@pytest.fixture
+def stored(tmp_path):
+    walkable = make_walkable(15, 15, seed=3)
+    positions = pick_cells(walkable, 4, seed=3)
+    fingerprint = map_fingerprint(walkable, positions)
+    cache = MapCache(str(tmp_path))
+    MapData.load_or_build(fingerprint, walkable, positions, cache)
+    return cache, fingerprint, walkable, positions
+
+
+def rewrite_header(path, change):
+    """Apply ``change`` to the JSON header of a cache file, keeping its length"""
+    with open(path, "rb") as stream:
+        data = bytearray(stream.read())
+    _, size = _PREFIX.unpack_from(data, 0)
+    header = json.loads(data[_PREFIX.size:_PREFIX.size + size])
+    encoded = json.dumps(change(header)).encode()
+    assert len(encoded) <= size
+    data[_PREFIX.size:_PREFIX.size + size] = encoded + b" " * (size - len(encoded))
+    with open(path, "wb") as stream:
+        stream.write(data)
+
+
+def test_round_trip_keeps_the_regen_field(stored):
+    cache, fingerprint, walkable, positions = stored
+    data = MapData.load_or_build(fingerprint, walkable, positions, cache)
+    assert cache.hits == 1
+    np.testing.assert_array_equal(data.regen, regen_field(walkable, positions))
+    np.testing.assert_array_equal(data.navigation.walkable, walkable)
+
+
+def rename_checksum(header):
+    header["checksun"] = header.pop("checksum")
+    return header
+
+
+def wrong_payload_type(header):
+    header["payload"] = str(header["payload"])
+    return header
+
+
+def header_is_a_list(header):
+    return list(header)
+
+
+def short_array(header):
+    header["arrays"][0] = header["arrays"][0][:3]
+    return header
+
+
+@pytest.mark.parametrize("change", [rename_checksum, wrong_payload_type, header_is_a_list, short_array])
+def test_bad_header_counts_as_corrupt(stored, change):
+    cache, fingerprint, walkable, positions = stored
+    rewrite_header(cache.file_for(fingerprint), change)
+    assert cache.load(fingerprint) is None
+    assert cache.corrupt == 1
+    assert not os.path.exists(cache.file_for(fingerprint))
+    # The next game rebuilds and stores it again
+    MapData.load_or_build(fingerprint, walkable, positions, cache)
+    assert cache.load(fingerprint) is not None
+
+
+def test_flipped_payload_byte_fails_the_checksum(stored):
+    cache, fingerprint, _, _ = stored
+    path = cache.file_for(fingerprint)
+    with open(path, "r+b") as stream:
+        stream.seek(-1, os.SEEK_END)
+        last = stream.read(1)
+        stream.seek(-1, os.SEEK_END)
+        stream.write(bytes([last[0] ^ 0xFF]))
+    assert cache.load(fingerprint) is None
+    assert cache.corrupt == 1
+
+
+def test_truncated_file_counts_as_corrupt(stored):
+    cache, fingerprint, _, _ = stored
+    path = cache.file_for(fingerprint)
+    with open(path, "r+b") as stream:
+        stream.truncate(_PREFIX.size - 1)
+    assert cache.load(fingerprint) is None
+    assert cache.corrupt == 1
+    assert not os.path.exists(path)
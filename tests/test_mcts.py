@@ -0,0 +1,50 @@
+from bot.local_engine import generate_map
+from bot.mcts import MCTSPlanner, search
+from bot.simulation import SimState, StaticMap, step
+
+
+def make_state(seed=0, turns=5):
+    walkable, positions, starts = generate_map(15, 15, 5, players=1, seed=seed)
+    static = StaticMap.build(walkable, positions)
+    state = SimState.initial(static, [(1, *starts[0])])
+    for _ in range(turns):
+        step(state, [(0, 0, 0, 0)])
+    return state
+
+
+def test_search_is_a_function_of_the_seed():
+    state = make_state()
+    first, rollouts = search(state, iterations=150, seed=7)
+    second, _ = search(state, iterations=150, seed=7)
+    assert rollouts == 150
+    assert first == second
+    assert sum(visits for visits, _ in first.values()) == 150
+
+
+def test_search_leaves_the_state_alone():
+    state = make_state()
+    player = state.players[0]
+    before = (player.x, player.y, player.energy, state.turn, state.energy.sum())
+    search(state, iterations=50, seed=1)
+    assert (player.x, player.y, player.energy, state.turn, state.energy.sum()) == before
+
+
+def test_planner_gives_the_same_move_for_the_same_seed():
+    state = make_state(seed=2)
+    moves = [MCTSPlanner(state.static, workers=0, seed=3).plan(state, iterations=120) for _ in range(2)]
+    assert moves[0].action is not None
+    assert moves[0].action == moves[1].action
+    assert moves[0].visits == moves[1].visits
+
+
+def test_pool_search_matches_the_in_process_one():
+    state = make_state(seed=4)
+    local = MCTSPlanner(state.static, workers=0, seed=5).plan(state, iterations=80)
+    planner = MCTSPlanner(state.static, workers=1, seed=5)
+    try:
+        pooled = planner.plan(state, iterations=80)
+    finally:
+        planner.close()
+    assert pooled.rollouts == local.rollouts == 80
+    assert pooled.visits == local.visits
+    assert pooled.action == local.action
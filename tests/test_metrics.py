@@ -0,0 +1,39 @@
+import threading
+
+from bot.metrics import Histogram, Metrics
+
+
+def test_histogram_quantiles():
+    histogram = Histogram(bounds=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.as_dict() == {"count": 4, "sum": 6.5, "p50": 2.0, "p99": 4.0}
+    histogram.observe(9.0)
+    assert histogram.quantile(1.0) == float("inf")
+
+
+def test_exports_while_handlers_add_metrics():
+    metrics = Metrics(enabled=True)
+    stop = threading.Event()
+    errors = []
+
+    def export():
+        try:
+            while not stop.is_set():
+                metrics.as_dict()
+                metrics.to_prometheus()
+        except Exception as error:  # surfaced below, a thread would swallow it
+            errors.append(error)
+
+    reader = threading.Thread(target=export)
+    reader.start()
+    try:
+        for index in range(3000):
+            metrics.histogram(f"rpc.{index}").observe(0.001)
+            metrics.count(f"action.{index}")
+    finally:
+        stop.set()
+        reader.join()
+        metrics.close()
+    assert errors == []
+    assert len(metrics.as_dict()["counters"]) == 3000
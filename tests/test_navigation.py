@@ -0,0 +1,94 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_initial_state, make_walkable, pick_cells
+from bot.navigation import (
+    MOVES, NO_STEP, UNREACHABLE, NavigationGrid, compute_field, walkable_from_initial_state,
+)
+
+
+def brute_force_distances(walkable, destination):
+    """Plain BFS over the 8 moves, {(x, y): moves} of every cell that reaches ``destination``"""
+    height, width = walkable.shape
+    found = {tuple(destination): 0}
+    queue = deque([tuple(destination)])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in MOVES:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and walkable[ny, nx] and (nx, ny) not in found:
+                found[(nx, ny)] = found[(x, y)] + 1
+                queue.append((nx, ny))
+    return found
+
+
+@pytest.mark.parametrize("seed", range(15))
+def test_field_matches_brute_force(seed):
+    walkable = make_walkable(17, 13, wall_ratio=0.3, seed=seed)
+    destination = pick_cells(walkable, 1, seed=seed)[0]
+    expected = brute_force_distances(walkable, destination)
+    field = compute_field(walkable, destination)
+    for y in range(walkable.shape[0]):
+        for x in range(walkable.shape[1]):
+            dist, index = int(field.dist[y, x]), int(field.step[y, x])
+            if (x, y) not in expected:
+                assert dist == UNREACHABLE and index == NO_STEP
+                continue
+            assert dist == expected[(x, y)]
+            if dist == 0:
+                assert index == NO_STEP
+                continue
+            dx, dy = MOVES[index]
+            assert expected.get((x + dx, y + dy)) == dist - 1
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_grid_paths_walk_the_shortest_distance(seed):
+    walkable = make_walkable(21, 21, wall_ratio=0.25, seed=seed)
+    cells = pick_cells(walkable, 8, seed=seed)
+    grid = NavigationGrid(walkable, targets=cells[:4], cache_size=2)
+    for destination in cells:
+        expected = brute_force_distances(walkable, destination)
+        for source in cells:
+            distance = grid.distance(source, destination)
+            assert distance == expected.get(source)
+            if distance is None:
+                assert grid.path(source, destination) == []
+                continue
+            x, y = source
+            for dx, dy in grid.path(source, destination):
+                x, y = x + dx, y + dy
+                assert walkable[y, x]
+            assert (x, y) == destination
+            assert len(grid.path(source, destination)) == distance
+    assert len(grid._lazy_fields) <= 2
+
+
+def test_target_distances_follow_the_target_order():
+    walkable = make_walkable(15, 15, seed=4)
+    cells = pick_cells(walkable, 5, seed=4)
+    grid = NavigationGrid(walkable, targets=cells[1:])
+    source = cells[0]
+    expected = [brute_force_distances(walkable, target).get(source, UNREACHABLE) for target in cells[1:]]
+    assert grid.target_distances(source).tolist() == expected
+    assert grid.target_distances((-1, 0)).tolist() == [UNREACHABLE] * 4
+
+
+def test_wall_or_outside_destination_is_unreachable():
+    walkable = np.ones((4, 4), dtype=bool)
+    walkable[1, 2] = False
+    grid = NavigationGrid(walkable)
+    assert grid.distance((0, 0), (2, 1)) is None
+    assert grid.distance((0, 0), (9, 9)) is None
+    assert grid.next_move((0, 0), (2, 1)) is None
+
+
+def test_from_initial_state_reads_rows_by_y():
+    initial_state = make_initial_state(9, 7, lighthouses=3)
+    walkable = walkable_from_initial_state(initial_state)
+    assert walkable.shape == (7, 9)
+    assert walkable.tolist() == make_walkable(9, 7).tolist()
+    grid = NavigationGrid.from_initial_state(initial_state)
+    assert grid.targets == [(lh.Position.X, lh.Position.Y) for lh in initial_state.Lighthouses]
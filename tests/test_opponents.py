@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+from bot.lighthouses import LighthouseIndex
+from bot.local_engine import DirectBot, LocalGame, play_match
+from bot.opponents import OpponentModel
+from bot.simulation import LIGHTHOUSE_DECAY
+from internal.handler.coms import game_pb2
+from main import BotGame
+
+PLAYER, RIVAL = 1, 2
+POSITIONS = [(1, 1), (6, 1), (3, 5)]
+
+
+def lighthouses(owners, energies):
+    return [
+        game_pb2.Lighthouse(Position=game_pb2.Position(X=x, Y=y), Owner=owner, Energy=energy)
+        for (x, y), owner, energy in zip(POSITIONS, owners, energies)
+    ]
+
+
+class Game:
+    """Feeds lighthouse lists through a LighthouseIndex into an OpponentModel"""
+
+    def __init__(self):
+        self.index = LighthouseIndex(POSITIONS, PLAYER)
+        self.model = OpponentModel(self.index, None, player_count=2)
+        self.turn = 0
+
+    def play(self, owners, energies, our_energy=None, turns=1):
+        for _ in range(turns):
+            self.turn += 1
+            changes = self.index.update(lighthouses(owners, energies))
+            self.model.update(changes, self.turn, our_energy)
+
+
+def test_capture_is_blamed_on_the_new_owner():
+    game = Game()
+    game.play([0, 0, 0], [0, 0, 0])
+    game.play([RIVAL, 0, 0], [30, 0, 0])
+    state = game.model.opponents[RIVAL]
+    assert state.lighthouse == 0
+    assert state.captures == 1
+    assert state.spent == 30 + LIGHTHOUSE_DECAY
+
+
+def test_reinforcement_counts_the_energy_above_the_decay():
+    game = Game()
+    game.play([RIVAL, 0, 0], [50, 0, 0])
+    game.play([RIVAL, 0, 0], [70, 0, 0])
+    state = game.model.opponents[RIVAL]
+    assert state.spent == 70 - (50 - LIGHTHOUSE_DECAY)
+    assert state.captures == 0
+
+
+def test_rival_never_seen_acting_is_no_threat():
+    game = Game()
+    game.play([0, 0, 0], [0, 0, 0], our_energy=0)
+    for energy in range(10, 5000, 10):
+        game.play([0, 0, 0], [0, 0, 0], our_energy=energy)
+    model = game.model
+    assert model.income > 0
+    assert model.reserve(RIVAL) == 0.0
+    # No threat, but the capture must still outlast the decay of the next rounds
+    assert model.safe_attack_energy(1) >= model.min_energy_to_hold(1) == 1 + LIGHTHOUSE_DECAY
+
+
+def test_reserve_is_capped_late_in_the_game():
+    game = Game()
+    game.play([0, 0, 0], [0, 0, 0], our_energy=0)
+    game.play([0, RIVAL, 0], [0, 40, 0], our_energy=5)
+    largest = game.model.opponents[RIVAL].largest_spend
+    early = game.model.reserve(RIVAL, game.turn + 2)
+    for turn in range(2000):
+        game.play([0, RIVAL, 0], [0, 40, 0], our_energy=10 + 5 * turn)
+    late = game.model.reserve(RIVAL)
+    assert 0 < early <= late
+    assert late <= max(largest, game.model.income * 10) + 1e-9
+    # The attack stays in proportion with what the rival has shown
+    assert game.model.safe_attack_energy(2) < 10 * largest
+
+
+def test_safe_attack_covers_a_rival_that_can_reach_the_lighthouse():
+    game = Game()
+    game.play([0, 0, 0], [0, 0, 0], our_energy=0)
+    game.play([RIVAL, 0, 0], [30, 0, 0], our_energy=20)
+    game.play([RIVAL, 0, 0], [20, 0, 0], our_energy=40, turns=5)
+    model = game.model
+    needed = model.min_energy_to_take(1)
+    threat = model.threat(1)
+    assert threat > 0
+    assert model.safe_attack_energy(1) == needed + int(threat + LIGHTHOUSE_DECAY * 20)
+
+
+@pytest.mark.parametrize("owner", [PLAYER, 0])
+def test_min_energy_to_take(owner):
+    game = Game()
+    game.play([owner, 0, 0], [12, 0, 0])
+    assert game.model.min_energy_to_take(0) == (0 if owner == PLAYER else 13)
+
+
+def test_uncontested_top_up_covers_the_decay():
+    game = Game()
+    game.play([PLAYER, 0, 0], [5, 0, 0], our_energy=100)
+    assert game.model.safe_attack_energy(0) > LIGHTHOUSE_DECAY - 5
+
+
+@pytest.mark.parametrize("seed", [0, 3])
+def test_local_match_scores(seed):
+    random.seed(seed)
+    game = LocalGame.random(15, 15, 4, turns=60, seed=seed)
+    bots = {}
+    for _ in range(2):
+        player_id = game.join()
+        bots[player_id] = BotGame(player_id)
+    try:
+        result = play_match(game, {player_id: DirectBot(bot) for player_id, bot in bots.items()})
+    finally:
+        for bot in bots.values():
+            bot.close()
+    # Captures that only just beat the lighthouse lapse in the same round and never score
+    assert all(score > 0 for score in result.scores.values())
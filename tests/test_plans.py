@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+
+from bot.lighthouses import LighthouseIndex
+from bot.plans import PlanCache
+from internal.handler.coms import game_pb2
+
+PLAYER = 1
+TARGET = 0
+EAST, NORTH = (1, 0), (0, 1)
+
+
+def lighthouse(x, y, owner=0, energy=0, have_key=False):
+    return game_pb2.Lighthouse(Position=game_pb2.Position(X=x, Y=y), Owner=owner, Energy=energy, HaveKey=have_key)
+
+
+def make_index():
+    index = LighthouseIndex([(5, 0), (0, 5)], PLAYER)
+    index.update([lighthouse(5, 0, energy=30), lighthouse(0, 5)])
+    return index
+
+
+class FlatField:
+    """Every cell holds ``value``"""
+
+    def __init__(self, value):
+        self.value = value
+
+    def cell_estimate(self, x, y, turn):
+        return self.value
+
+    def yields(self, source, moves, turn):
+        return [self.value] * len(moves)
+
+
+def planned(walkable=None, field=None):
+    index = make_index()
+    cache = PlanCache(index, walkable, field)
+    assert cache.start((0, 0), 0, TARGET, [EAST, EAST, EAST]) == EAST
+    return index, cache
+
+
+def test_follow_walks_the_plan():
+    _, cache = planned()
+    assert cache.follow((1, 0), 1) == EAST
+    assert cache.follow((2, 0), 2, target=TARGET) == EAST
+    assert cache.follow((3, 0), 3) is None
+    stats = cache.stats.as_dict()
+    assert stats["hits"] == 2
+    assert stats["invalidated"] == {"finished": 1}
+
+
+def test_no_plan_is_a_miss_without_an_invalidation():
+    cache = PlanCache(make_index())
+    assert cache.follow((0, 0), 0) is None
+    cache.record_miss(0.01)
+    stats = cache.stats.as_dict()
+    assert (stats["hits"], stats["misses"], stats["invalidated"]) == (0, 1, {})
+    assert stats["miss_cost"] > 0.0
+
+
+def test_empty_route_starts_no_plan():
+    cache = PlanCache(make_index())
+    assert cache.start((0, 0), 0, TARGET, []) is None
+    assert cache.plan is None
+
+
+@pytest.mark.parametrize("reason, position, change", [
+    ("moved", (0, 0), None),
+    ("target", (1, 0), None),
+    ("owner", (1, 0), [lighthouse(5, 0, owner=2, energy=30), lighthouse(0, 5)]),
+    ("energy", (1, 0), [lighthouse(5, 0, energy=60), lighthouse(0, 5)]),
+    ("key", (1, 0), [lighthouse(5, 0, energy=30), lighthouse(0, 5, have_key=True)]),
+])
+def test_plan_is_dropped_when_it_no_longer_holds(reason, position, change):
+    index, cache = planned()
+    if change is not None:
+        index.update(change)
+    target = 1 if reason == "target" else None
+    assert cache.follow(position, 1, target=target) is None
+    assert cache.plan is None
+    assert cache.stats.invalidated == {reason: 1}
+    assert cache.stats.hits == 0
+
+
+def test_small_energy_changes_keep_the_plan():
+    index, cache = planned()
+    index.update([lighthouse(5, 0, energy=45), lighthouse(0, 5)])
+    assert cache.follow((1, 0), 1) == EAST
+
+
+def test_blocked_cell_drops_the_plan():
+    walkable = np.ones((3, 6), dtype=bool)
+    _, cache = planned(walkable)
+    walkable[0, 2] = False
+    assert cache.follow((1, 0), 1) is None
+    assert cache.stats.invalidated == {"blocked": 1}
+
+
+def test_harvested_cell_drops_the_plan():
+    field = FlatField(50)
+    _, cache = planned(field=field)
+    field.value = 45
+    assert cache.follow((1, 0), 1) == EAST
+    field.value = 30
+    assert cache.follow((2, 0), 2) is None
+    assert cache.stats.invalidated == {"harvested": 1}
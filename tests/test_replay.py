@@ -0,0 +1,99 @@
+import pytest
+
+from bot.replay import REPLAY_MAGIC, ReplayWriter, read_games, read_replay, replay_game
+from internal.handler.coms import game_pb2
+
+
+def initial_state(player_id):
+    return game_pb2.NewPlayerInitialState(PlayerID=player_id, PlayerCount=2, Position=game_pb2.Position(X=1, Y=2))
+
+
+def turn(x, energy):
+    return game_pb2.NewTurn(Position=game_pb2.Position(X=x, Y=1), Energy=energy)
+
+
+def move(x):
+    return game_pb2.NewAction(Action=game_pb2.MOVE, Destination=game_pb2.Position(X=x, Y=1))
+
+
+def write(path, games):
+    writer = ReplayWriter(str(path), interval=0.001)
+    for player_id, turns in games:
+        writer.initial_state(initial_state(player_id))
+        for x in turns:
+            writer.turn(turn(x, 10 * x), move(x + 1))
+    writer.close()
+    return writer
+
+
+class EchoBot:
+    """Moves one cell right of where it stands, like the recorded games"""
+
+    def __init__(self, player_id):
+        self.player_id = player_id
+        self.closed = False
+
+    def load_initial_state(self, message):
+        self.initial_state = message
+
+    def new_turn_action(self, message):
+        x = message.Position.X + 1 if message.Position.X != 3 else 0
+        return move(x)
+
+    def close(self):
+        self.closed = True
+
+
+def test_games_round_trip(tmp_path):
+    path = tmp_path / "game.replay"
+    writer = write(path, [(1, [1, 2, 3]), (2, [4])])
+    assert writer.records == 2 + 2 * 4
+    games = list(read_games(str(path)))
+    assert [game.initial_state.PlayerID for game in games] == [1, 2]
+    assert [len(game.turns) for game in games] == [3, 1]
+    recorded_turn, recorded_action = games[0].turns[1]
+    assert recorded_turn == turn(2, 20)
+    assert recorded_action == move(3)
+
+
+def test_appending_keeps_one_header(tmp_path):
+    path = tmp_path / "game.replay"
+    write(path, [(1, [1])])
+    write(path, [(2, [2])])
+    assert path.read_bytes().count(REPLAY_MAGIC) == 1
+    assert [game.initial_state.PlayerID for game in read_games(str(path))] == [1, 2]
+
+
+def test_truncated_file_keeps_complete_records(tmp_path):
+    path = tmp_path / "game.replay"
+    write(path, [(1, [1, 2])])
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])
+    kinds = [kind for kind, _ in read_replay(str(path))]
+    assert len(kinds) == 4
+    (game,) = read_games(str(path))
+    assert len(game.turns) == 1
+
+
+def test_bad_magic_is_rejected(tmp_path):
+    path = tmp_path / "game.replay"
+    path.write_bytes(b"NOTAREPLAY")
+    with pytest.raises(ValueError):
+        list(read_replay(str(path)))
+
+
+def test_replay_game_reports_the_diverging_turns(tmp_path):
+    path = tmp_path / "game.replay"
+    write(path, [(1, [1, 2, 3, 4])])
+    (game,) = read_games(str(path))
+    bots = []
+
+    def factory(player_id):
+        bots.append(EchoBot(player_id))
+        return bots[-1]
+
+    result = replay_game(game, factory)
+    assert result.turns == 4
+    assert len(result.latencies) == 4
+    assert [(number, diff.Destination.X) for number, _, diff in result.diffs] == [(3, 0)]
+    assert bots[0].player_id == 1 and bots[0].closed
@@ -0,0 +1,82 @@
+import pytest
+
+from bot.metrics import Metrics
+from bot.scheduler import AnytimeScheduler, Deadline
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeContext:
+    def __init__(self, remaining):
+        self.remaining = remaining
+
+    def time_remaining(self):
+        return self.remaining
+
+
+def test_deadline_counts_down_on_its_clock():
+    clock = FakeClock()
+    deadline = Deadline(0.5, clock)
+    assert deadline.remaining() == pytest.approx(0.5)
+    assert not deadline.expired()
+    clock.now += 0.5
+    assert deadline.expired()
+
+
+def test_negative_budget_is_already_expired():
+    assert Deadline(-1.0, FakeClock()).expired()
+
+
+@pytest.mark.parametrize("remaining, expected", [(0.8, 0.7), (None, 1.9)])
+def test_deadline_from_context_keeps_the_margin(remaining, expected):
+    deadline = Deadline.from_context(FakeContext(remaining), margin=0.1, default_budget=2.0)
+    assert deadline.remaining() == pytest.approx(expected, abs=0.01)
+
+
+def test_stages_refine_the_fallback_in_order():
+    scheduler = AnytimeScheduler()
+    seen = []
+
+    def stage(answer):
+        def run(deadline):
+            seen.append(answer)
+            return answer
+        return run
+
+    best = scheduler.run(lambda: "fallback", [stage("greedy"), stage(None), stage("deep")], Deadline(10.0))
+    assert best == "deep"
+    assert seen == ["greedy", None, "deep"]
+    assert scheduler.stats.full_depth == 1
+
+
+def test_expired_deadline_sends_the_fallback():
+    scheduler = AnytimeScheduler()
+    best = scheduler.run(lambda: "fallback", [lambda deadline: "greedy"], Deadline(0.0))
+    assert best == "fallback"
+    stats = scheduler.stats.as_dict()
+    assert stats["fallback"] == 1
+    assert stats["depth_counts"] == {0: 1}
+
+
+def test_failing_stage_keeps_the_best_answer():
+    metrics = Metrics()
+    scheduler = AnytimeScheduler(metrics=metrics)
+    later = []
+
+    def broken(deadline):
+        raise RuntimeError("worker died")
+
+    stages = [lambda deadline: "greedy", broken, lambda deadline: later.append(1)]
+    assert scheduler.run(lambda: "fallback", stages, Deadline(10.0)) == "greedy"
+    assert later == []
+    stats = scheduler.stats.as_dict()
+    assert stats["failures"] == 1
+    assert stats["depth_counts"] == {1: 1}
+    assert metrics.counter("scheduler.failure").value == 1
+    metrics.close()
@@ -0,0 +1,97 @@
+import random
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_walkable, pick_cells
+from bot.lighthouses import LighthouseIndex
+from bot.navigation import NavigationGrid
+from bot.scoring import (
+    ScoringEngine, energy_margin_objective, path_ratio_objective, ratio_objective, weighted,
+)
+from internal.handler.coms import game_pb2
+
+PLAYER = 1
+
+
+def make_engine(seed, count=12, size=20):
+    rng = random.Random(seed)
+    walkable = make_walkable(size, size, seed=seed)
+    cells = pick_cells(walkable, count + 1, seed=seed)
+    start, positions = cells[0], cells[1:]
+    index = LighthouseIndex(positions, PLAYER)
+    index.update([
+        game_pb2.Lighthouse(
+            Position=game_pb2.Position(X=x, Y=y), Owner=rng.choice((0, PLAYER, 2)), Energy=rng.randrange(100),
+        )
+        for x, y in positions
+    ])
+    return ScoringEngine(index, NavigationGrid(walkable, positions)), start
+
+
+def scalar_ratio(position, lighthouse_position, energy):
+    """BotGame.compute_ratio"""
+    manhattan = abs(position[0] - lighthouse_position[0]) + abs(position[1] - lighthouse_position[1])
+    return 1.0 / ((energy + 1) * (manhattan + 1))
+
+
+def scalar_path_ratio(navigation, position, lighthouse_position, energy):
+    distance = navigation.distance(position, lighthouse_position)
+    if distance is None:
+        return -np.inf
+    return 1.0 / ((energy + 1) * (distance + 1))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_ratio_matches_the_scalar_loop(seed):
+    engine, start = make_engine(seed)
+    index = engine.index
+    scores = engine.score(start, 50, ratio_objective)
+    for lh_id, position in enumerate(index.positions):
+        if index.owner[lh_id] == PLAYER:
+            assert scores[lh_id] == -np.inf
+        else:
+            assert scores[lh_id] == pytest.approx(scalar_ratio(start, position, int(index.energy[lh_id])))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_path_ratio_matches_the_walking_distance(seed):
+    engine, start = make_engine(seed)
+    index = engine.index
+    scores = engine.score(start, 50, path_ratio_objective, exclude_owned=False)
+    for lh_id, position in enumerate(index.positions):
+        expected = scalar_path_ratio(engine.navigation, start, position, int(index.energy[lh_id]))
+        assert scores[lh_id] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_top_k_ranks_like_a_sort(seed):
+    engine, start = make_engine(seed)
+    scores = engine.score(start, 50)
+    expected = sorted(
+        ((lh_id, score) for lh_id, score in enumerate(scores.tolist()) if score != -np.inf),
+        key=lambda item: (-item[1], item[0]),
+    )
+    assert engine.top_k(start, 50, k=4) == expected[:4]
+    assert engine.top_k(start, 50, k=1) == expected[:1]
+    assert engine.top_k(start, 50, k=100) == expected
+
+
+def test_unaffordable_lighthouses_are_skipped():
+    engine, start = make_engine(0)
+    index = engine.index
+    ranked = engine.top_k(start, 60, k=len(index), objective=energy_margin_objective)
+    affordable = {
+        lh_id for lh_id in range(len(index))
+        if index.owner[lh_id] != PLAYER and index.energy[lh_id] + 1 <= 60
+        and engine.navigation.distance(start, index.positions[lh_id]) is not None
+    }
+    assert affordable
+    assert {lh_id for lh_id, _ in ranked} == affordable
+
+
+def test_weighted_sums_its_terms():
+    engine, start = make_engine(1)
+    combined = weighted((ratio_objective, 2.0), (path_ratio_objective, 0.5))
+    expected = 2.0 * ratio_objective(engine, start, 0) + 0.5 * path_ratio_objective(engine, start, 0)
+    np.testing.assert_allclose(combined(engine, start, 0), expected)
@@ -0,0 +1,51 @@
+import pytest
+
+from bot.sessions import SessionManager
+
+
+class FakeServicer:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def manager(max_sessions, evicted):
+    return SessionManager(
+        lambda session_id, bot_id, metrics: FakeServicer(),
+        max_sessions=max_sessions, idle_after=0.0, on_evict=evicted.append,
+    )
+
+
+def test_waiting_sessions_are_never_evicted():
+    evicted = []
+    sessions = manager(2, evicted)
+    sessions.open("a")
+    sessions.open("b")
+    with pytest.raises(RuntimeError):
+        sessions.open("c")
+    assert evicted == []
+    assert set(sessions.sessions) == {"a", "b"}
+
+
+def test_least_recently_used_started_session_is_evicted():
+    evicted = []
+    sessions = manager(2, evicted)
+    first = sessions.open("a")
+    sessions.open("b")
+    sessions.get("a")
+    sessions.open("c")
+    assert evicted == [first]
+    assert first.servicer.closed
+    assert set(sessions.sessions) == {"b", "c"}
+    assert sessions.evictions == 1
+
+
+def test_session_opened_by_a_call_has_started():
+    evicted = []
+    sessions = manager(1, evicted)
+    routed = sessions.get_or_open("a")
+    assert routed.started
+    assert not sessions.open("b").started
+    assert evicted == [routed]
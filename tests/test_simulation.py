@@ -0,0 +1,148 @@
+import numpy as np
+import pytest
+
+from bot.connections import triangle_cells
+from bot.simulation import (
+    ATTACK, CONNECT, CONNECTION_POINTS, LIGHTHOUSE_DECAY, LIGHTHOUSE_POINTS, MOVE, NEUTRAL, PASS,
+    SimPlayer, SimState, StaticMap, apply_action, legal_actions, round_points, step,
+)
+
+# A, B, C make a triangle; D sits on the segment A-B; the segment C-E crosses A-B
+POSITIONS = [(1, 1), (9, 1), (1, 9), (5, 1), (8, 0)]
+A, B, C, D, E = range(5)
+PLAYER, RIVAL = 1, 2
+
+
+def make_state(players=((PLAYER, 1, 1),), walls=()):
+    walkable = np.ones((12, 12), dtype=bool)
+    for x, y in walls:
+        walkable[y, x] = False
+    static = StaticMap.build(walkable, POSITIONS)
+    return SimState.initial(static, list(players))
+
+
+def own(state, player_id, *lh_ids, energy=100):
+    for lh_id in lh_ids:
+        state.owner[lh_id] = player_id
+        state.lh_energy[lh_id] = energy
+
+
+PASSING = (PASS, 0, 0, 0)
+
+
+def test_owned_lighthouse_decays_to_neutral():
+    state = make_state()
+    own(state, PLAYER, A, B, energy=LIGHTHOUSE_DECAY + 5)
+    state.links.add((A, B))
+    step(state, [PASSING])
+    assert state.owner[A] == PLAYER and state.lh_energy[A] == 5
+    assert state.links == {(A, B)}
+    step(state, [PASSING])
+    assert state.owner[A] == NEUTRAL and state.lh_energy[A] == 0
+    assert state.links == set()
+    assert state.turn == 2
+
+
+def test_attack_must_beat_the_lighthouse_energy():
+    state = make_state()
+    own(state, RIVAL, A, energy=20)
+    state.links.add((A, C))
+    player = state.players[0]
+    player.energy = 45
+    apply_action(state, player, (ATTACK, 1, 1, 20))
+    # An equal attack only empties it, and an emptied lighthouse goes neutral
+    assert state.owner[A] == NEUTRAL and state.lh_energy[A] == 0
+    assert state.links == set()
+    apply_action(state, player, (ATTACK, 1, 1, 5))
+    assert state.owner[A] == PLAYER and state.lh_energy[A] == 5
+    apply_action(state, player, (ATTACK, 1, 1, 100))
+    # Only what we have is spent, and attacking our own lighthouse adds to it
+    assert player.energy == 0
+    assert state.lh_energy[A] == 25
+
+
+def test_capture_scores_only_if_it_outlasts_the_decay():
+    state = make_state()
+    state.players[0].energy = 100
+    step(state, [(ATTACK, 1, 1, 1)])
+    assert state.owner[A] == NEUTRAL and state.players[0].score == 0
+    step(state, [(ATTACK, 1, 1, 1 + LIGHTHOUSE_DECAY)])
+    assert state.owner[A] == PLAYER and state.players[0].score == LIGHTHOUSE_POINTS
+
+
+def test_moves_collect_keys_and_stop_at_walls():
+    state = make_state(players=((PLAYER, 3, 1),), walls=[(3, 2)])
+    player = state.players[0]
+    apply_action(state, player, (MOVE, 3, 2, 0))
+    assert (player.x, player.y) == (3, 1)
+    apply_action(state, player, (MOVE, 5, 1, 0))  # two cells away
+    assert (player.x, player.y) == (3, 1)
+    apply_action(state, player, (MOVE, 4, 1, 0))
+    apply_action(state, player, (MOVE, 5, 1, 0))
+    assert (player.x, player.y) == (5, 1)
+    assert player.keys == {D}
+
+
+def test_players_on_one_cell_share_its_energy():
+    state = make_state(players=((PLAYER, 2, 2), (RIVAL, 2, 2)))
+    state.energy[2, 2] = 11
+    step(state, [PASSING, PASSING])
+    regen = int(state.static.regen[2, 2])
+    assert [player.energy for player in state.players] == [(11 + regen) // 2] * 2
+    assert state.energy[2, 2] == 0
+
+
+@pytest.mark.parametrize("source, target, legal", [
+    (A, C, True),
+    (A, B, False),   # D lies on the segment
+    (C, B, True),
+    (A, E, False),   # not ours
+    (C, A, False),   # already linked below
+])
+def test_connect_rules(source, target, legal):
+    state = make_state()
+    own(state, PLAYER, A, B, C, D)
+    player = state.players[0]
+    player.keys = {A, B, C, D}
+    if (source, target) == (C, A):
+        state.links.add((A, C))
+    assert state.can_connect(player, source, target) == legal
+
+
+def test_connect_cannot_cross_a_link():
+    state = make_state(players=((PLAYER, *POSITIONS[C]),))
+    own(state, PLAYER, A, B, C, E)
+    player = state.players[0]
+    player.keys = {E}
+    state.links.add((A, B))
+    assert not state.can_connect(player, C, E)
+    apply_action(state, player, (CONNECT, *POSITIONS[E], 0))
+    assert state.links == {(A, B)} and player.keys == {E}
+    state.links.clear()
+    apply_action(state, player, (CONNECT, *POSITIONS[E], 0))
+    assert state.links == {(C, E)}
+    assert player.keys == set()
+
+
+def test_round_points_count_links_and_triangles():
+    state = make_state()
+    own(state, PLAYER, A, B, C)
+    assert round_points(state, PLAYER) == 3 * LIGHTHOUSE_POINTS
+    state.links |= {(A, C), (B, C)}
+    assert round_points(state, PLAYER) == 3 * LIGHTHOUSE_POINTS + 2 * CONNECTION_POINTS
+    state.links.add((A, B))
+    triangle = triangle_cells(POSITIONS[A], POSITIONS[B], POSITIONS[C])
+    assert triangle > 0
+    assert round_points(state, PLAYER) == 3 * LIGHTHOUSE_POINTS + 3 * CONNECTION_POINTS + triangle
+    assert round_points(state, RIVAL) == 0
+
+
+def test_legal_attacks_include_the_capture_amount():
+    state = make_state()
+    own(state, RIVAL, A, energy=30)
+    player = state.players[0]
+    player.energy = 50
+    attacks = [amount for kind, _, _, amount in legal_actions(state, player, (0.5, 1.0)) if kind == ATTACK]
+    assert attacks == [25, 31, 50]
+    player.energy = 0
+    assert all(kind == MOVE for kind, _, _, _ in legal_actions(state, player))
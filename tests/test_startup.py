@@ -0,0 +1,80 @@
+import random
+
+import grpc
+import pytest
+
+from bot.startup import Backoff, StartupClock, join
+from internal.handler.coms import game_pb2
+
+
+class Unavailable(grpc.RpcError):
+    def details(self):
+        return "engine not up"
+
+
+class FakeChannel:
+    """Channel whose Join fails ``failures`` times before answering with player 3"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = []
+
+    def unary_unary(self, method, *args, **kwargs):
+        def call(request, timeout=None, wait_for_ready=None):
+            self.calls.append((method, request, timeout, wait_for_ready))
+            if len(self.calls) <= self.failures:
+                raise Unavailable()
+            return game_pb2.PlayerID(PlayerID=3)
+        return call
+
+
+def test_delays_grow_up_to_the_cap():
+    backoff = Backoff(initial=0.1, maximum=1.0, factor=2.0, jitter=0.0)
+    assert [backoff.next_delay() for _ in range(6)] == pytest.approx([0.1, 0.2, 0.4, 0.8, 1.0, 1.0])
+    backoff.reset()
+    assert backoff.next_delay() == pytest.approx(0.1)
+
+
+@pytest.mark.parametrize("jitter", [0.25, 0.5, 1.0])
+def test_jitter_stays_below_the_exponential_delay(jitter):
+    backoff = Backoff(initial=0.1, maximum=1.0, jitter=jitter, rng=random.Random(1))
+    for attempt in range(200):
+        nominal = min(1.0, 0.1 * 2.0 ** attempt)
+        delay = backoff.next_delay()
+        assert (1.0 - jitter) * nominal <= delay <= nominal
+
+
+def test_jitter_spreads_bots_started_together():
+    delays = {Backoff(rng=random.Random(seed)).next_delay() for seed in range(20)}
+    assert len(delays) == 20
+
+
+def test_join_retries_until_the_engine_answers():
+    channel, slept, logged = FakeChannel(failures=3), [], []
+    backoff = Backoff(initial=0.1, jitter=0.0)
+    player = join(channel, "bot", "127.0.0.1:3001", timeout=0.5, backoff=backoff, log=logged.append,
+                  sleep=slept.append)
+    assert player.PlayerID == 3
+    assert slept == pytest.approx([0.1, 0.2, 0.4])
+    assert len(logged) == 3
+    method, request, timeout, wait_for_ready = channel.calls[-1]
+    assert method.endswith("/Join")
+    assert (request.name, request.serverAddress) == ("bot", "127.0.0.1:3001")
+    assert timeout == 0.5 and wait_for_ready
+
+
+def test_join_gives_up_after_the_limit():
+    channel, slept = FakeChannel(failures=10), []
+    with pytest.raises(grpc.RpcError):
+        join(channel, "bot", "127.0.0.1:3001", log=lambda message: None, sleep=slept.append, attempts=4)
+    assert len(channel.calls) == 4
+    assert len(slept) == 3
+
+
+def test_startup_clock_marks_milestones():
+    now = [10.0]
+    clock = StartupClock(started=9.5, clock=lambda: now[0])
+    assert clock.mark("listening") == pytest.approx(0.5)
+    now[0] = 10.25
+    clock.mark("joined")
+    assert clock.summary() == "listening 500 ms, joined 750 ms"
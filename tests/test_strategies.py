@@ -0,0 +1,122 @@
+import random
+
+import numpy as np
+import pytest
+
+from bot.actions import ActionPool
+from bot.energy import EnergyField
+from bot.lighthouses import LighthouseIndex
+from bot.metrics import NULL_METRICS
+from bot.navigation import MOVES, NavigationGrid
+from bot.scheduler import Deadline
+from bot.strategies import (
+    AttackStrategy, HarvestStrategy, Strategy, StrategySelector, TurnContext, open_moves,
+)
+from internal.handler.coms import game_pb2
+
+PLAYER = 1
+
+
+class FakeBot:
+    """The parts of BotGame the strategies read"""
+
+    def __init__(self, walkable=None, positions=((1, 1),), energy_field=False):
+        self.player_num = PLAYER
+        self.metrics = NULL_METRICS
+        self.actions = ActionPool()
+        self.countT = 1
+        self.lighthouse_index = LighthouseIndex(positions, PLAYER)
+        self.navigation = NavigationGrid(walkable) if walkable is not None else None
+        self.energy_field = None
+        if energy_field:
+            self.energy_field = EnergyField(walkable, np.zeros(walkable.shape, dtype=np.int32))
+
+    def attack_energy(self, lh_id, energy):
+        return energy // 2
+
+
+def context(bot, x, y, energy=0):
+    ctx = TurnContext()
+    ctx.update(bot, game_pb2.NewTurn(Position=game_pb2.Position(X=x, Y=y), Energy=energy))
+    return ctx
+
+
+def corridor():
+    """Walls everywhere but the cells (1, 1) and (2, 2)"""
+    walkable = np.zeros((5, 5), dtype=bool)
+    walkable[1, 1] = walkable[2, 2] = True
+    return walkable
+
+
+def test_open_moves_skips_walls():
+    navigation = NavigationGrid(corridor())
+    assert open_moves(navigation, (1, 1)) == [(1, 1)]
+    assert open_moves(None, (1, 1)) == MOVES
+
+
+@pytest.mark.parametrize("energy_field", [False, True])
+def test_harvest_never_walks_into_a_wall(energy_field):
+    random.seed(0)
+    bot = FakeBot(corridor(), energy_field=energy_field)
+    strategy = HarvestStrategy()
+    for _ in range(20):
+        action = strategy.propose(bot, context(bot, 1, 1), Deadline(1.0))
+        assert (action.Destination.X, action.Destination.Y) == (2, 2)
+
+
+@pytest.mark.parametrize("energy_field", [False, True])
+def test_harvest_boxed_in_does_not_apply(energy_field):
+    walkable = corridor()
+    walkable[2, 2] = False
+    bot = FakeBot(walkable, energy_field=energy_field)
+    assert HarvestStrategy().propose(bot, context(bot, 1, 1), Deadline(1.0)) is None
+
+
+def test_attack_takes_the_lighthouse_we_stand_on():
+    bot = FakeBot()
+    strategy = AttackStrategy()
+    assert strategy.propose(bot, context(bot, 3, 3, energy=40), Deadline(1.0)) is None
+    action = strategy.propose(bot, context(bot, 1, 1, energy=40), Deadline(1.0))
+    assert action.Action == game_pb2.ATTACK
+    assert action.Energy == 20
+
+
+class Fixed(Strategy):
+    def __init__(self, name, answer, key=None, cost=1e-5):
+        self.name, self.answer, self.memo_key, self.cost = name, answer, key, cost
+        self.calls = 0
+
+    def key(self, bot, ctx):
+        return self.memo_key
+
+    def propose(self, bot, ctx, deadline):
+        self.calls += 1
+        return self.answer
+
+
+def test_selector_takes_the_first_proposal():
+    bot = FakeBot()
+    first, second, third = Fixed("a", None), Fixed("b", "move"), Fixed("c", "pass")
+    selector = StrategySelector([first, second, third])
+    assert selector.select(bot, game_pb2.NewTurn(), Deadline(1.0)) == "move"
+    assert (first.calls, second.calls, third.calls) == (1, 1, 0)
+    assert selector.stats["b"].chosen == 1
+
+
+def test_selector_memoizes_by_key():
+    bot = FakeBot()
+    keyed = Fixed("keyed", "move", key="same")
+    selector = StrategySelector([keyed])
+    for _ in range(3):
+        assert selector.select(bot, game_pb2.NewTurn(), Deadline(1.0)) == "move"
+    assert keyed.calls == 1
+    assert selector.stats["keyed"].memo_hits == 2
+
+
+def test_selector_skips_what_does_not_fit_the_deadline():
+    bot = FakeBot()
+    slow, cheap = Fixed("slow", "deep", cost=10.0), Fixed("cheap", "pass")
+    selector = StrategySelector([slow, cheap])
+    assert selector.select(bot, game_pb2.NewTurn(), Deadline(0.5)) == "pass"
+    assert slow.calls == 0
+    assert selector.stats["slow"].skipped == 1
@@ -0,0 +1,111 @@
+from concurrent.futures import Future
+
+import pytest
+
+from bot.tuning import Checkpoint, SuccessiveHalving, play_pair, sample_candidates
+from main import BotGame
+
+GAME = {"width": 15, "height": 15, "lighthouses": 4, "turns": 60}
+
+
+class FakePool:
+    """Executor that answers play_pair from the ``strength`` of each candidate, without playing"""
+
+    def __init__(self, points=10):
+        self.points = points
+        self.submitted = []
+
+    def submit(self, fn, factory, params, opponent, game, seed, swap):
+        self.submitted.append(seed)
+        total = params["strength"] + opponent["strength"]
+        future = Future()
+        future.set_result({
+            "share": params["strength"] / total,
+            "won": float(params["strength"] >= opponent["strength"]),
+            "points": self.points,
+            "seconds": 0.0,
+        })
+        return future
+
+
+def make_checkpoint(path, strengths, matches=1, eta=2):
+    checkpoint = Checkpoint(path)
+    checkpoint.config = {"matches": matches, "eta": eta, "seed": 0, "game": GAME}
+    checkpoint.candidates = [{"strength": strength} for strength in strengths]
+    checkpoint.save()
+    return checkpoint
+
+
+def tuner(checkpoint):
+    return SuccessiveHalving(checkpoint, BotGame, log=lambda message: None)
+
+
+def test_each_round_keeps_the_best_fraction():
+    strengths = [3, 8, 1, 6, 7, 2, 5, 4]
+    halving = tuner(make_checkpoint(None, strengths))
+    best = halving.run(FakePool())
+    assert best == 1
+    survivors = [[index for index, _, _ in ranking] for _, ranking in halving.rounds]
+    assert [len(ranked) for ranked in survivors] == [8, 4, 2]
+    for ranked, kept in zip(survivors, survivors[1:]):
+        assert set(kept) == set(ranked[:len(kept)])
+    assert all(1 in ranked for ranked in survivors)
+
+
+def test_eta_sets_the_cut():
+    halving = tuner(make_checkpoint(None, list(range(1, 10)), eta=3))
+    assert halving.run(FakePool()) == 8
+    assert [len(ranking) for _, ranking in halving.rounds] == [9, 3]
+
+
+def test_resume_only_plays_missing_matches(tmp_path):
+    path = str(tmp_path / "tuning.json")
+    strengths = [3, 8, 1, 6]
+    first = FakePool()
+    best = tuner(make_checkpoint(path, strengths, matches=2)).run(first)
+
+    resumed = Checkpoint(path)
+    assert resumed.load()
+    assert len(resumed.results) == len(first.submitted)
+    again = FakePool()
+    assert tuner(resumed).run(again) == best
+    assert again.submitted == []
+
+    # Lose the last two results, as an interrupted run would
+    for key in list(resumed.results)[-2:]:
+        del resumed.results[key]
+    resumed.save()
+    partial = Checkpoint(path)
+    partial.load()
+    pool = FakePool()
+    assert tuner(partial).run(pool) == best
+    assert len(pool.submitted) == 2
+    assert len(partial.results) == len(first.submitted)
+
+
+def test_round_without_points_is_an_error():
+    halving = tuner(make_checkpoint(None, [3, 8, 1, 6]))
+    with pytest.raises(RuntimeError):
+        halving.run(FakePool(points=0))
+
+
+def test_checkpoint_load_without_file(tmp_path):
+    assert not Checkpoint(str(tmp_path / "missing.json")).load()
+    assert not Checkpoint(None).load()
+
+
+def test_candidates_start_with_the_defaults():
+    candidates = sample_candidates(5, seed=1)
+    assert len(candidates) == 5
+    assert candidates[0]["attack_probability"] == 60
+    assert sample_candidates(5, seed=1) == candidates
+
+
+def test_play_pair_shares_the_points():
+    params, opponent = sample_candidates(2, seed=0)
+    result = play_pair(BotGame, params, opponent, GAME, seed=3)
+    swapped = play_pair(BotGame, params, opponent, GAME, seed=3, swap=True)
+    for outcome in (result, swapped):
+        assert outcome["points"] > 0
+        assert 0.0 <= outcome["share"] <= 1.0
+        assert outcome["won"] in (0.0, 0.5, 1.0)